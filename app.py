@@ -1,19 +1,203 @@
-from flask import Flask, render_template, request, jsonify
+import hashlib
+import os
+import threading
+import time
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from nutrition_tracker.ingredient import Ingredient
 from nutrition_tracker.database import IngredientDatabase
-from nutrition_tracker.meal import Meal
+from nutrition_tracker.sqlite_database import SQLiteIngredientDatabase
 from nutrition_tracker.history_manager import MealHistoryManager # Added MealHistoryManager import
+from nutrition_tracker.history_journal import JournaledMealHistoryManager
+from nutrition_tracker.meal_calculator import MealCalculationCache, calculate_meals
+from nutrition_tracker.meal_solver import solve_meal
+from nutrition_tracker.history_export import FORMATS as EXPORT_FORMATS, MEDIA_TYPES as EXPORT_MEDIA_TYPES, export_history
+from nutrition_tracker.bulk_import import FORMATS as IMPORT_FORMATS, detect_format, import_ingredients, text_stream
+from nutrition_tracker.lazy_store import LazyStore, warm_up
+from nutrition_tracker.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, Counter, Gauge, Histogram
+from nutrition_tracker.profiling import ProfilingMiddleware
 
 # Initialize Flask app
 app = Flask(__name__)
 
 # Configure database filepaths
 DB_FILEPATH = "ingredient_database.json"
+SQLITE_DB_FILEPATH = "ingredient_database.db"
 MEAL_HISTORY_FILEPATH = "meal_history.json"
-
-# Initialize managers
-db = IngredientDatabase(filepath=DB_FILEPATH)
-history_manager = MealHistoryManager(filepath=MEAL_HISTORY_FILEPATH)
+MEAL_HISTORY_JOURNAL_FILEPATH = "meal_history.ndjson"
+
+# Storage engine for the ingredient catalog: "json" (default) or "sqlite".
+# The SQLite engine imports DB_FILEPATH once on first start.
+DB_ENGINE = os.environ.get("NUTRITION_DB_ENGINE", "json")
+# Storage mode for meal history: "json" (default), "journal" (append-only NDJSON)
+# or "lazy" (the same journal, keeping only meal summaries in memory and reading
+# full meals on demand). The journal modes read an existing MEAL_HISTORY_FILEPATH on first start.
+HISTORY_STORAGE = os.environ.get("NUTRITION_HISTORY_STORAGE", "json")
+# "1" keeps the json/journal history in compact columns (MealColumns) instead of dicts.
+HISTORY_COLUMNAR = os.environ.get("NUTRITION_HISTORY_COLUMNAR", "0") == "1"
+# Write-behind: seconds a change may stay unwritten while a background thread
+# coalesces saves; 0 (default) writes every change before the request returns.
+FLUSH_INTERVAL = float(os.environ.get("NUTRITION_FLUSH_INTERVAL", "0")) or None
+# "1" keeps memory-mapped binary snapshots next to the json catalog and history
+# (DB_FILEPATH + ".snap", MEAL_HISTORY_FILEPATH + ".snap") and loads from them.
+SNAPSHOT = os.environ.get("NUTRITION_SNAPSHOT", "0") == "1"
+
+def open_database():
+    """Creates the ingredient catalog manager for the configured storage engine."""
+    if DB_ENGINE == "sqlite":
+        return SQLiteIngredientDatabase(filepath=SQLITE_DB_FILEPATH, migrate_from=DB_FILEPATH)
+    return IngredientDatabase(filepath=DB_FILEPATH, flush_interval=FLUSH_INTERVAL, snapshot=SNAPSHOT)
+
+def open_history():
+    """Creates the meal history manager for the configured storage mode."""
+    if HISTORY_STORAGE in ("journal", "lazy"):
+        return JournaledMealHistoryManager(
+            filepath=MEAL_HISTORY_JOURNAL_FILEPATH, legacy_filepath=MEAL_HISTORY_FILEPATH,
+            lazy_details=HISTORY_STORAGE == "lazy", flush_interval=FLUSH_INTERVAL,
+            columnar=HISTORY_COLUMNAR and HISTORY_STORAGE == "journal"
+        )
+    return MealHistoryManager(
+        filepath=MEAL_HISTORY_FILEPATH, flush_interval=FLUSH_INTERVAL, columnar=HISTORY_COLUMNAR,
+        snapshot=SNAPSHOT
+    )
+
+# Managers are created on first use, so importing this module reads no files.
+# Servers call start_warmup() to load both in the background right away (the
+# first request does it otherwise); until then a request waits only for the
+# store it uses, and /ready reports which stores are loaded.
+db = LazyStore("catalog", open_database)
+history_manager = LazyStore("history", open_history)
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def start_warmup():
+    """Starts loading the managers that are not loaded yet on a background thread (once)."""
+    global _warmup_thread
+    if _warmup_thread is None:
+        with _warmup_lock:
+            if _warmup_thread is None:
+                stores = [store for store in (db, history_manager) if isinstance(store, LazyStore)]
+                if stores:  # Unless both were replaced by loaded managers
+                    _warmup_thread = warm_up(stores)
+    return _warmup_thread
+
+def configure_persistence(flush_interval):
+    """
+    Sets the write-behind interval of the managers, like NUTRITION_FLUSH_INTERVAL:
+    seconds a change may stay unwritten, or None to write every change before
+    the request returns. Only managers loaded afterwards use it, so servers
+    call it before start_warmup().
+
+    Returns:
+        False if a manager was loaded, or loading, already (it keeps its mode), else True.
+    """
+    global FLUSH_INTERVAL
+    with _warmup_lock:
+        FLUSH_INTERVAL = flush_interval or None
+        return _warmup_thread is None and all(isinstance(store, LazyStore) and not store.ready
+                                              for store in (db, history_manager))
+
+def _loaded(store):
+    """Returns the manager behind `store` if it is loaded, else None, without waiting for it."""
+    return store.peek() if isinstance(store, LazyStore) else store
+
+# Import formats implied by the Content-Type of a raw /api/import_ingredients body.
+IMPORT_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "jsonl", "application/jsonl": "jsonl"}
+
+# Maximum number of meals accepted by one /api/calculate_meals request.
+app.config.setdefault("MAX_MEAL_BATCH_SIZE", int(os.environ.get("NUTRITION_MAX_MEAL_BATCH_SIZE", "500")))
+# Calculated meals, keyed by ingredient database generation and (name, weight) pairs; 0 disables it.
+meal_cache = MealCalculationCache(maxsize=int(os.environ.get("NUTRITION_MEAL_CACHE_SIZE", "1024")))
+
+# --- Profiling (opt-in) ---
+# NUTRITION_PROFILE=cprofile|sampling profiles every request; with
+# NUTRITION_PROFILE_HEADER=1 a single request can ask for it with an
+# "X-Nutrition-Profile: cprofile|sampling" header. Requests slower than
+# NUTRITION_PROFILE_THRESHOLD_MS (and every request that asked) are saved to
+# NUTRITION_PROFILE_DIR, which is kept under NUTRITION_PROFILE_MAX_MB.
+PROFILE_MODE = os.environ.get("NUTRITION_PROFILE") or None
+PROFILE_ALLOW_HEADER = os.environ.get("NUTRITION_PROFILE_HEADER", "0") == "1"
+if PROFILE_MODE or PROFILE_ALLOW_HEADER:
+    app.wsgi_app = ProfilingMiddleware(
+        app.wsgi_app, mode=PROFILE_MODE,
+        threshold=float(os.environ.get("NUTRITION_PROFILE_THRESHOLD_MS", "200")) / 1000,
+        directory=os.environ.get("NUTRITION_PROFILE_DIR", "profiles"),
+        max_bytes=int(float(os.environ.get("NUTRITION_PROFILE_MAX_MB", "100")) * 1024 * 1024),
+        allow_header=PROFILE_ALLOW_HEADER,
+    )
+
+# --- Metrics ---
+# Request counts and latencies per route template (not per URL, so the number
+# of series stays bounded), served with the storage timings of the managers at /metrics.
+REQUEST_COUNT = REGISTRY.register(Counter(
+    "nutrition_http_requests_total", "HTTP requests handled.", labels=("route", "method", "status")))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "nutrition_http_request_duration_seconds", "Time to build the response of an HTTP request.",
+    labels=("route", "method")))
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+def _loaded_value(store, read):
+    """Returns read(manager) if the manager behind `store` is loaded, else None; rendering never waits for a load."""
+    manager = _loaded(store)
+    return None if manager is None else read(manager)
+
+REGISTRY.register(Gauge("nutrition_catalog_ingredients", "Ingredients in the catalog.",
+                        lambda: _loaded_value(db, lambda manager: manager.ingredient_count())))
+REGISTRY.register(Gauge("nutrition_history_meals", "Meals in the meal history.",
+                        lambda: _loaded_value(history_manager, lambda manager: manager.meal_count())))
+REGISTRY.register(Gauge("nutrition_storage_file_bytes", "Size of the catalog and history files.",
+                        lambda: {("catalog",): _loaded_value(db, lambda manager: _file_size(manager.filepath)),
+                                 ("history",): _loaded_value(history_manager, lambda manager: _file_size(manager.filepath))},
+                        labels=("store",)))
+REGISTRY.register(Gauge("nutrition_store_load_seconds", "Time taken to load the catalog and history at startup.",
+                        lambda: {(store.name,): store.load_seconds for store in (db, history_manager)
+                                 if isinstance(store, LazyStore)},
+                        labels=("store",)))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        # Streamed responses (e.g. /api/export_history) are timed until their body starts.
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route, request.method)
+        REQUEST_COUNT.inc(1, route, request.method, str(response.status_code))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition format.
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.before_request
+def refresh_from_disk():
+    # Other processes (CLI, other workers) may share the files; picking up their
+    # changes costs one stat (or one pragma) per request when nothing changed.
+    # Stores that are still loading are skipped: they read the current file.
+    start_warmup()
+    db.refresh()
+    history_manager.refresh()
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # Readiness probe: 200 once both stores are loaded, 503 while they are loading.
+    stores = {}
+    for store in (db, history_manager):
+        if isinstance(store, LazyStore):
+            status = {"ready": store.ready, "load_seconds": store.load_seconds}
+            if store.error is not None and not store.ready:
+                status["error"] = str(store.error)
+            stores[store.name] = status
+    all_ready = all(status["ready"] for status in stores.values())
+    return jsonify({"ready": all_ready, "stores": stores}), 200 if all_ready else 503
 
 @app.route('/')
 def index():
@@ -56,6 +240,8 @@ def shutdown_server():
 
     try:
         app.logger.info("Server shutdown requested via /shutdown-server endpoint.")
+        db.flush()
+        history_manager.flush()
         shutdown_func()
         return "Server is shutting down... You can close this page. Please also close the CLI window if it's still open."
     except Exception as e:
@@ -67,15 +253,45 @@ def track_meal_page():
     # Serves the track_meal.html page
     return render_template('track_meal.html')
 
+# Serialized /api/get_ingredients body as (db, generation, body, etag); rebuilt when the catalog changes.
+_ingredients_response_cache = None
+
 @app.route('/api/get_ingredients', methods=['GET'])
 def get_ingredients_api():
-    ingredients = db.list_ingredients()
-    ingredient_details = []
-    for name in ingredients:
-        ing = db.get_ingredient(name)
-        if ing:
-            ingredient_details.append(ing.to_dict())
-    return jsonify(ingredient_details)
+    global _ingredients_response_cache
+    cached = _ingredients_response_cache
+    if cached is None or cached[0] is not db or cached[1] != db.generation:
+        generation = db.generation  # Read first so a concurrent change yields a newer generation, not a stale body.
+        ingredients = db.list_ingredients()
+        ingredient_details = []
+        for name in ingredients:
+            ing = db.get_ingredient(name)
+            if ing:
+                ingredient_details.append(ing.to_dict())
+        body = jsonify(ingredient_details).get_data()
+        # Derived from the body, so the tag stays valid across restarts.
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        cached = _ingredients_response_cache = (db, generation, body, etag)
+
+    response = app.response_class(cached[2], mimetype="application/json")
+    response.set_etag(cached[3])
+    response.headers["Cache-Control"] = "no-cache"  # Always revalidate; unchanged catalogs get a 304.
+    return response.make_conditional(request)
+
+# Default and maximum number of results for /api/search_ingredients.
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+@app.route('/api/search_ingredients', methods=['GET'])
+def search_ingredients_api():
+    # Ranked, case- and accent-insensitive name search; see IngredientSearchIndex.
+    query = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({"success": False, "message": "limit must be an integer."}), 400
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    return jsonify([ing.to_dict() for ing in db.search_ingredients(query, limit)])
 
 @app.route('/api/add_ingredient', methods=['POST'])
 def add_ingredient_api():
@@ -122,70 +338,52 @@ def add_ingredient_api():
         app.logger.error(f"Unexpected error in add_ingredient_api: {e}")
         return jsonify({"success": False, "message": "An unexpected error occurred."}), 500
 
+@app.route('/api/import_ingredients', methods=['POST'])
+def import_ingredients_api():
+    # Bulk import from a CSV or JSONL upload: either a multipart form with a
+    # "file" field or the raw request body. ?format=csv|jsonl defaults to the
+    # upload's file extension or content type; ?on_duplicate=skip|overwrite.
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        file_format = request.args.get('format') or detect_format(upload.filename if upload else None) \
+            or IMPORT_CONTENT_TYPES.get(request.mimetype)
+        if file_format not in IMPORT_FORMATS:
+            return jsonify({"success": False, "message": f"format must be one of: {', '.join(IMPORT_FORMATS)}."}), 400
+        on_duplicate = request.args.get('on_duplicate', 'skip')
+        if on_duplicate not in ('skip', 'overwrite'):
+            return jsonify({"success": False, "message": "on_duplicate must be skip or overwrite."}), 400
+
+        try:
+            report = import_ingredients(db, text_stream(stream), file_format, overwrite=on_duplicate == 'overwrite')
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        return jsonify({"success": True, **report.to_dict()})
+    except Exception as e:
+        app.logger.error(f"Unexpected error in import_ingredients_api: {e}")
+        return jsonify({"success": False, "message": "An unexpected error occurred."}), 500
+
 @app.route('/api/calculate_meal', methods=['POST'])
 def calculate_meal_api():
     try:
         data = request.get_json()
-        meal_name = data.get('name', 'My Meal')
-        ingredient_inputs = data.get('ingredients') # Expected: list of {'name': str, 'weight': float}
-
-        if not ingredient_inputs:
-            return jsonify({"success": False, "message": "No ingredients provided for the meal."}), 400
-
-        meal = Meal(name=meal_name)
-        missing_ingredients = []
-
-        for item in ingredient_inputs:
-            ingredient_name = item.get('name')
-            weight = item.get('weight')
-
-            if not ingredient_name or weight is None:
-                return jsonify({"success": False, "message": "Invalid ingredient data: name and weight are required."}), 400
-
-            try:
-                weight_float = float(weight)
-                if weight_float < 0:
-                     return jsonify({"success": False, "message": f"Weight for {ingredient_name} cannot be negative."}), 400
-            except ValueError:
-                return jsonify({"success": False, "message": f"Invalid weight format for {ingredient_name}."}), 400
-
-
-            ingredient_obj = db.get_ingredient(ingredient_name)
-            if not ingredient_obj:
-                missing_ingredients.append(ingredient_name)
-            else:
-                meal.add_ingredient(ingredient_obj, weight_float)
-
-        if missing_ingredients:
-            return jsonify({"success": False, "message": f"The following ingredients were not found in the database: {', '.join(missing_ingredients)}. Please add them first."}), 404
-
-        if not meal._ingredients: # Accessing protected member, but Meal class uses it
-             return jsonify({"success": False, "message": "Meal is empty or contains only missing ingredients."}), 400
-
-
-        total_nutrition = meal.get_total_nutrition()
-        nutrition_per_100g = meal.get_nutrition_per_100g()
-        ingredients_list_details = meal.get_ingredients_list() # Detailed list with calculated nutrition for each ingredient
+        result = calculate_meals(db, [data], cache=meal_cache)[0]
+        if not result["success"]:
+            return jsonify({"success": False, "message": result["message"]}), result["status"]
 
         # Save to history if requested
         should_save_meal = data.get('save_meal', False) # Expect a boolean in the request
         if should_save_meal:
             # We need the ingredient list as {name, weight} for history, not the detailed one
-            ingredients_for_history = [{"name": item.get('name'), "weight_g": item.get('weight')} for item in ingredient_inputs]
+            ingredients_for_history = [{"name": item.get('name'), "weight_g": item.get('weight')} for item in data['ingredients']]
             history_manager.add_meal(
-                meal_name=meal.name,
+                meal_name=result["meal_name"],
                 ingredients_used=ingredients_for_history,
-                total_nutrition=total_nutrition,
-                nutrition_per_100g=nutrition_per_100g
+                total_nutrition=result["total_nutrition"],
+                nutrition_per_100g=result["nutrition_per_100g"]
             )
 
-        return jsonify({
-            "success": True,
-            "meal_name": meal.name,
-            "total_nutrition": total_nutrition,
-            "nutrition_per_100g": nutrition_per_100g,
-            "ingredients_list": ingredients_list_details
-        })
+        return jsonify(result)
 
     except ValueError as e:
         app.logger.error(f"ValueError in calculate_meal_api: {e}")
@@ -195,17 +393,163 @@ def calculate_meal_api():
         return jsonify({"success": False, "message": "An unexpected error occurred during meal calculation."}), 500
 
 
+@app.route('/api/calculate_meals', methods=['POST'])
+def calculate_meals_api():
+    """
+    Calculates many meals in one request.
+
+    Body: {"meals": [{"name": str, "ingredients": [{"name": str, "weight": float}], "save_meal": bool}, ...]}
+    Each meal gets its own result; a meal that fails validation does not fail the batch.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        meals = data.get('meals')
+        if not isinstance(meals, list) or not meals:
+            return jsonify({"success": False, "message": "Provide a non-empty 'meals' list."}), 400
+        max_batch_size = app.config["MAX_MEAL_BATCH_SIZE"]
+        if len(meals) > max_batch_size:
+            return jsonify({"success": False, "message": f"A batch may contain at most {max_batch_size} meals."}), 413
+
+        results = calculate_meals(db, meals, cache=meal_cache)
+        for meal_data, result in zip(meals, results):
+            if result["success"] and meal_data.get('save_meal', False):
+                history_manager.add_meal(
+                    meal_name=result["meal_name"],
+                    ingredients_used=[{"name": item.get('name'), "weight_g": item.get('weight')} for item in meal_data['ingredients']],
+                    total_nutrition=result["total_nutrition"],
+                    nutrition_per_100g=result["nutrition_per_100g"]
+                )
+
+        succeeded = sum(1 for result in results if result["success"])
+        return jsonify({
+            "success": True,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        })
+
+    except Exception as e:
+        app.logger.error(f"Unexpected error in calculate_meals_api: {e}")
+        return jsonify({"success": False, "message": "An unexpected error occurred during meal calculation."}), 500
+
+
+@app.route('/api/solve_meal', methods=['POST'])
+def solve_meal_api():
+    """
+    Weighs candidate ingredients so that the meal meets macro targets.
+
+    Body: {"name": str, "ingredients": [{"name": str, "min_weight": float, "max_weight": float}],
+           "targets": {"calories": float, "protein": float, "carbs": float, "fat": float}, "save_meal": bool}
+    Any subset of the targets may be given. The response has the fields of
+    /api/calculate_meal for the solved weights, plus "targets" and "deviation".
+    """
+    try:
+        data = request.get_json(silent=True)
+        result = solve_meal(db, data, cache=meal_cache)
+        if not result["success"]:
+            return jsonify({"success": False, "message": result["message"]}), result["status"]
+
+        if data.get('save_meal', False):
+            history_manager.add_meal(
+                meal_name=result["meal_name"],
+                ingredients_used=[{"name": line["name"], "weight_g": line["weight_g"]} for line in result["ingredients_list"]],
+                total_nutrition=result["total_nutrition"],
+                nutrition_per_100g=result["nutrition_per_100g"]
+            )
+
+        return jsonify(result)
+
+    except Exception as e:
+        app.logger.error(f"Unexpected error in solve_meal_api: {e}")
+        return jsonify({"success": False, "message": "An unexpected error occurred while solving the meal."}), 500
+
+
+@app.route('/api/meal_cache_stats', methods=['GET'])
+def meal_cache_stats_api():
+    """Size and hit/miss/eviction counters of the meal calculation cache."""
+    return jsonify(meal_cache.stats())
+
+
 # --- Meal History API Endpoints ---
 
+# Upper bound for the `limit` parameter of /api/get_meal_history.
+MAX_HISTORY_PAGE_SIZE = 500
+
 @app.route('/api/get_meal_history', methods=['GET'])
 def get_meal_history_api():
+    # Without query parameters the full history is returned, as before.
+    # With any of limit/before/after/from/to a single page is returned along
+    # with next_cursor (older meals) and prev_cursor (newer meals).
     try:
-        meal_summaries = history_manager.get_all_meals_summary()
-        return jsonify({"success": True, "history": meal_summaries})
+        page_params = ('limit', 'before', 'after', 'from', 'to')
+        if not any(param in request.args for param in page_params):
+            meal_summaries = history_manager.get_all_meals_summary()
+            return jsonify({"success": True, "history": meal_summaries})
+
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            return jsonify({"success": False, "message": "limit must be an integer."}), 400
+        if not 0 < limit <= MAX_HISTORY_PAGE_SIZE:
+            return jsonify({"success": False, "message": f"limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}."}), 400
+
+        try:
+            page = history_manager.get_meals_page(
+                limit=limit,
+                before=request.args.get('before'),
+                after=request.args.get('after'),
+                from_ts=request.args.get('from'),
+                to_ts=request.args.get('to'),
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        return jsonify({"success": True, **page})
     except Exception as e:
         app.logger.error(f"Error in get_meal_history_api: {e}")
         return jsonify({"success": False, "message": "Failed to retrieve meal history."}), 500
 
+@app.route('/api/nutrition_totals', methods=['GET'])
+def nutrition_totals_api():
+    # Totals per day, week or month over [from, to) (ISO dates, UTC days),
+    # served from rollups the history manager keeps up to date.
+    try:
+        try:
+            totals = history_manager.get_nutrition_totals(
+                from_ts=request.args.get('from'),
+                to_ts=request.args.get('to'),
+                bucket=request.args.get('bucket', 'day'),
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        return jsonify({"success": True, **totals})
+    except Exception as e:
+        app.logger.error(f"Error in nutrition_totals_api: {e}")
+        return jsonify({"success": False, "message": "Failed to compute nutrition totals."}), 500
+
+@app.route('/api/export_history', methods=['GET'])
+def export_history_api():
+    # Full meal entries, with their ingredient lines, oldest first, streamed
+    # in chunks as they are serialized: ?format=ndjson|csv|arrow&from=&to=.
+    file_format = request.args.get('format', 'ndjson')
+    try:
+        chunks = export_history(
+            history_manager.iter_meals(from_ts=request.args.get('from'), to_ts=request.args.get('to')),
+            file_format,
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    def logged(chunks):
+        try:
+            yield from chunks
+        except Exception as e:  # Headers are sent already; the client sees a truncated body
+            app.logger.error(f"Error in export_history_api: {e}")
+            raise
+
+    response = Response(stream_with_context(logged(chunks)), mimetype=EXPORT_MEDIA_TYPES[file_format])
+    response.headers["Content-Disposition"] = f"attachment; filename=meal_history.{file_format}"
+    return response
+
 @app.route('/api/get_meal_detail/<meal_id>', methods=['GET'])
 def get_meal_detail_api(meal_id):
     try:
@@ -236,11 +580,12 @@ if __name__ == '__main__':
     # Create the nutrition_tracker package directory and __init__.py if they don't exist
     # This ensures that 'from nutrition_tracker.ingredient import Ingredient' works
     # when running app.py directly for the first time in a clean environment.
-    import os
     if not os.path.exists("nutrition_tracker"):
         os.makedirs("nutrition_tracker")
     if not os.path.exists("nutrition_tracker/__init__.py"):
         with open("nutrition_tracker/__init__.py", "w") as f:
             pass # Empty file is fine to make it a package
 
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # The serving process, not the reloader's watcher
+        start_warmup()
     app.run(debug=True)
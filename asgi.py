@@ -0,0 +1,366 @@
+"""
+Asyncio serving mode for the Flask app.
+
+`application` is an ASGI app that serves the same Flask handlers as app.py.
+An event loop holds the connections, so thousands of idle or slow clients
+cost no threads; each request is handed to a pool of REQUEST_WORKERS threads
+only while its handler runs (a streamed body is produced there a part at a
+time, as the client takes it), and file writes never run on those threads:
+
+*   With NUTRITION_FLUSH_INTERVAL unset (or 0), changes are still written
+    before the response is sent, but by the single persistence thread. The
+    managers run in write-behind mode, and every request that may have
+    changed data (any method but GET, HEAD and OPTIONS) waits, without
+    holding a worker thread, for a flush on PERSISTENCE_EXECUTOR. Requests
+    that complete while a flush runs share the next one (group commit), so
+    a slow disk delays responses but neither ties up the workers nor costs
+    one write per request.
+*   With NUTRITION_FLUSH_INTERVAL set, the write-behind thread writes on its
+    own schedule, as in the threaded server.
+
+Run it with any ASGI server (e.g. `uvicorn asgi:application`), or with the
+built-in asyncio HTTP/1.1 server:
+
+    python asgi.py [--host 127.0.0.1] [--port 5000]
+
+The persistence mode is set with app.configure_persistence() when this
+module is imported, before the managers are loaded. If a manager was loaded
+already (app.py used before this module was imported), it keeps writing each
+change on the request thread, and a warning is logged.
+"""
+import argparse
+import asyncio
+import contextvars
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+
+import app as app_module
+
+# Write-behind interval used as a backstop when every mutating request is flushed anyway.
+_BACKSTOP_FLUSH_INTERVAL = 5.0
+FLUSH_BEFORE_RESPONSE = app_module.FLUSH_INTERVAL is None
+if FLUSH_BEFORE_RESPONSE and not app_module.configure_persistence(_BACKSTOP_FLUSH_INTERVAL):
+    app_module.app.logger.warning("The managers were loaded before asgi.py configured write-behind; "
+                                  "changes are written on the request threads.")
+
+# Threads that run Flask handlers; the event loop itself never blocks on them.
+REQUEST_WORKERS = int(os.environ.get("NUTRITION_ASGI_WORKERS", "32"))
+# Maximum request body accepted by the built-in server, in bytes.
+MAX_BODY_SIZE = 16 * 1024 * 1024
+# Response bodies are read from the handler and sent in parts of about this many bytes.
+RESPONSE_PART_SIZE = 64 * 1024
+
+REQUEST_EXECUTOR = ThreadPoolExecutor(max_workers=REQUEST_WORKERS, thread_name_prefix="asgi-request")
+# Runs the flushes, one at a time.
+PERSISTENCE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asgi-persistence")
+
+_READ_ONLY_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+_SAVE_FAILED_BODY = b'{"message":"Failed to save changes.","success":false}\n'
+
+
+def _wsgi_environ(scope, body):
+    """Builds the WSGI environ of an ASGI HTTP request."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class _WsgiResponse:
+    """
+    The response of the Flask app to one request, produced on the worker
+    threads a part at a time, so a streamed body (e.g. /api/export_history)
+    is never held whole. Every step runs in the same context, which the
+    request context of a streamed handler lives in across worker threads.
+    """
+
+    def __init__(self, environ):
+        """Runs the handler and reads the first part of the body (on a worker thread)."""
+        self._context = contextvars.copy_context()
+        self._result = self._context.run(app_module.app.wsgi_app, environ, self._start_response)
+        self._iterator = iter(self._result)
+        self.done = False
+        self.first = self.read()
+
+    def _start_response(self, status, headers, exc_info=None):
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    def read(self, size=RESPONSE_PART_SIZE):
+        """Returns the next `size` bytes or more of the body; sets `done` (and closes) after the last part."""
+        parts, length = [], 0
+        try:
+            while length < size:
+                chunk = self._context.run(next, self._iterator, None)
+                if chunk is None:
+                    self.close()
+                    break
+                parts.append(chunk)
+                length += len(chunk)
+        except BaseException:
+            self.close()
+            raise
+        return b"".join(parts)
+
+    def close(self):
+        if not self.done:
+            self.done = True
+            if hasattr(self._result, "close"):
+                self._context.run(self._result.close)
+
+
+def _flush_managers():
+    app_module.db.flush()
+    app_module.history_manager.flush()
+
+
+class _GroupFlush:
+    """Runs flushes one at a time; every caller that arrives while one runs shares the next one."""
+
+    def __init__(self, flush, executor):
+        self._flush = flush
+        self._executor = executor
+        self._next = None  # Future of the flush that starts once the running one is done
+        self._running = False
+
+    async def __call__(self):
+        if self._next is None:
+            self._next = asyncio.get_running_loop().create_future()
+            if not self._running:
+                asyncio.ensure_future(self._run())
+        await asyncio.shield(self._next)  # A cancelled caller must not cancel the others' flush
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self._running = True
+        try:
+            while self._next is not None:
+                future, self._next = self._next, None
+                try:
+                    await loop.run_in_executor(self._executor, self._flush)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(None)
+        finally:
+            self._running = False
+
+
+_flush_before_response = _GroupFlush(_flush_managers, PERSISTENCE_EXECUTOR)
+
+
+def _close_managers():
+    app_module.db.close()
+    app_module.history_manager.close()
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _lifespan(receive, send):
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            app_module.start_warmup()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await loop.run_in_executor(PERSISTENCE_EXECUTOR, _close_managers)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point serving the Flask routes of app.py."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        raise NotImplementedError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    body = await _read_body(receive)
+    if body is None:
+        return  # The client went away before sending its request
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(REQUEST_EXECUTOR, _WsgiResponse, _wsgi_environ(scope, body))
+    try:
+        status, headers, content = response.status, response.headers, response.first
+        if FLUSH_BEFORE_RESPONSE and scope["method"] not in _READ_ONLY_METHODS:
+            parts = [content]
+            while not response.done:  # The whole body first: the handler may still be changing data
+                parts.append(await loop.run_in_executor(REQUEST_EXECUTOR, response.read))
+            content = b"".join(parts)
+            try:
+                await _flush_before_response()
+            except Exception as e:  # The changes stay pending and are retried by the next flush
+                app_module.app.logger.error(f"Error saving changes for {scope['method']} {scope['path']}: {e}")
+                status, content = 500, _SAVE_FAILED_BODY
+                headers = [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content, "more_body": not response.done})
+        while not response.done:
+            content = await loop.run_in_executor(REQUEST_EXECUTOR, response.read)
+            await send({"type": "http.response.body", "body": content, "more_body": not response.done})
+    finally:
+        if not response.done:  # The client went away mid-stream
+            await loop.run_in_executor(REQUEST_EXECUTOR, response.close)
+
+
+async def _handle_connection(reader, writer, app=application):
+    """Serves HTTP/1.1 requests (with keep-alive) from one connection through an ASGI app."""
+    try:
+        while True:
+            try:
+                request_line = await reader.readline()  # ValueError if longer than the reader's limit
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = []
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+                fields = dict(headers)
+                length = int(fields.get(b"content-length", b"0"))
+                if not 0 <= length <= MAX_BODY_SIZE or b"transfer-encoding" in fields:
+                    raise ValueError("unsupported request body")
+            except ValueError:
+                writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                break
+            expect = fields.get(b"expect", b"").lower()
+            if expect == b"100-continue" and length:
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")  # Clients such as curl wait for it before uploading
+            elif expect and expect != b"100-continue":
+                writer.write(b"HTTP/1.1 417 Expectation Failed\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                break
+            body = await reader.readexactly(length) if length else b""
+            path, _, query = target.partition("?")
+            connection = fields.get(b"connection", b"").lower()
+            keep_alive = connection != b"close" and (version != "HTTP/1.0" or connection == b"keep-alive")
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": version.split("/")[-1],
+                "method": method.upper(), "scheme": "http", "path": unquote(path), "raw_path": path.encode("latin-1"),
+                "query_string": query.encode("latin-1"), "root_path": "", "headers": headers,
+                "client": writer.get_extra_info("peername"), "server": writer.get_extra_info("sockname")[:2],
+            }
+            messages = [{"type": "http.request", "body": body, "more_body": False}]
+            sent = {}
+
+            async def receive():
+                if not messages:
+                    await asyncio.Future()  # No disconnect detection while the request is in flight
+                return messages.pop()
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    sent["status"], sent["headers"] = message["status"], message.get("headers", [])
+                    return
+                content, more = message.get("body", b""), message.get("more_body", False)
+                if "chunked" not in sent:
+                    # A body sent in one message gets a Content-Length; a streamed one is
+                    # sent with chunked encoding, or to HTTP/1.0 clients until the connection closes.
+                    sent["chunked"] = more and version == "HTTP/1.1"
+                    sent["keep_alive"] = keep_alive and (not more or sent["chunked"])
+                    head = [f"HTTP/1.1 {sent['status']} {_reason(sent['status'])}".encode("latin-1")]
+                    head += [name + b": " + value for name, value in sent["headers"]
+                             if name not in (b"content-length", b"connection", b"transfer-encoding")]
+                    if sent["chunked"]:
+                        head.append(b"Transfer-Encoding: chunked")
+                    elif not more:
+                        head.append(b"Content-Length: " + str(len(content)).encode("latin-1"))
+                    head.append(b"Connection: keep-alive" if sent["keep_alive"] else b"Connection: close")
+                    writer.write(b"\r\n".join(head) + b"\r\n\r\n")
+                if method.upper() != "HEAD":
+                    if not sent["chunked"]:
+                        writer.write(content)
+                    else:
+                        if content:
+                            writer.write(b"%x\r\n%s\r\n" % (len(content), content))
+                        if not more:
+                            writer.write(b"0\r\n\r\n")
+                await writer.drain()  # Also holds back a streaming handler while the client is slow
+
+            await app(scope, receive, send)
+            if "chunked" not in sent:
+                await send({"type": "http.response.body"})
+            keep_alive = sent["keep_alive"]
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def _reason(status):
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+async def serve(host="127.0.0.1", port=5000, ready=None):
+    """Runs the built-in asyncio HTTP server until cancelled, then writes pending changes."""
+    app_module.start_warmup()  # Loads the stores while the server starts accepting connections
+    server = await asyncio.start_server(_handle_connection, host, port, backlog=4096)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await asyncio.get_running_loop().run_in_executor(PERSISTENCE_EXECUTOR, _close_managers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the nutrition tracker from an asyncio event loop.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args(argv)
+    print(f"Serving on http://{args.host}:{args.port} ({REQUEST_WORKERS} request workers)")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
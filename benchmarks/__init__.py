@@ -0,0 +1,2 @@
+# This file makes the 'benchmarks' directory a Python package,
+# so the scripts can be run with 'python -m benchmarks.<name>'.
@@ -0,0 +1,166 @@
+"""
+Benchmark for the asyncio serving mode (asgi.py) against the threaded server.
+
+Starts each server in a subprocess, on a fresh copy of a small catalog, and
+drives it from --clients concurrent connections that alternate between
+logging a meal (POST /api/calculate_meal with save_meal, which writes the
+history) and reading a page of history. Every history write is slowed down by
+--write-delay seconds to stand in for a slow disk. The history is kept in
+the append-only journal by default (--storage), so a write costs about the
+same whatever the history size; with `json` every write rewrites the whole
+file. Reports requests per second and latency percentiles.
+
+The threaded server is Werkzeug's, as started by `app.run()` with threading
+(one thread per connection, one connection per request); the async server
+is the built-in one of asgi.py (keep-alive connections on one event loop).
+Both write every change before the response is sent.
+
+Usage:
+    python -m benchmarks.bench_async_server [--clients 10 100 500] [--requests 2000] [--write-delay 0.01]
+                                            [--storage journal|json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SERVER = r"""
+import asyncio, os, sys, time
+sys.path.insert(0, sys.argv[1])
+mode, delay = sys.argv[2], float(sys.argv[3])
+from nutrition_tracker.history_journal import JournaledMealHistoryManager
+from nutrition_tracker.history_manager import MealHistoryManager
+
+def slow(write_pending):
+    def write(self):
+        time.sleep(delay)  # Simulated slow disk
+        return write_pending(self)
+    return write
+
+# Patched before the managers are built, so write-behind threads see it too.
+for cls in (MealHistoryManager, JournaledMealHistoryManager):
+    cls._write_pending = slow(cls._write_pending)
+if mode == "async":
+    import asgi
+import app as app_module
+from werkzeug.serving import make_server
+
+def ready(port):
+    print("PORT", port, flush=True)
+
+if mode == "async":
+    asyncio.run(asgi.serve("127.0.0.1", 0, ready=ready))
+else:
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    ready(server.server_port)
+    server.serve_forever()
+"""
+
+
+class Connection:
+    """A minimal HTTP/1.1 client connection that reconnects when the server closes it."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + payload)
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()
+        if headers.get("connection", "").lower() == "close" or "content-length" not in headers:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def drive(port, clients, requests):
+    """Sends `requests` requests from `clients` concurrent clients; returns (seconds, latencies, errors)."""
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        connection = Connection(port)
+        for i in remaining:
+            start = time.perf_counter()
+            try:
+                if i % 2:
+                    status = await connection.request("GET", "/api/get_meal_history?limit=20")
+                else:
+                    status = await connection.request("POST", "/api/calculate_meal", {
+                        "name": f"Meal {i}", "save_meal": True,
+                        "ingredients": [{"name": "Oats", "weight": 80}, {"name": "Milk", "weight": 200}]})
+            except (OSError, asyncio.IncompleteReadError, IndexError):
+                status = None
+                connection.close()
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+        connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+def run(mode, clients, requests, write_delay, storage):
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "ingredient_database.json"), "w") as f:
+            json.dump({"Oats": {"name": "Oats", "calories": 389, "protein": 16.9, "carbs": 66, "fat": 6.9},
+                       "Milk": {"name": "Milk", "calories": 42, "protein": 3.4, "carbs": 5, "fat": 1}}, f)
+        env = dict(os.environ, NUTRITION_FLUSH_INTERVAL="0", NUTRITION_HISTORY_STORAGE=storage)
+        server = subprocess.Popen([sys.executable, "-c", _SERVER, _REPO, mode, str(write_delay)], cwd=tmp, env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            port = next(int(line.split()[1]) for line in server.stdout if line.startswith("PORT "))
+            seconds, latencies, errors = asyncio.run(drive(port, clients, requests))
+        finally:
+            server.terminate()
+            server.wait()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {"mode": mode, "clients": clients, "rps": requests / seconds, "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99), "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--write-delay", type=float, default=0.01)
+    parser.add_argument("--storage", choices=["journal", "json"], default="journal")
+    args = parser.parse_args()
+
+    print(f"{'clients':>7} | {'mode':>8} | {'req/s':>8} | {'p50':>9} | {'p99':>9} | {'errors':>6}")
+    for clients in args.clients:
+        for mode in ("threaded", "async"):
+            r = run(mode, clients, args.requests, args.write_delay, args.storage)
+            print(f"{clients:>7} | {mode:>8} | {r['rps']:>8.0f} | {r['p50_ms']:>6.1f} ms | "
+                  f"{r['p99_ms']:>6.1f} ms | {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark for MealHistoryManager.get_meal_by_id and delete_meal.
+
+Compares the id -> position index against the previous linear scan /
+list-comprehension implementation at 10k, 100k and 1M history entries.
+Persistence is disabled so only the in-memory operations are timed.
+
+Usage:
+    python -m benchmarks.bench_history_index [--sizes 10000 100000 1000000]
+"""
+import argparse
+import random
+import time
+import uuid
+
+from nutrition_tracker.history_manager import MealHistoryManager
+
+
+class _InMemoryHistoryManager(MealHistoryManager):
+    """MealHistoryManager without any file I/O."""
+
+    def __init__(self, history):
+        self.filepath = None
+        self.history = history
+        self._rebuild_index()
+
+    def _persist_add(self, meal_entry):
+        pass
+
+    def _persist_delete(self, meal_id):
+        pass
+
+
+def _make_history(size):
+    # The nested dicts are shared between entries to keep 1M entries affordable.
+    ingredients_used = [{"name": "Chicken Breast", "weight_g": 150}]
+    total_nutrition = {"total_calories": 500, "total_protein_g": 40, "total_carbs_g": 30, "total_fat_g": 10}
+    per_100g = {"calories_per_100g": 200}
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": "Meal",
+            "timestamp": f"2024-01-01T00:00:00.{i:06d}+00:00",
+            "ingredients_used": ingredients_used,
+            "total_nutrition": total_nutrition,
+            "nutrition_per_100g": per_100g,
+        }
+        for i in range(size)
+    ]
+
+
+def _linear_get(history, meal_id):
+    for meal in history:
+        if meal.get("id") == meal_id:
+            return meal
+    return None
+
+
+def _time_per_op(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list)
+
+
+def run(size, lookups=1000, deletes=1000, baseline_ops=20):
+    history = _make_history(size)
+    rng = random.Random(size)
+    ids = [meal["id"] for meal in history]
+
+    manager = _InMemoryHistoryManager(history)
+    lookup_ids = [(rng.choice(ids),) for _ in range(lookups)]
+    indexed_get = _time_per_op(manager.get_meal_by_id, lookup_ids)
+    delete_ids = [(meal_id,) for meal_id in rng.sample(ids, deletes)]
+    indexed_delete = _time_per_op(manager.delete_meal, delete_ids)
+
+    # Previous implementation, with fewer repetitions since each op is O(n).
+    baseline_history = list(manager.history)
+    linear_get = _time_per_op(lambda meal_id: _linear_get(baseline_history, meal_id),
+                              [(rng.choice(ids),) for _ in range(baseline_ops)])
+
+    def comprehension_delete(meal_id):
+        nonlocal baseline_history
+        baseline_history = [meal for meal in baseline_history if meal.get("id") != meal_id]
+
+    remaining_ids = [meal["id"] for meal in baseline_history]
+    comprehension_del = _time_per_op(comprehension_delete,
+                                     [(meal_id,) for meal_id in rng.sample(remaining_ids, baseline_ops)])
+    return {
+        "size": size,
+        "indexed_get_us": indexed_get * 1e6,
+        "linear_get_us": linear_get * 1e6,
+        "indexed_delete_us": indexed_delete * 1e6,
+        "comprehension_delete_us": comprehension_del * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'entries':>10} | {'get (index)':>12} | {'get (scan)':>12} | {'delete (index)':>14} | {'delete (rebuild)':>16}")
+    for size in args.sizes:
+        r = run(size)
+        print(f"{r['size']:>10} | {r['indexed_get_us']:>9.2f} us | {r['linear_get_us']:>9.0f} us | "
+              f"{r['indexed_delete_us']:>11.2f} us | {r['comprehension_delete_us']:>13.0f} us")
+
+
+if __name__ == "__main__":
+    main()
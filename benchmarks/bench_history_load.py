@@ -0,0 +1,101 @@
+"""
+Benchmark for loading the meal history at startup.
+
+Writes a synthetic history as a JSON file and as an NDJSON journal (lazy
+layout, with summaries first) and loads each in a fresh subprocess,
+reporting wall time and the resident set size added by the load for the
+JSON storage, the eager journal and the lazy journal. Every meal lists
+--lines ingredient lines, so the detail volume can be varied independently
+of the number of meals.
+
+Usage:
+    python -m benchmarks.bench_history_load [--sizes 10000 100000] [--lines 5 20] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.bench_ingredient_load import measure_child
+
+_CHILD = r"""
+import gc, json, sys, time
+from contextlib import redirect_stdout
+from io import StringIO
+from nutrition_tracker.history_journal import JournaledMealHistoryManager
+from nutrition_tracker.history_manager import MealHistoryManager
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+path, mode = sys.argv[1], sys.argv[2]
+gc.collect()
+before = rss_kib()
+start = time.perf_counter()
+with redirect_stdout(StringIO()):
+    if mode == "json":
+        hm = MealHistoryManager(filepath=path)
+    else:
+        hm = JournaledMealHistoryManager(filepath=path, legacy_filepath=None, lazy_details=mode == "lazy")
+elapsed = time.perf_counter() - start
+gc.collect()
+print(json.dumps({"seconds": elapsed, "rss_mib": (rss_kib() - before) / 1024, "count": len(hm.history)}))
+"""
+
+
+def make_meal(i, lines):
+    return {
+        "id": f"{i:08x}-0000-4000-8000-000000000000",
+        "name": f"Meal {i}",
+        "timestamp": f"2024-01-01T00:00:{i % 60:02d}.{i:06d}+00:00",
+        "ingredients_used": [
+            {"name": f"Ingredient {(i + k) % 1000}", "weight_g": 50 + k, "calories": 80.5,
+             "protein_g": 5.25, "carbs_g": 10.5, "fat_g": 2.25}
+            for k in range(lines)
+        ],
+        "total_nutrition": {"total_calories": 400, "total_protein_g": 30,
+                            "total_carbs_g": 40, "total_fat_g": 12, "total_weight_g": 300},
+        "nutrition_per_100g": {"calories_per_100g": 133, "protein_per_100g": 10,
+                               "carbs_per_100g": 13, "fat_per_100g": 4},
+    }
+
+
+def write_history(tmp, size, lines):
+    """Writes the same meals as a JSON list and as a lazy-layout journal."""
+    json_path = os.path.join(tmp, f"history_{size}_{lines}.json")
+    journal_path = os.path.join(tmp, f"history_{size}_{lines}.ndjson")
+    meals = (make_meal(i, lines) for i in range(size))
+    with open(json_path, "w") as json_file, open(journal_path, "w") as journal_file:
+        json_file.write("[")
+        for i, meal in enumerate(meals):
+            json_file.write(("," if i else "") + json.dumps(meal))
+            summary = {key: meal[key] for key in ("id", "name", "timestamp", "total_nutrition")}
+            journal_file.write('{"op":"add","summary":%s,"meal":%s}\n' % (
+                json.dumps(summary, separators=(",", ":")), json.dumps(meal, separators=(",", ":"))))
+        json_file.write("]")
+    return json_path, journal_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--lines", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'meals':>8} | {'lines':>5} | {'storage':>7} | {'load':>8} | {'RSS added':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for lines in args.lines:
+                json_path, journal_path = write_history(tmp, size, lines)
+                for mode, path in (("json", json_path), ("journal", journal_path), ("lazy", journal_path)):
+                    r = measure_child(_CHILD, [path, mode], args.repeat)
+                    print(f"{size:>8} | {lines:>5} | {mode:>7} | {r['seconds']:>6.2f} s | {r['rss_mib']:>6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark for the memory taken by meal history entries.
+
+Builds N entries shaped like the ones app.py logs, each decoded from its own
+JSON text as when loading a history file, and keeps them either in a list
+of dicts or in MealColumns. Each run happens in a fresh subprocess; the
+report shows the resident set size added by the entries and the time to
+read every summary and 10k full entries back.
+
+Usage:
+    python -m benchmarks.bench_history_memory [--sizes 100000 1000000] [--repeat 1]
+"""
+import argparse
+
+from benchmarks.bench_ingredient_load import measure_child
+
+_CHILD = r"""
+import gc, json, sys, time, uuid
+from nutrition_tracker.history_manager import _summarize
+from nutrition_tracker.meal_columns import MealColumns
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def meal_json(i):
+    return json.dumps({
+        "id": str(uuid.UUID(int=i * 0x9E3779B97F4A7C15 % (1 << 128), version=4)),
+        "name": ("Breakfast", "Lunch", "Dinner", "Snack")[i % 4],
+        "timestamp": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00.{i % 1000000:06d}+00:00",
+        "ingredients_used": [{"name": f"Ingredient {(i * 7 + k) % 2000}", "weight_g": 50 + k} for k in range(3)],
+        "total_nutrition": {"total_calories": 420.5, "total_protein_g": 31.25, "total_carbs_g": 40.75,
+                            "total_fat_g": 12.5, "total_weight_g": 153.0},
+        "nutrition_per_100g": {"calories_per_100g": 274.84, "protein_per_100g": 20.42,
+                               "carbs_per_100g": 26.63, "fat_per_100g": 8.17},
+    })
+
+size, mode = int(sys.argv[1]), sys.argv[2]
+gc.collect()
+before = rss_kib()
+history = [] if mode == "dicts" else MealColumns()
+for i in range(size):
+    history.append(json.loads(meal_json(i)))
+gc.collect()
+rss_mib = (rss_kib() - before) / 1024
+start = time.perf_counter()
+if mode == "dicts":
+    for meal in history:
+        _summarize(meal)
+else:
+    for position in range(len(history)):
+        history.summary(position)
+summaries = time.perf_counter() - start
+start = time.perf_counter()
+for position in range(0, size, max(1, size // 10000)):
+    history[position]
+print(json.dumps({"seconds": summaries, "entries_seconds": time.perf_counter() - start, "rss_mib": rss_mib}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'meals':>9} | {'storage':>7} | {'RSS added':>10} | {'bytes/meal':>10} | {'all summaries':>13} | {'10k entries':>11}")
+    for size in args.sizes:
+        for mode in ("dicts", "columns"):
+            r = measure_child(_CHILD, [str(size), mode], args.repeat)
+            print(f"{size:>9} | {mode:>7} | {r['rss_mib']:>6.1f} MiB | {r['rss_mib'] * 1048576 / size:>10.0f} | "
+                  f"{r['seconds']:>11.2f} s | {r['entries_seconds']:>9.3f} s")
+
+
+if __name__ == "__main__":
+    main()
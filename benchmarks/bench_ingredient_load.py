@@ -0,0 +1,81 @@
+"""
+Benchmark for IngredientDatabase.load_ingredients.
+
+Writes a synthetic catalog in the database's own JSON format and loads it
+in a fresh subprocess per run, reporting wall time and the resident set
+size added by the load. "catalog" loads only the Ingredient objects;
+"full" also builds the search index and nutrient matrix.
+
+Usage:
+    python -m benchmarks.bench_ingredient_load [--sizes 100000 500000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import write_catalog
+
+_CHILD = r"""
+import gc, json, sys, time
+from contextlib import redirect_stdout
+from io import StringIO
+from nutrition_tracker.database import IngredientDatabase
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+class CatalogOnly(IngredientDatabase):
+    def _replace_ingredients(self, ingredients):
+        self._ingredients = ingredients  # Without the search index and nutrient matrix
+
+cls = CatalogOnly if sys.argv[2] == "catalog" else IngredientDatabase
+gc.collect()
+before = rss_kib()
+start = time.perf_counter()
+with redirect_stdout(StringIO()):
+    db = cls(filepath=sys.argv[1])
+elapsed = time.perf_counter() - start
+gc.collect()
+print(json.dumps({"seconds": elapsed, "rss_mib": (rss_kib() - before) / 1024, "count": len(db._ingredients)}))
+"""
+
+
+def measure_child(child, argv, repeat):
+    """Runs the `child` script `repeat` times in fresh interpreters; returns the fastest run's JSON report."""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", child, *argv],
+                             check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return min(runs, key=lambda r: r["seconds"])
+
+
+def measure(path, mode, repeat):
+    return measure_child(_CHILD, [path, mode], repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'ingredients':>11} | {'mode':>7} | {'load':>8} | {'RSS added':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"catalog_{size}.json")
+            write_catalog(path, size)
+            for mode in ("catalog", "full"):
+                r = measure(path, mode, args.repeat)
+                print(f"{size:>11} | {mode:>7} | {r['seconds']:>6.2f} s | {r['rss_mib']:>6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for starting the web app.
+
+Writes a synthetic catalog and meal history under the file names app.py
+uses and starts the app in fresh interpreters, reporting:
+    import      time to import app.py (the managers are created lazily)
+    meal        time until a first (unsaved) /api/calculate_meal response,
+                which only waits for the catalog, not for the history
+    ready       time until both stores are loaded (/ready answers 200)
+for plain JSON loading and for NUTRITION_SNAPSHOT=1 (measured once the
+snapshots exist). Before lazy initialization, importing app.py took the
+"ready" time.
+
+Usage:
+    python -m benchmarks.bench_startup [--ingredients 10000 100000] [--meals 10000 100000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import make_meal, write_catalog
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, time
+from contextlib import redirect_stdout
+from io import StringIO
+start = time.perf_counter()
+with redirect_stdout(StringIO()):
+    import app
+    imported = time.perf_counter()
+    app.start_warmup()
+    client = app.app.test_client()
+    meal = {"name": "First", "ingredients": [{"name": "Ingredient 0000001", "weight": 100}]}
+    assert client.post("/api/calculate_meal", json=meal).status_code == 200
+    first_meal = time.perf_counter()
+    app._warmup_thread.join()
+    assert client.get("/ready").status_code == 200
+    ready = time.perf_counter()
+print(json.dumps({"seconds": ready - start, "import": imported - start, "meal": first_meal - start}))
+"""
+
+
+def write_app_history(path, count, catalog_size):
+    """Writes a history of `count` meals shaped like the ones app.py logs (name and weight per line)."""
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(count):
+            meal = make_meal(i, 3, catalog_size)
+            meal["ingredients_used"] = [{"name": line["name"], "weight_g": line["weight_g"]}
+                                        for line in meal["ingredients_used"]]
+            f.write(("," if i else "") + json.dumps(meal))
+        f.write("]")
+
+
+def measure(directory, snapshot, repeat):
+    """Starts the app `repeat` times in `directory`; returns the fastest run's report."""
+    env = dict(os.environ, PYTHONPATH=_ROOT, NUTRITION_SNAPSHOT="1" if snapshot else "0")
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _CHILD], cwd=directory, env=env,
+                             check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return min(runs, key=lambda r: r["seconds"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--meals", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'ingredients':>11} | {'meals':>8} | {'loading':>8} | {'import':>8} | {'meal':>8} | {'ready':>8}")
+    for ingredients, meals in zip(args.ingredients, args.meals):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_catalog(os.path.join(tmp, "ingredient_database.json"), ingredients)
+            write_app_history(os.path.join(tmp, "meal_history.json"), meals, ingredients)
+            measure(tmp, True, 1)  # Writes the snapshots
+            for snapshot in (False, True):
+                r = measure(tmp, snapshot, args.repeat)
+                print(f"{ingredients:>11} | {meals:>8} | {'snapshot' if snapshot else 'json':>8} | "
+                      f"{r['import']:>6.2f} s | {r['meal']:>6.2f} s | {r['seconds']:>6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
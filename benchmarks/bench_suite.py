@@ -0,0 +1,286 @@
+"""
+Benchmark suite for the nutrition_tracker core, storage and API.
+
+Runs every benchmark on synthetic data (benchmarks/synthetic.py) at sizes
+scaled by --scale and writes the results as JSON, so that two runs, e.g.
+before and after a change, can be compared with --compare. Each result
+holds the min, median and max seconds of --repeat runs and the time per
+item (row, line, meal or request) of the fastest run.
+
+Groups:
+    core     Ingredient construction (one by one and Ingredient.from_rows),
+             Meal.add_ingredient, get_total_nutrition and
+             get_ingredients_list, on 1k-1M ingredients / lines.
+    storage  load_ingredients / save_ingredients (JSON catalog) and
+             _load_history / _save_history (JSON history), on 1k-1M rows.
+    api      Every /api route (and /metrics) through the Flask test client,
+             with a catalog and a history of 1k-100k rows each. Writes go to
+             the JSON history, which is rewritten on every change, hence the
+             smaller sizes.
+
+Usage:
+    python -m benchmarks.bench_suite [--scale 1.0] [--groups core storage api] [--repeat 5]
+                                     [--requests 20] [--output benchmark_results.json]
+                                     [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import (
+    BASE_SIZES, ingredient_name, ingredient_rows, make_meal, scaled_sizes, write_catalog, write_history,
+)
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.history_export import arrow_available
+from nutrition_tracker.history_manager import MealHistoryManager
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.meal import Meal
+from nutrition_tracker.nutrient_matrix import numpy_available
+
+_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GROUPS = ("core", "storage", "api")
+# Base sizes of the api group (times --scale).
+API_BASE_SIZES = BASE_SIZES[:3]
+# Ingredient lines per synthetic meal.
+MEAL_LINES = 3
+
+
+def measure(function, repeat, number=1, setup=None):
+    """
+    Times `function` `repeat` times, each run calling it `number` times after
+    calling `setup` (untimed). Returns the seconds per call of every run.
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        runs.append((time.perf_counter() - start) / number)
+    return runs
+
+
+def result(group, name, size, runs, items):
+    """Builds a result record from the seconds of each run; `items` is the work done by one run."""
+    best = min(runs)
+    return {
+        "group": group, "name": name, "size": size, "items": items, "runs": len(runs),
+        "min_s": best, "median_s": statistics.median(runs), "max_s": max(runs),
+        "per_item_us": best / items * 1e6 if items else None,
+    }
+
+
+def bench_core(size, repeat, tmp):
+    rows = list(ingredient_rows(size))
+    yield result("core", "Ingredient()", size, measure(lambda: [Ingredient(*row) for row in rows], repeat), size)
+    yield result("core", "Ingredient.from_rows", size, measure(lambda: Ingredient.from_rows(rows), repeat), size)
+
+    ingredients = Ingredient.from_rows(rows)
+    meal = None
+
+    def fill_meal():
+        nonlocal meal
+        meal = Meal("Benchmark")
+        for ingredient in ingredients:
+            meal.add_ingredient(ingredient, 100.0)
+    yield result("core", "Meal.add_ingredient", size, measure(fill_meal, repeat), size)
+    yield result("core", "Meal.get_total_nutrition", size, measure(meal.get_total_nutrition, repeat, number=100), 1)
+    yield result("core", "Meal.get_ingredients_list", size, measure(meal.get_ingredients_list, repeat), size)
+
+
+def bench_storage(size, repeat, tmp):
+    catalog_path = os.path.join(tmp, f"storage_catalog_{size}.json")
+    write_catalog(catalog_path, size)
+    db = IngredientDatabase(filepath=catalog_path)
+    yield result("storage", "load_ingredients", size, measure(db.load_ingredients, repeat), size)
+    yield result("storage", "save_ingredients", size, measure(db.save_ingredients, repeat), size)
+    del db
+
+    history_path = os.path.join(tmp, f"storage_history_{size}.json")
+    write_history(history_path, size, MEAL_LINES, catalog_size=size)
+    hm = MealHistoryManager(filepath=history_path)
+    yield result("storage", "_load_history", size, measure(hm._load_history, repeat), size)
+    yield result("storage", "_save_history", size, measure(hm._save_history, repeat), size)
+
+
+def _api_requests(size, requests):
+    """
+    The requests of the api group as (label, method, path, kwargs, expected
+    status, count) in the order they run: later ones rely on the data earlier ones add.
+    """
+    writes = max(1, requests // 4)
+    meal = {"name": "Lunch", "ingredients": [{"name": ingredient_name(i % size), "weight": 100 + i} for i in range(5)]}
+    batch = {"meals": [dict(meal, name=f"Meal {i}", ingredients=meal["ingredients"][:1 + i % 5]) for i in range(50)]}
+    meal_ids = [make_meal(i, MEAL_LINES, size)["id"] for i in range(size)]
+    new_names = [f"Benchmark Added {i}" for i in range(writes)]
+
+    def import_body(i):
+        rows = "".join(f"Imported {i}-{k},120,5,20,2,\n" for k in range(100))
+        return {"data": ("name,calories,protein,carbs,fat,portion_size\n" + rows).encode(),
+                "content_type": "text/csv"}
+
+    return [
+        ("GET /api/get_ingredients", "GET", lambda i: ("/api/get_ingredients", {}), 200, requests),
+        ("GET /api/get_ingredients (304)", "GET", lambda i: ("/api/get_ingredients", "etag"), 304, requests),
+        ("GET /api/search_ingredients", "GET", lambda i: (f"/api/search_ingredients?q=ingredient {i % 10}", {}),
+         200, requests),
+        ("POST /api/add_ingredient", "POST", lambda i: ("/api/add_ingredient", {"json": {
+            "name": new_names[i], "calories": 100, "protein": 5, "carbs": 10, "fat": 2}}), 200, writes),
+        ("DELETE /api/delete_ingredient/<ingredient_name>", "DELETE",
+         lambda i: (f"/api/delete_ingredient/{new_names[i]}", {}), 200, writes),
+        ("POST /api/import_ingredients (100 rows)", "POST",
+         lambda i: ("/api/import_ingredients", import_body(i)), 200, writes),
+        ("POST /api/calculate_meal", "POST", lambda i: ("/api/calculate_meal", {"json": dict(
+            meal, ingredients=[{"name": ingredient_name((i * 5 + k) % size), "weight": 100} for k in range(5)])}),
+         200, requests),
+        ("POST /api/calculate_meal (save_meal)", "POST",
+         lambda i: ("/api/calculate_meal", {"json": dict(meal, save_meal=True)}), 200, writes),
+        ("POST /api/calculate_meals (50 meals)", "POST", lambda i: ("/api/calculate_meals", {"json": batch}),
+         200, requests),
+        ("GET /api/meal_cache_stats", "GET", lambda i: ("/api/meal_cache_stats", {}), 200, requests),
+        ("GET /api/get_meal_history (50)", "GET", lambda i: ("/api/get_meal_history?limit=50", {}), 200, requests),
+        ("GET /api/get_meal_history (all)", "GET", lambda i: ("/api/get_meal_history", {}), 200, writes),
+        ("GET /api/nutrition_totals (week)", "GET", lambda i: ("/api/nutrition_totals?bucket=week", {}),
+         200, requests),
+        ("GET /api/export_history (ndjson)", "GET", lambda i: ("/api/export_history", {}), 200, writes),
+        ("GET /api/export_history (csv)", "GET", lambda i: ("/api/export_history?format=csv", {}), 200, writes),
+        ("GET /api/get_meal_detail/<meal_id>", "GET",
+         lambda i: (f"/api/get_meal_detail/{meal_ids[(i * 7919) % size]}", {}), 200, requests),
+        ("DELETE /api/delete_meal/<meal_id>", "DELETE",
+         lambda i: (f"/api/delete_meal/{meal_ids[i]}", {}), 200, min(writes, size)),
+        ("GET /metrics", "GET", lambda i: ("/metrics", {}), 200, requests),
+    ]
+
+
+def bench_api(size, repeat, tmp, requests):
+    """Times each request of _api_requests(); a "run" is one request, so `repeat` is not used."""
+    import app as app_module
+    from nutrition_tracker.meal_calculator import MealCalculationCache
+
+    catalog_path = os.path.join(tmp, f"api_catalog_{size}.json")
+    history_path = os.path.join(tmp, f"api_history_{size}.json")
+    write_catalog(catalog_path, size)
+    write_history(history_path, size, MEAL_LINES, catalog_size=size)
+    saved = app_module.db, app_module.history_manager, app_module.meal_cache
+    app_module.db = IngredientDatabase(filepath=catalog_path)
+    app_module.history_manager = MealHistoryManager(filepath=history_path)
+    app_module.meal_cache = MealCalculationCache()
+    try:
+        client = app_module.app.test_client()
+        etag = client.get("/api/get_ingredients").headers["ETag"]
+        for label, method, make, status, count in _api_requests(size, requests):
+            runs = []
+            for i in range(count):
+                path, kwargs = make(i)
+                if kwargs == "etag":
+                    kwargs = {"headers": {"If-None-Match": etag}}
+                gc.collect()
+                start = time.perf_counter()
+                response = client.open(path, method=method, **kwargs)
+                response.get_data()  # Includes streamed bodies
+                runs.append(time.perf_counter() - start)
+                if response.status_code != status:
+                    raise RuntimeError(f"{label}: expected {status}, got {response.status_code}: "
+                                       f"{response.get_data(as_text=True)[:200]}")
+            yield result("api", label, size, runs, 1)
+    finally:
+        app_module.db, app_module.history_manager, app_module.meal_cache = saved
+
+
+def uncovered_routes():
+    """Returns the /api routes of app.py that the api group does not request."""
+    import app as app_module
+    covered = {label.split(" ")[1] for label, *_ in _api_requests(1, 1)}
+    return sorted(rule.rule for rule in app_module.app.url_map.iter_rules()
+                  if rule.rule.startswith("/api/") and rule.rule not in covered)
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=_REPO, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy_available(),
+        "pyarrow": arrow_available(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "requests": args.requests,
+    }
+
+
+def print_result(r, baseline=None, file=None):
+    per_item = f"{r['per_item_us']:>10.2f} us" if r["per_item_us"] is not None else " " * 13
+    line = f"{r['group']:>7} | {r['name']:<48} | {r['size']:>9} | {r['min_s'] * 1000:>10.3f} ms | {per_item}"
+    if baseline is not None:
+        previous = baseline.get((r["group"], r["name"], r["size"]))
+        line += f" | {r['min_s'] / previous['min_s']:>5.2f}x" if previous and previous["min_s"] else " |      -"
+    print(line, file=file, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplies the sizes: 1.0 runs 1k-1M rows, 0.01 runs 10-10k.")
+    parser.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per core/storage benchmark.")
+    parser.add_argument("--requests", type=int, default=20,
+                        help="Requests per read route; write routes get a quarter of them.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Results file of an earlier run; prints the ratio of min times.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(r["group"], r["name"], r["size"]): r for r in json.load(f)["results"]}
+
+    report = {"meta": metadata(args), "results": []}
+    print(f"{'group':>7} | {'benchmark':<48} | {'size':>9} | {'min':>13} | {'per item':>13}"
+          + (" | ratio" if baseline is not None else ""))
+    original_cwd, stdout = os.getcwd(), sys.stdout
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        os.chdir(tmp)  # app.py opens its default data files in the working directory
+        try:
+            for group in args.groups:
+                sizes = scaled_sizes(args.scale, API_BASE_SIZES if group == "api" else BASE_SIZES)
+                for size in sizes:
+                    # The managers and Meal print CLI feedback for every operation.
+                    with contextlib.redirect_stdout(devnull):
+                        if group == "api":
+                            results = bench_api(size, args.repeat, tmp, args.requests)
+                        else:
+                            results = (bench_core if group == "core" else bench_storage)(size, args.repeat, tmp)
+                        for r in results:
+                            report["results"].append(r)
+                            print_result(r, baseline, file=stdout)
+            if "api" in args.groups:
+                report["meta"]["uncovered_routes"] = uncovered_routes()
+        finally:
+            os.chdir(original_cwd)
+    report["meta"]["finished"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if report["meta"].get("uncovered_routes"):
+        print(f"Routes without a benchmark: {', '.join(report['meta']['uncovered_routes'])}", file=sys.stderr)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
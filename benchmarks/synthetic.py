@@ -0,0 +1,72 @@
+"""
+Synthetic data for the benchmarks: ingredient catalogs and meal histories of
+any size, generated deterministically so that runs can be compared.
+
+Sizes are given as a base size times a scale factor (see scaled_sizes), so a
+whole suite can be shrunk for a quick check or grown for a large machine.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+# Sizes the suite measures at --scale 1.
+BASE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# First meal of a synthetic history; one meal every MEAL_INTERVAL after it.
+HISTORY_START = datetime(2024, 1, 1, 7, 0, tzinfo=timezone.utc)
+MEAL_INTERVAL = timedelta(minutes=7)
+
+
+def scaled_sizes(scale, base=BASE_SIZES):
+    """Returns the distinct sizes base * scale (at least 1), in ascending order."""
+    return sorted({max(1, round(size * scale)) for size in base})
+
+
+def ingredient_name(i):
+    return f"Ingredient {i:07d}"
+
+
+def ingredient_rows(count, seed=0):
+    """Yields `count` valid (name, calories, protein, carbs, fat) rows per 100g."""
+    rng = random.Random(seed)
+    for i in range(count):
+        protein, carbs, fat = round(rng.uniform(0, 30), 1), round(rng.uniform(0, 60), 1), round(rng.uniform(0, 30), 1)
+        yield ingredient_name(i), round(protein * 4 + carbs * 4 + fat * 9, 1), protein, carbs, fat
+
+
+def write_catalog(path, count, seed=None):
+    """Writes a catalog of `count` ingredients in the database's own JSON format."""
+    fields = ("name", "calories", "protein", "carbs", "fat")
+    catalog = {row[0]: dict(zip(fields, row)) for row in ingredient_rows(count, count if seed is None else seed)}
+    with open(path, "w") as f:
+        json.dump(catalog, f, indent=4)
+
+
+def make_meal(i, lines, catalog_size):
+    """Returns meal entry number `i`, as add_meal() stores it, with `lines` ingredient lines."""
+    ingredients_used = []
+    for k in range(lines):
+        weight = 50 + (i * 7 + k * 13) % 150
+        ingredients_used.append({"name": ingredient_name((i * lines + k) % catalog_size), "weight_g": weight,
+                                 "calories": round(weight * 1.6, 2), "protein_g": round(weight * 0.1, 2),
+                                 "carbs_g": round(weight * 0.2, 2), "fat_g": round(weight * 0.05, 2)})
+    weight = sum(line["weight_g"] for line in ingredients_used)
+    return {
+        "id": f"{i:08x}-0000-4000-8000-000000000000",
+        "name": f"Meal {i}",
+        "timestamp": (HISTORY_START + i * MEAL_INTERVAL).isoformat(),
+        "ingredients_used": ingredients_used,
+        "total_nutrition": {"total_calories": round(weight * 1.6, 2), "total_protein_g": round(weight * 0.1, 2),
+                            "total_carbs_g": round(weight * 0.2, 2), "total_fat_g": round(weight * 0.05, 2),
+                            "total_weight_g": weight},
+        "nutrition_per_100g": {"calories_per_100g": 160.0, "protein_per_100g": 10.0,
+                               "carbs_per_100g": 20.0, "fat_per_100g": 5.0},
+    }
+
+
+def write_history(path, count, lines=3, catalog_size=1_000):
+    """Writes a meal history of `count` meals, oldest first, in the JSON format of MealHistoryManager."""
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(count):
+            f.write(("," if i else "") + json.dumps(make_meal(i, lines, catalog_size)))
+        f.write("]")
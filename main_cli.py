@@ -1,8 +1,29 @@
+import argparse
+import contextlib
+import os
+import sys
+from nutrition_tracker.bulk_import import FORMATS, detect_format, import_ingredients
+from nutrition_tracker.history_export import FORMATS as EXPORT_FORMATS, export_history
+from nutrition_tracker.history_journal import JournaledMealHistoryManager
+from nutrition_tracker.history_manager import MealHistoryManager
 from nutrition_tracker.ingredient import Ingredient
 from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.sqlite_database import SQLiteIngredientDatabase
 from nutrition_tracker.meal import Meal
 
 DB_FILEPATH = "ingredient_database.json"
+SQLITE_DB_FILEPATH = "ingredient_database.db"
+MEAL_HISTORY_FILEPATH = "meal_history.json"
+MEAL_HISTORY_JOURNAL_FILEPATH = "meal_history.ndjson"
+
+# Same engine switch as app.py, so the CLI and web UI share one catalog.
+DB_ENGINE = os.environ.get("NUTRITION_DB_ENGINE", "json")
+# Same meal history storage switch as app.py (used by the export command).
+HISTORY_STORAGE = os.environ.get("NUTRITION_HISTORY_STORAGE", "json")
+# Same write-behind switch as app.py; 0 (default) saves every change right away.
+FLUSH_INTERVAL = float(os.environ.get("NUTRITION_FLUSH_INTERVAL", "0")) or None
+# Same snapshot switch as app.py, so both keep the snapshots current.
+SNAPSHOT = os.environ.get("NUTRITION_SNAPSHOT", "0") == "1"
 
 def get_float_input(prompt: str) -> float:
     """Gets a non-negative float input from the user."""
@@ -146,9 +167,93 @@ def create_meal(db: IngredientDatabase):
         print("  Cannot calculate per 100g as meal weight is zero.")
 
 
-def main():
+def open_database() -> IngredientDatabase:
+    """Opens the ingredient catalog with the configured storage engine."""
+    if DB_ENGINE == "sqlite":
+        return SQLiteIngredientDatabase(filepath=SQLITE_DB_FILEPATH, migrate_from=DB_FILEPATH)
+    return IngredientDatabase(filepath=DB_FILEPATH, flush_interval=FLUSH_INTERVAL, snapshot=SNAPSHOT)
+
+
+def import_file(db: IngredientDatabase, path: str, file_format: str | None = None, overwrite: bool = False) -> int:
+    """Imports ingredients from a CSV or JSONL file and prints a summary. Returns the exit status."""
+    file_format = file_format or detect_format(path)
+    if file_format is None:
+        print(f"Cannot tell the format of {path}; pass --format {'|'.join(FORMATS)}.")
+        return 2
+    try:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            report = import_ingredients(db, f, file_format, overwrite=overwrite)
+    except (IOError, ValueError) as e:
+        print(f"Import failed: {e}")
+        return 1
+    print(f"Imported {path}: {report.added} added, {report.replaced} replaced, "
+          f"{report.skipped} skipped as duplicates, {report.invalid} invalid.")
+    for error in report.errors:
+        print(f"  line {error['line']}: {error['message']}")
+    if report.invalid > len(report.errors):
+        print(f"  ... and {report.invalid - len(report.errors)} more invalid records.")
+    return 0 if not report.invalid else 1
+
+
+def open_history() -> MealHistoryManager:
+    """Opens the meal history with the configured storage mode."""
+    if HISTORY_STORAGE in ("journal", "lazy"):
+        return JournaledMealHistoryManager(filepath=MEAL_HISTORY_JOURNAL_FILEPATH,
+                                           legacy_filepath=MEAL_HISTORY_FILEPATH,
+                                           lazy_details=HISTORY_STORAGE == "lazy")
+    return MealHistoryManager(filepath=MEAL_HISTORY_FILEPATH, snapshot=SNAPSHOT)
+
+
+def export_file(output, file_format: str = "ndjson", from_ts: str | None = None, to_ts: str | None = None) -> int:
+    """
+    Streams the meal history to a binary file object, or to the file at path
+    `output`, which is only created once the format and range are accepted.
+    Returns the exit status.
+    """
+    with contextlib.redirect_stdout(sys.stderr):  # Keep loader messages out of an export sent to stdout
+        history = open_history()
+    try:
+        chunks = export_history(history.iter_meals(from_ts=from_ts, to_ts=to_ts), file_format)
+        first = next(chunks, b"")
+        with open(output, "wb") if isinstance(output, str) else contextlib.nullcontext(output) as f:
+            f.write(first)
+            for chunk in chunks:
+                f.write(chunk)
+    except ValueError as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        history.close()
+    return 0
+
+
+def main(argv=None):
     """Main function to run the CLI application."""
-    db = IngredientDatabase(filepath=DB_FILEPATH)
+    parser = argparse.ArgumentParser(description="Nutrition Tracker CLI. Without a command, starts the interactive menu.")
+    commands = parser.add_subparsers(dest="command")
+    import_parser = commands.add_parser("import", help="Bulk import ingredients from a CSV or JSONL file.")
+    import_parser.add_argument("path", help="File with name, calories, protein, carbs, fat and optional "
+                                            "portion_size (grams the values refer to, default 100) per record.")
+    import_parser.add_argument("--format", choices=FORMATS, help="File format (default: from the extension).")
+    import_parser.add_argument("--on-duplicate", choices=["skip", "overwrite"], default="skip",
+                               help="What to do with ingredients that already exist (default: skip).")
+    export_parser = commands.add_parser("export", help="Export the meal history, with ingredient lines.")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson",
+                               help="ndjson: one meal per line; csv/arrow: one row per ingredient line.")
+    export_parser.add_argument("--from", dest="from_ts", help="ISO date or timestamp; inclusive.")
+    export_parser.add_argument("--to", dest="to_ts", help="ISO date or timestamp; exclusive.")
+    export_parser.add_argument("-o", "--output", help="Output file (default: standard output).")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        return export_file(args.output or sys.stdout.buffer, args.format, args.from_ts, args.to_ts)
+
+    db = open_database()
+    if args.command == "import":
+        try:
+            return import_file(db, args.path, args.format, overwrite=args.on_duplicate == "overwrite")
+        finally:
+            db.close()
 
     while True:
         print("\n========== Nutrition Tracker CLI ==========")
@@ -162,14 +267,14 @@ def main():
         elif main_choice == '2':
             create_meal(db)
         elif main_choice == '3':
+            db.close()  # Writes changes still scheduled in write-behind mode
             print("Exiting Nutrition Tracker. Goodbye!")
-            break
+            return 0
         else:
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
     # Create the package structure if it doesn't exist
-    import os
     if not os.path.exists("nutrition_tracker"):
         os.makedirs("nutrition_tracker")
 
@@ -178,4 +283,4 @@ if __name__ == "__main__":
         with open("nutrition_tracker/__init__.py", "w") as f:
             pass # Empty file is fine
 
-    main()
+    sys.exit(main())
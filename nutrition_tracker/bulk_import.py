@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import math
+from .ingredient import Ingredient
+
+FORMATS = ("csv", "jsonl")
+# Columns of an import file; portion_size (grams the values refer to) is optional and defaults to 100.
+IMPORT_FIELDS = ("name", "calories", "protein", "carbs", "fat")
+PORTION_FIELD = "portion_size"
+# Records validated and added to the database at once.
+BATCH_SIZE = 5000
+# Errors listed in an import report; the rest are only counted.
+MAX_REPORTED_ERRORS = 100
+
+def detect_format(filename: str | None) -> str | None:
+    """Returns the import format implied by a file name's extension, or None."""
+    if not filename:
+        return None
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return "csv"
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    return None
+
+def _csv_records(stream):
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    keys = [column.strip().lower() for column in header]
+    missing = [field for field in IMPORT_FIELDS if field not in keys]
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(missing)}.")
+    try:
+        for values in reader:
+            if values:
+                yield reader.line_num, dict(zip(keys, values))
+    except csv.Error as e:  # The reader cannot resync after this; the rest of the file is not read
+        yield reader.line_num, ValueError(f"Malformed CSV, import stopped: {e}.")
+
+def _jsonl_records(stream):
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e.msg}.")
+            continue
+        yield line_number, record if isinstance(record, dict) else ValueError("Expected a JSON object.")
+
+def read_records(stream, format: str):
+    """
+    Parses an import file incrementally.
+
+    Args:
+        stream: Text stream of the file.
+        format: "csv" (with a header row) or "jsonl" (one JSON object per line).
+
+    Yields:
+        (line number, record dict), or (line number, ValueError) for a line
+        that could not be parsed. Line numbers start at 1.
+
+    Raises:
+        ValueError: If the format is unknown or the CSV header lacks required columns.
+    """
+    if format == "csv":
+        return _csv_records(stream)
+    if format == "jsonl":
+        return _jsonl_records(stream)
+    raise ValueError(f"format must be one of: {', '.join(FORMATS)}.")
+
+def _number(value, field: str) -> float:
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == "" or isinstance(value, bool):
+        raise ValueError(f"Missing or invalid value for '{field}'.")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid number for '{field}': {value!r}.") from None
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid number for '{field}': {value!r}.")
+    return number
+
+def _normalized_row(record: dict) -> tuple:
+    """Returns the (name, calories, protein, carbs, fat) per 100g of a record. Raises ValueError."""
+    name = record.get("name")
+    name = name.strip() if isinstance(name, str) else None
+    if not name:
+        raise ValueError("Missing ingredient name.")
+    portion = record.get(PORTION_FIELD)
+    portion = 100.0 if portion in (None, "") else _number(portion, PORTION_FIELD)
+    if portion <= 0:
+        raise ValueError("Portion size must be greater than zero.")
+    factor = 100.0 / portion
+    return (name, *(_number(record.get(field), field) * factor for field in IMPORT_FIELDS[1:]))
+
+class ImportReport:
+    """Counts of an import, plus the first MAX_REPORTED_ERRORS errors with their line numbers."""
+
+    def __init__(self):
+        self.added = 0
+        self.replaced = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.errors: list[dict] = []
+
+    def error(self, line: int | None, message: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "message": message})
+
+    def to_dict(self) -> dict:
+        return {"added": self.added, "replaced": self.replaced, "skipped": self.skipped,
+                "invalid": self.invalid, "errors": self.errors}
+
+def _validate_batch(records, report: ImportReport) -> list[Ingredient]:
+    """Normalizes and validates a batch of (line, record) pairs; invalid ones are reported and dropped."""
+    rows, lines, errors = [], [], []
+    for line, record in records:
+        if isinstance(record, ValueError):
+            errors.append((line, str(record)))
+            continue
+        try:
+            rows.append(_normalized_row(record))
+            lines.append(line)
+        except ValueError as e:
+            errors.append((line, str(e)))
+    try:
+        ingredients = Ingredient.from_rows(rows)  # The whole batch in a few passes
+    except ValueError:
+        ingredients = []
+        for line, row in zip(lines, rows):  # Some row is invalid: find out which, one by one
+            try:
+                ingredients.append(Ingredient(*row))
+            except ValueError as e:
+                errors.append((line, str(e)))
+    for line, message in sorted(errors):
+        report.error(line, message)
+    return ingredients
+
+def import_ingredients(db, stream, format: str, overwrite: bool = False, batch_size: int = BATCH_SIZE) -> ImportReport:
+    """
+    Streams ingredients from a CSV or JSONL file into a database.
+
+    The file is read and validated batch by batch, so memory use does not
+    depend on its size. Each record holds name, calories, protein, carbs and
+    fat for `portion_size` grams (default 100), which are normalized to
+    100g. Invalid records are reported and skipped; the others are added.
+    The database is saved once, at the end.
+
+    Args:
+        db: IngredientDatabase (or a subclass) to import into.
+        stream: Text stream of the file.
+        format: "csv" or "jsonl".
+        overwrite: Replace existing ingredients with the same name instead
+                   of skipping them.
+        batch_size: Number of records validated and added at once.
+
+    Returns:
+        ImportReport of the import.
+
+    Raises:
+        ValueError: If the format is unknown or the CSV header lacks required columns.
+    """
+    report = ImportReport()
+    records = read_records(stream, format)
+    batch = []
+    try:
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                _import_batch(db, batch, overwrite, report)
+                batch = []
+        _import_batch(db, batch, overwrite, report)
+    except UnicodeDecodeError:
+        report.error(None, "The file is not valid UTF-8, import stopped.")
+    finally:
+        if report.added or report.replaced:
+            db.save_ingredients()
+    return report
+
+def _import_batch(db, batch, overwrite: bool, report: ImportReport) -> None:
+    ingredients = _validate_batch(batch, report)
+    added, replaced = db.import_ingredients(ingredients, overwrite=overwrite)
+    report.added += added
+    report.replaced += replaced
+    report.skipped += len(ingredients) - added - replaced
+
+def text_stream(binary_stream) -> io.TextIOWrapper:
+    """Wraps a binary stream (e.g. an upload) for read_records, decoding UTF-8 (with or without BOM)."""
+    return io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
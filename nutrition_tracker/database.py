@@ -1,20 +1,85 @@
+import itertools
 import json
+import threading
+from .file_sync import atomic_write, file_stamp, interprocess_lock
 from .ingredient import Ingredient
+from .locking import RWLock
+from .metrics import record_bytes_written, timed
+from .nutrient_matrix import NutrientMatrix, numpy_available
+from .search_index import IngredientSearchIndex
+from .snapshot import INGREDIENTS_KIND, Snapshot, SnapshotIngredients, snapshot_path, write_ingredient_snapshot
+from .write_behind import WriteBehind
 
-class IngredientDatabase:
-    """Manages a collection of Ingredient objects."""
+# Shared by all databases so a generation value is never reused, even across instances.
+_generations = itertools.count(1)
+
+_MISSING = object()
+
+# Errors that mean a catalog file could not be read or does not hold valid ingredients.
+_READ_ERRORS = (IOError, ValueError, TypeError, AttributeError)
 
-    def __init__(self, filepath: str = "ingredients.json"):
+class IngredientDatabase:
+    """
+    Manages a collection of Ingredient objects.
+
+    Safe to share between threads. Mutations hold `lock` for writing while
+    they update memory; compound reads hold it for reading. Disk writes only
+    take a snapshot under the read lock, so readers never wait for the disk.
+
+    Several processes may share the file: refresh() picks up ingredients that
+    other processes added, changed or removed, and every save merges this
+    process's unsaved changes into the current file under an interprocess
+    lock before replacing it atomically.
+
+    With `flush_interval` set, save_ingredients() only schedules the write: a
+    background thread coalesces saves into one file write at most every
+    `flush_interval` seconds (sooner after `flush_max_changes` saves). Call
+    flush() to write immediately and close() when done; pending changes are
+    also written when the interpreter exits.
+
+    With `snapshot`, a binary snapshot of the catalog (see snapshot.py) is
+    kept next to the JSON file, which stays the file of record. Loading maps
+    the snapshot into memory instead of parsing the JSON file whenever it was
+    written from the current file: ingredients are created on first access
+    and the search index is built on the first search.
+    """
+
+    def __init__(self, filepath: str = "ingredients.json", flush_interval: float | None = None,
+                 flush_max_changes: int = 100, snapshot: bool = False):
         """
         Initializes the IngredientDatabase.
 
         Args:
             filepath: Path to the JSON file for storing ingredients.
                       Defaults to "ingredients.json".
+            flush_interval: Seconds a saved change may stay unwritten
+                            (write-behind mode); None writes on every save.
+            flush_max_changes: Number of pending saves that triggers a write
+                               before flush_interval has passed.
+            snapshot: Keep a binary snapshot of the catalog for fast loading.
         """
         self.filepath = filepath
+        self.snapshot = snapshot
         self._ingredients: dict[str, Ingredient] = {} # Store ingredients by name for quick lookup
+        self._search_index: IngredientSearchIndex | None = IngredientSearchIndex()  # None until first needed
+        # Vectorized per-100g nutrient matrix; None when NumPy is not installed.
+        self.nutrient_matrix: NutrientMatrix | None = NutrientMatrix() if numpy_available() else None
+        self._generation = 0
+        self.lock = RWLock()  # Hold lock.read_locked() to make several reads consistent
+        self._save_lock = threading.Lock()  # Serializes disk writes and refreshes
+        self._file_stamp = None  # file_stamp() of the file as last read or written here
+        self._dirty: dict[str, Ingredient | None] = {}  # Unsaved changes by name; None for a removal
         self.load_ingredients()
+        self._write_behind = None
+        if flush_interval:
+            self._write_behind = WriteBehind(
+                self._write_file, flush_interval, flush_max_changes, name="ingredient-write-behind"
+            )
+
+    @property
+    def generation(self) -> int:
+        """Process-wide unique value that changes whenever the ingredients change; use it to key derived caches."""
+        return self._generation
 
     def add_ingredient(self, ingredient: Ingredient) -> None:
         """
@@ -28,9 +93,11 @@ class IngredientDatabase:
         """
         if not isinstance(ingredient, Ingredient):
             raise TypeError("Can only add Ingredient objects to the database.")
-        if ingredient.name in self._ingredients:
-            raise ValueError(f"Ingredient with name '{ingredient.name}' already exists.")
-        self._ingredients[ingredient.name] = ingredient
+        with self.lock.write_locked():
+            if ingredient.name in self._ingredients:
+                raise ValueError(f"Ingredient with name '{ingredient.name}' already exists.")
+            self._put(ingredient)
+            self._mark_dirty(ingredient.name, ingredient)
         print(f"Ingredient '{ingredient.name}' added to database.") # For CLI feedback
 
     def get_ingredient(self, name: str) -> Ingredient | None:
@@ -49,6 +116,34 @@ class IngredientDatabase:
         """Returns a list of names of all ingredients in the database."""
         return list(self._ingredients.keys())
 
+    def ingredient_count(self) -> int:
+        """Returns the number of ingredients in the database."""
+        return len(self._ingredients)
+
+    def search_ingredients(self, query: str, limit: int = 20) -> list[Ingredient]:
+        """
+        Searches ingredients by name, ignoring case and accents.
+
+        Args:
+            query: Text typed by the user. An empty query lists ingredients alphabetically.
+            limit: Maximum number of results.
+
+        Returns:
+            Matching Ingredient objects, best match first (see IngredientSearchIndex.search).
+        """
+        while True:
+            self._build_search_index()
+            with self.lock.read_locked():
+                if self._search_index is not None:  # Unless the catalog was reloaded meanwhile
+                    return [self._ingredients[name] for name in self._search_index.search(query, limit)]
+
+    def _build_search_index(self) -> None:
+        """Builds the search index if it was left out when the catalog was loaded from a snapshot."""
+        if self._search_index is None:
+            with self.lock.write_locked():
+                if self._search_index is None:
+                    self._search_index = IngredientSearchIndex(self._ingredients)
+
     def remove_ingredient(self, name: str) -> bool:
         """
         Removes an ingredient from the database by its name.
@@ -59,45 +154,281 @@ class IngredientDatabase:
         Returns:
             True if the ingredient was removed, False if not found.
         """
-        if name in self._ingredients:
-            del self._ingredients[name]
+        with self.lock.write_locked():
+            removed = name in self._ingredients
+            if removed:
+                self._discard(name)
+                self._mark_dirty(name, None)
+        if removed:
             print(f"Ingredient '{name}' removed from database.") # For CLI feedback
             return True
         print(f"Ingredient '{name}' not found in database.") # For CLI feedback
         return False
 
+    def import_ingredients(self, ingredients, overwrite: bool = False) -> tuple[int, int]:
+        """
+        Adds many ingredients at once, without per-ingredient feedback.
+
+        The derived indexes are updated once for the whole batch. Nothing is
+        written: call save_ingredients() once when the import is done.
+
+        Args:
+            ingredients: Iterable of Ingredient objects.
+            overwrite: Replace existing ingredients with the same name (and,
+                       within the batch, keep the last of several with the
+                       same name); otherwise they are skipped (and the first
+                       one is kept).
+
+        Returns:
+            (added, replaced) counts; the other ingredients were skipped.
+            With `overwrite`, an ingredient that replaces an earlier one of
+            the same batch counts as replaced.
+        """
+        with self.lock.write_locked():
+            batch, accepted = self._import_batch(ingredients, overwrite)
+            added = sum(name not in self._ingredients for name in batch)
+            self._put_many(batch.values())
+            for name, ingredient in batch.items():
+                self._mark_dirty(name, ingredient)
+        return added, accepted - added
+
+    def _import_batch(self, ingredients, overwrite: bool) -> tuple[dict[str, Ingredient], int]:
+        """
+        Applies the duplicate policy to an import batch. Returns the
+        ingredients to store, by name, and the number of ingredients accepted.
+        """
+        batch: dict[str, Ingredient] = {}
+        accepted = 0
+        with self.lock.read_locked():
+            for ingredient in ingredients:
+                if not isinstance(ingredient, Ingredient):
+                    raise TypeError("Can only add Ingredient objects to the database.")
+                if overwrite or (ingredient.name not in self._ingredients and ingredient.name not in batch):
+                    batch[ingredient.name] = ingredient
+                    accepted += 1
+        return batch, accepted
+
+    def _put(self, ingredient: Ingredient) -> None:
+        """Adds or replaces an ingredient in memory and in the derived indexes, without feedback."""
+        with self.lock.write_locked():
+            self._ingredients[ingredient.name] = ingredient
+            if self._search_index is not None:
+                self._search_index.add(ingredient.name)
+            if self.nutrient_matrix is not None:
+                self.nutrient_matrix.set(ingredient)
+            self._generation = next(_generations)
+
+    def _put_many(self, ingredients) -> None:
+        """Adds or replaces many ingredients in memory and in the derived indexes, without feedback."""
+        ingredients = list(ingredients)
+        if not ingredients:
+            return
+        with self.lock.write_locked():
+            for ingredient in ingredients:
+                self._ingredients[ingredient.name] = ingredient
+                if self.nutrient_matrix is not None:
+                    self.nutrient_matrix.set(ingredient)
+            if self._search_index is not None:
+                self._search_index.add_many(ingredient.name for ingredient in ingredients)
+            self._generation = next(_generations)
+
+    def _discard(self, name: str) -> None:
+        """Drops an ingredient from memory and from the derived indexes, without feedback."""
+        with self.lock.write_locked():
+            del self._ingredients[name]
+            if self._search_index is not None:
+                self._search_index.remove(name)
+            if self.nutrient_matrix is not None:
+                self.nutrient_matrix.remove(name)
+            self._generation = next(_generations)
+
+    def _replace_ingredients(self, ingredients: dict[str, Ingredient] | SnapshotIngredients) -> None:
+        """
+        Replaces all ingredients; the derived indexes are built before the write lock is taken
+        (for a snapshot, the nutrient matrix comes from the mapped values and the search index is left for later).
+        """
+        if isinstance(ingredients, SnapshotIngredients):
+            search_index = None
+            nutrient_matrix = ingredients.nutrient_matrix() if self.nutrient_matrix is not None else None
+        else:
+            search_index = IngredientSearchIndex(ingredients)
+            nutrient_matrix = NutrientMatrix(ingredients.values()) if self.nutrient_matrix is not None else None
+        with self.lock.write_locked():
+            self._ingredients = ingredients
+            self._search_index = search_index
+            self.nutrient_matrix = nutrient_matrix
+            self._dirty.clear()
+            self._generation = next(_generations)
+
+    def _mark_dirty(self, name: str, ingredient: Ingredient | None) -> None:
+        """Records a change that still has to be saved. Called under the write lock."""
+        self._dirty[name] = ingredient
+
+    def _clear_dirty(self, saved: dict) -> None:
+        """Forgets the changes in `saved` unless they were superseded meanwhile."""
+        with self.lock.write_locked():
+            for name, ingredient in saved.items():
+                if self._dirty.get(name, _MISSING) is ingredient:
+                    del self._dirty[name]
+
+    def _apply_external(self, ingredients: dict[str, Ingredient]) -> bool:
+        """
+        Brings memory in line with `ingredients` (another copy of the catalog),
+        touching only the differences. Changes of this process that are not
+        saved yet take precedence.
+
+        Returns:
+            True if any ingredient changed.
+        """
+        with self.lock.read_locked():
+            removed = [name for name in self._ingredients if name not in ingredients]
+            changed = [
+                ingredient for name, ingredient in ingredients.items()
+                if name not in self._ingredients or self._ingredients[name].to_dict() != ingredient.to_dict()
+            ]
+        if not removed and not changed:
+            return False
+        with self.lock.write_locked():
+            for name in removed:
+                if name not in self._dirty and name in self._ingredients:
+                    self._discard(name)
+            for ingredient in changed:
+                if ingredient.name not in self._dirty:
+                    self._put(ingredient)
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Picks up ingredients that other processes added, changed or removed.
+
+        Costs a single os.stat when the file is unchanged. Otherwise the file
+        is read and only the differences are applied.
+
+        Returns:
+            True if any ingredient changed.
+        """
+        if file_stamp(self.filepath) == self._file_stamp:
+            return False
+        with self._save_lock:
+            stamp = file_stamp(self.filepath)
+            if stamp is None or stamp == self._file_stamp:
+                return False
+            try:
+                ingredients = self._read_file()
+            except _READ_ERRORS as e:
+                print(f"Error reading ingredients from {self.filepath}: {e}. Keeping the loaded ingredients.")
+                ingredients = None
+            self._file_stamp = stamp
+            return ingredients is not None and self._apply_external(ingredients)
+
+    def _read_file(self) -> dict[str, Ingredient]:
+        """Reads the JSON file. Raises IOError, ValueError (including JSONDecodeError) or TypeError."""
+        with open(self.filepath, 'r') as f:
+            data = json.load(f)
+        # The whole file is validated at once rather than field by field.
+        return dict(zip(data, Ingredient.from_dicts(data.values())))
+
     def save_ingredients(self) -> None:
-        """Saves the current ingredient database to the JSON file."""
+        """Saves the ingredient database, or schedules the save in write-behind mode."""
+        if self._write_behind is not None:
+            self._write_behind.mark_dirty()
+        else:
+            try:
+                self._write_file()
+            except Exception:
+                pass  # Reported by _write_file; the changes stay unsaved and go with the next save
+
+    def flush(self) -> None:
+        """Writes changes scheduled by save_ingredients() now (write-behind mode only)."""
+        if self._write_behind is not None:
+            self._write_behind.flush()
+
+    def close(self) -> None:
+        """Writes any scheduled changes and stops the write-behind thread."""
+        if self._write_behind is not None:
+            self._write_behind.close()
+
+    @timed("save_ingredients")
+    def _write_file(self) -> None:
+        """
+        Writes the current ingredients to the JSON file, merged with changes saved by other processes.
+
+        Errors are reported and re-raised, so that write-behind keeps the changes pending and retries.
+        """
         try:
-            data_to_save = {name: ing.to_dict() for name, ing in self._ingredients.items()}
-            with open(self.filepath, 'w') as f:
-                json.dump(data_to_save, f, indent=4)
+            # Saves run one at a time, each from a snapshot taken after the previous
+            # save finished, so a slower save can never overwrite a newer one.
+            with self._save_lock, interprocess_lock(self.filepath):
+                with self.lock.read_locked():
+                    pending = dict(self._dirty)
+                    ingredients = self._ingredients.copy()
+                merged = None
+                if file_stamp(self.filepath) not in (self._file_stamp, None):
+                    # Another process saved since this one last synced: start from its file.
+                    try:
+                        merged = self._read_file()
+                    except _READ_ERRORS as e:
+                        print(f"Error reading ingredients from {self.filepath}: {e}. Overwriting it.")
+                    else:
+                        for name, ingredient in pending.items():
+                            if ingredient is None:
+                                merged.pop(name, None)
+                            else:
+                                merged[name] = ingredient
+                        ingredients = merged
+                data_to_save = {name: ing.to_dict() for name, ing in ingredients.items()}
+                size = atomic_write(self.filepath, lambda f: json.dump(data_to_save, f, indent=4))
+                record_bytes_written("save_ingredients", size)
+                self._file_stamp = file_stamp(self.filepath)
+                if self.snapshot:
+                    self._write_binary_snapshot(ingredients.values())
+                self._clear_dirty(pending)
+                if merged is not None:
+                    self._apply_external(merged)
             print(f"Ingredients saved to {self.filepath}")
         except IOError as e:
             print(f"Error saving ingredients to {self.filepath}: {e}")
+            raise
         except Exception as e:
             print(f"An unexpected error occurred while saving ingredients: {e}")
+            raise
 
 
+    def _write_binary_snapshot(self, ingredients) -> None:
+        """Writes the snapshot of the JSON file as last written or read here. A failure only costs the next load its speed."""
+        path = snapshot_path(self.filepath)
+        try:
+            size = write_ingredient_snapshot(path, self._file_stamp, ingredients)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error writing ingredient snapshot to {path}: {e}")
+        else:
+            record_bytes_written("save_snapshot", size)
+
+    @timed("load_ingredients")
     def load_ingredients(self) -> None:
-        """Loads ingredients from the JSON file into the database."""
+        """Loads ingredients from the snapshot (if enabled and current) or from the JSON file into the database."""
+        self._file_stamp = file_stamp(self.filepath)
+        if self.snapshot:
+            mapped = Snapshot.open(snapshot_path(self.filepath), INGREDIENTS_KIND, self._file_stamp)
+            if mapped is not None:
+                print(f"Ingredients loaded from {snapshot_path(self.filepath)}")
+                self._replace_ingredients(SnapshotIngredients(mapped))
+                return
         try:
-            with open(self.filepath, 'r') as f:
-                data = json.load(f)
-                self._ingredients = {
-                    name: Ingredient.from_dict(ing_data)
-                    for name, ing_data in data.items()
-                }
+            ingredients = self._read_file()
             print(f"Ingredients loaded from {self.filepath}")
+            if self.snapshot:
+                self._write_binary_snapshot(ingredients.values())
         except FileNotFoundError:
             print(f"Database file {self.filepath} not found. Starting with an empty database.")
-            self._ingredients = {} # Ensure it's empty if file doesn't exist
+            ingredients = {} # Ensure it's empty if file doesn't exist
         except json.JSONDecodeError as e:
             print(f"Error decoding JSON from {self.filepath}: {e}. Starting with an empty database.")
-            self._ingredients = {} # Ensure it's empty if file is corrupt
+            ingredients = {} # Ensure it's empty if file is corrupt
         except Exception as e: # Catch other potential errors during loading (e.g., permission issues)
             print(f"An unexpected error occurred while loading ingredients from {self.filepath}: {e}. Starting with an empty database.")
-            self._ingredients = {}
+            ingredients = {}
+        self._replace_ingredients(ingredients)
 
 
     def __repr__(self) -> str:
@@ -0,0 +1,86 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+def file_stamp(path: str) -> tuple[int, int, int] | None:
+    """
+    Returns (mtime_ns, size, inode) of a file, or None if it does not exist.
+
+    Files are replaced atomically (see atomic_write), so every write gives
+    the file a new inode and comparing stamps detects it even on file
+    systems with coarse timestamps.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+@contextmanager
+def interprocess_lock(path: str):
+    """
+    Holds an exclusive advisory lock for `path`, shared by all processes and threads.
+
+    The lock is taken on a companion file, `path + ".lock"`, so that the data
+    file itself can be replaced while the lock is held.
+    """
+    with open(path + ".lock", "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 seconds; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path: str, write, binary: bool = False) -> int:
+    """
+    Replaces a file atomically: readers see either the old or the new contents.
+
+    Args:
+        path: File to replace.
+        write: Callable that receives the open temporary text file and writes
+               the new contents to it.
+        binary: Open the temporary file in binary mode instead.
+
+    Returns:
+        The size of the new file, in bytes.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with (os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding="utf-8")) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+            size = os.fstat(f.fileno()).st_size
+        os.replace(tmp_path, path)
+        return size
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
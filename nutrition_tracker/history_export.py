@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; only the arrow format needs it.
+    pa = None
+
+FORMATS = ("ndjson", "csv", "arrow")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+# Meals serialized into one chunk of output.
+CHUNK_MEALS = 200
+
+# One row per ingredient line in the csv and arrow formats; meals without lines get one row with empty line fields.
+LINE_COLUMNS = (
+    "meal_id", "meal_name", "timestamp",
+    "total_calories", "total_protein_g", "total_carbs_g", "total_fat_g", "total_weight_g",
+    "ingredient_name", "weight_g",
+)
+_TOTAL_COLUMNS = LINE_COLUMNS[3:8]
+
+def arrow_available() -> bool:
+    """Returns True if pyarrow is installed and the arrow format can be used."""
+    return pa is not None
+
+def _number_or_none(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+def _string_or_none(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+def _line_rows(meal):
+    """Yields the LINE_COLUMNS values of one meal, one tuple per ingredient line."""
+    totals = meal.get("total_nutrition")
+    totals = totals if isinstance(totals, dict) else {}
+    head = (*(_string_or_none(meal.get(key)) for key in ("id", "name", "timestamp")),
+            *(_number_or_none(totals.get(column)) for column in _TOTAL_COLUMNS))
+    lines = meal.get("ingredients_used")
+    lines = [line for line in lines if isinstance(line, dict)] if isinstance(lines, list) else []
+    if not lines:
+        yield head + (None, None)
+    for line in lines:
+        yield head + (_string_or_none(line.get("name")), _number_or_none(line.get("weight_g")))
+
+def _chunks(meals):
+    chunk = []
+    for meal in meals:
+        chunk.append(meal)
+        if len(chunk) >= CHUNK_MEALS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _ndjson(meals):
+    for chunk in _chunks(meals):
+        yield "".join(json.dumps(meal, separators=(",", ":")) + "\n" for meal in chunk).encode("utf-8")
+
+def _csv(meals):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LINE_COLUMNS)
+    for chunk in _chunks(meals):
+        for meal in chunk:
+            writer.writerows(_line_rows(meal))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")  # Header only: no meals
+
+def _arrow_schema():
+    string, number = pa.string(), pa.float64()
+    return pa.schema([
+        ("meal_id", string), ("meal_name", string), ("timestamp", string),
+        *((column, number) for column in _TOTAL_COLUMNS),
+        ("ingredient_name", string), ("weight_g", number),
+    ])
+
+def _arrow(meals):
+    schema = _arrow_schema()
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in _chunks(meals):
+        columns = list(zip(*(row for meal in chunk for row in _line_rows(meal))))
+        writer.write_batch(pa.record_batch([list(column) for column in columns], schema=schema))
+        yield sink.getvalue()  # One record batch per chunk
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()  # Schema (if no batch was written) and end-of-stream marker
+
+def export_history(meals, format: str):
+    """
+    Serializes meal entries as a stream of byte chunks, one chunk per CHUNK_MEALS meals.
+
+    Formats:
+        ndjson: one full meal entry (as stored) per line.
+        csv: one row per ingredient line, with the meal's id, name,
+             timestamp and totals repeated on each (LINE_COLUMNS), after a
+             header row.
+        arrow: the csv rows as an Arrow IPC stream, one record batch per
+               chunk. Requires pyarrow.
+
+    Args:
+        meals: Iterable of meal entries, e.g. MealHistoryManager.iter_meals().
+        format: One of FORMATS.
+
+    Returns:
+        Generator of bytes; memory use depends on the chunk size only.
+
+    Raises:
+        ValueError: If the format is unknown, or is arrow and pyarrow is not installed.
+    """
+    if format == "ndjson":
+        return _ndjson(meals)
+    if format == "csv":
+        return _csv(meals)
+    if format == "arrow":
+        if pa is None:
+            raise ValueError("The arrow format requires pyarrow (pip install pyarrow).")
+        return _arrow(meals)
+    raise ValueError(f"format must be one of: {', '.join(FORMATS)}.")
@@ -0,0 +1,537 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from .file_sync import interprocess_lock
+from .history_manager import MealHistoryManager
+from .metrics import record_bytes_written, timed
+
+# Add records written in lazy mode start with the meal's summary, so loading
+# can parse the summary and skip the details.
+_ADD_PREFIX = '{"op":"add","summary":'
+_decoder = json.JSONDecoder()
+
+class _MealSummary(dict):
+    """Resident part of a meal whose details stay in the journal: id, name, timestamp and total_nutrition."""
+    __slots__ = ()
+
+def _summary_of(meal):
+    return _MealSummary(
+        id=meal.get("id"),
+        name=meal.get("name"),
+        timestamp=meal.get("timestamp"),
+        total_nutrition=meal.get("total_nutrition", {}),
+    )
+
+class JournaledMealHistoryManager(MealHistoryManager):
+    """
+    MealHistoryManager that stores history as an append-only NDJSON journal.
+
+    Every line of the journal is one record:
+        {"op": "add", "meal": {...}}     - a meal was logged
+        {"op": "delete", "id": "..."}    - a tombstone for a deleted meal
+
+    Logging or deleting a meal appends a single line instead of rewriting the
+    whole file, and a crash can at worst lose the partially written last line.
+    The journal is replayed on startup. Once the share of dead records (deleted
+    meals plus their tombstones) passes `compaction_threshold`, the journal is
+    rewritten in a background thread with only the live meals.
+
+    Several processes may share one journal. Appends and compactions hold an
+    interprocess lock, every process first applies the records the others
+    appended, and refresh() does the same on demand by reading only the bytes
+    past its last position (or replaying the journal if another process
+    compacted it).
+
+    With `lazy_details`, only meal summaries (id, name, timestamp and totals)
+    are kept in memory. Add records are then written with the summary first,
+    so loading parses only the summaries; get_meal_by_id() reads the full
+    meal from the record's byte offset in the journal, through a bounded
+    cache of recently read meals. Startup time and memory then depend on the
+    number of meals but not on the size of their ingredient lists.
+    """
+
+    def __init__(self, filepath="meal_history.ndjson", legacy_filepath="meal_history.json",
+                 compaction_threshold=0.5, min_compaction_records=1000, lazy_details=False,
+                 detail_cache_size=256, **kwargs):
+        """
+        Args:
+            filepath (str): Path of the NDJSON journal.
+            legacy_filepath (str or None): Path of a JSON history written by
+                MealHistoryManager. It is read when the journal does not exist
+                yet and converted into the initial journal; the file itself is
+                left untouched.
+            compaction_threshold (float): Ratio of dead to total records above
+                which a background compaction is started.
+            min_compaction_records (int): Journals with fewer records than this
+                are never compacted automatically.
+            lazy_details (bool): Keep only meal summaries in memory and read
+                full meals from the journal on demand.
+            detail_cache_size (int): Number of full meals cached in lazy mode.
+            **kwargs: flush_interval, flush_max_changes and columnar, as for
+                MealHistoryManager; in write-behind mode the queued records
+                are appended as one group. columnar cannot be combined with
+                lazy_details.
+        """
+        if lazy_details and kwargs.get("columnar"):
+            raise ValueError("lazy_details and columnar cannot be combined.")
+        if kwargs.get("snapshot"):
+            raise ValueError("snapshot only applies to the JSON history file.")
+        self.legacy_filepath = legacy_filepath
+        self.compaction_threshold = compaction_threshold
+        self.min_compaction_records = min_compaction_records
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        # (meal_id, meal or None, record) in the order the changes were made in memory
+        self._pending_records = []
+        self._record_count = 0
+        self._compaction_thread = None
+        self._compacting = False
+        self._inode = None  # Inode of the journal file that _offset refers to
+        self._offset = 0  # Bytes of the journal already applied to memory
+        self.lazy_details = lazy_details
+        self.detail_cache_size = detail_cache_size
+        self._locations = {}  # Lazy mode: meal id -> (offset, length) of its add record in the journal
+        self._detail_cache = OrderedDict()  # Lazy mode: recently read full meals, by id
+        self._detail_cache_lock = threading.Lock()
+        super().__init__(filepath=filepath, **kwargs)
+        self._journal = open(self.filepath, 'ab')
+        if self._inode is None:
+            # No journal existed. Starting at offset 0 also covers records that
+            # another process appended since.
+            self._inode = os.fstat(self._journal.fileno()).st_ino
+
+    def _encode(self, record):
+        if self.lazy_details and record.get("op") == "add":
+            meal = record["meal"]
+            summary = json.dumps(_summary_of(meal), separators=(",", ":"))
+            meal_json = json.dumps(meal, separators=(",", ":"))
+            return f'{_ADD_PREFIX}{summary},"meal":{meal_json}}}\n'.encode("utf-8")
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _decode(self, raw_line):
+        """Decodes one record; in lazy mode add records carry only the meal's summary."""
+        if not self.lazy_details:
+            return json.loads(raw_line)
+        text = raw_line.decode("utf-8")
+        if text.startswith(_ADD_PREFIX):
+            summary, _ = _decoder.raw_decode(text, len(_ADD_PREFIX))
+            return {"op": "add", "meal": _MealSummary(summary)}
+        record = json.loads(text)  # Written without a summary, e.g. before lazy mode was enabled
+        if isinstance(record, dict) and record.get("op") == "add" and isinstance(record.get("meal"), dict):
+            record["meal"] = _summary_of(record["meal"])
+        return record
+
+    @timed("load_history")
+    def _load_history(self):
+        """Replays the journal, or imports the legacy JSON file if there is no journal yet."""
+        with interprocess_lock(self.filepath):
+            if os.path.exists(self.filepath):
+                return self._replay_journal()
+            if self.legacy_filepath and os.path.exists(self.legacy_filepath):
+                history = self._load_legacy_history()
+                self._write_snapshot(history)
+                self._record_count = len(history)
+                print(f"Imported {len(history)} meals from {self.legacy_filepath} into {self.filepath}")
+                return [_summary_of(meal) for meal in history] if self.lazy_details else history
+        return []
+
+    def _load_legacy_history(self):
+        try:
+            with open(self.legacy_filepath, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error loading meal history from {self.legacy_filepath}: {e}")
+            return []
+
+    def _read_records(self, f, locations=None):
+        """
+        Parses complete records from the current position of binary file `f` to its end.
+
+        Args:
+            f: Journal file opened in binary mode.
+            locations: Optional dict updated with meal id -> (offset, length)
+                of each add record; deleted meals are removed from it.
+
+        Returns:
+            (records, size): the decoded records and the number of bytes they
+            span; a partially written last line is not included.
+        """
+        records = []
+        start = f.tell()
+        size = 0
+        for raw_line in f:
+            if not raw_line.endswith(b"\n"):
+                break  # Partially written last line
+            offset = start + size
+            size += len(raw_line)
+            if not raw_line.strip():
+                continue
+            try:
+                record = self._decode(raw_line)
+            except ValueError as e:
+                print(f"Skipping corrupt record in {self.filepath}: {e}")
+                continue
+            if not isinstance(record, dict):
+                print(f"Skipping corrupt record in {self.filepath}: not a JSON object")
+                continue
+            records.append(record)
+            if locations is not None:
+                if record.get("op") == "add" and isinstance(record.get("meal"), dict):
+                    locations[record["meal"].get("id")] = (offset, len(raw_line))
+                elif record.get("op") == "delete":
+                    locations.pop(record.get("id"), None)
+        return records, size
+
+    @staticmethod
+    def _replay_records(records):
+        """Returns the live meals described by `records`, by id."""
+        meals = {}
+        for record in records:
+            if record.get("op") == "add":
+                meal = record.get("meal")
+                if isinstance(meal, dict):
+                    meals[meal.get("id")] = meal
+            elif record.get("op") == "delete":
+                meals.pop(record.get("id"), None)
+        return meals
+
+    def _replay_journal(self):
+        """Replays the whole journal on startup; the caller holds the interprocess lock."""
+        try:
+            locations = {} if self.lazy_details else None
+            with open(self.filepath, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                records, good_size = self._read_records(f, locations)
+            if good_size < os.path.getsize(self.filepath):
+                # Drop the torn tail of an interrupted append so new appends start on a clean line.
+                print(f"Ignoring incomplete last record in {self.filepath}")
+                with open(self.filepath, 'r+b') as f:
+                    f.truncate(good_size)
+        except IOError as e:
+            print(f"Error loading meal history from {self.filepath}: {e}")
+            return []
+        self._record_count = len(records)
+        self._inode, self._offset = inode, good_size
+        self._locations = locations or {}
+        return list(self._replay_records(records).values())
+
+    def _write_snapshot(self, history):
+        """Atomically replaces the journal with one add record per meal."""
+        tmp_path = self.filepath + ".compact"
+        locations = {}
+        with open(tmp_path, 'wb') as f:
+            for meal in history:
+                line = self._encode({"op": "add", "meal": meal})
+                locations[meal.get("id")] = (f.tell(), len(line))
+                f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.filepath)
+        st = os.stat(self.filepath)
+        record_bytes_written("save_history", st.st_size)
+        self._inode, self._offset = st.st_ino, st.st_size
+        self._locations = locations if self.lazy_details else {}
+
+    def _catch_up(self):
+        """
+        Applies the records other processes appended since this one last read the journal.
+
+        The caller holds _journal_lock.
+
+        Returns:
+            bool: True if the history changed.
+        """
+        try:
+            with open(self.filepath, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._inode:
+                    # Another process compacted the journal: replay the new file.
+                    locations = {} if self.lazy_details else None
+                    records, size = self._read_records(f, locations)
+                    self._inode, self._offset, self._record_count = inode, size, len(records)
+                    self._locations = locations or {}
+                    return self._apply_external(list(self._replay_records(records).values()))
+                f.seek(self._offset)
+                records, size = self._read_records(f, self._locations if self.lazy_details else None)
+        except IOError as e:
+            print(f"Error reading meal history journal {self.filepath}: {e}")
+            return False
+        self._offset += size
+        self._record_count += len(records)
+        changed = False
+        with self.lock.write_locked():
+            for record in records:
+                if record.get("op") == "add":
+                    meal = record.get("meal")
+                    if (isinstance(meal, dict) and isinstance(meal.get("id"), str)
+                            and meal["id"] not in self._index and meal["id"] not in self._dirty):
+                        self._insert(meal)
+                        changed = True
+                elif record.get("op") == "delete" and record.get("id") not in self._dirty:
+                    changed = self._remove(record.get("id")) or changed
+        return changed
+
+    def refresh(self):
+        """
+        Applies the records that other processes appended to the journal.
+
+        Costs a single os.stat when nothing was appended; otherwise only the new
+        bytes are read. After another process compacted the journal, it is
+        replayed and only the differences are applied.
+
+        Returns:
+            bool: True if the history changed.
+        """
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return False
+        with self._journal_lock:
+            if st.st_ino == self._inode and st.st_size == self._offset:
+                return False
+            return self._catch_up()
+
+    def _mark_dirty(self, meal_id, meal):
+        """
+        Queues the change's record. Called under the write lock, so the queue
+        holds records in exactly the order the changes were applied in memory.
+        """
+        super()._mark_dirty(meal_id, meal)
+        record = {"op": "delete", "id": meal_id} if meal is None else {"op": "add", "meal": meal}
+        self._pending_records.append((meal_id, meal, record))
+
+    @timed("append_history")
+    def _write_pending(self):
+        """
+        Appends every queued record, in queue order, with one write.
+
+        Whichever thread gets here first writes the records of the others
+        too; a thread whose record was already written finds it on disk once
+        it holds the lock.
+        """
+        try:
+            # Lock order everywhere: interprocess lock, then _journal_lock.
+            with interprocess_lock(self.filepath), self._journal_lock:
+                self._catch_up()
+                with self.lock.write_locked():
+                    batch, self._pending_records = self._pending_records, []
+                if not batch:
+                    return
+                if os.fstat(self._journal.fileno()).st_ino != self._inode:
+                    self._journal.close()  # Replaced by another process's compaction
+                    self._journal = open(self.filepath, 'ab')
+                lines = [self._encode(record) for _, _, record in batch]
+                data = b"".join(lines)
+                self._journal.write(data)
+                self._journal.flush()
+                record_bytes_written("append_history", len(data))
+                if self.lazy_details:
+                    self._locate_written(batch, lines)
+                self._offset += len(data)
+                self._record_count += len(batch)
+        except IOError as e:
+            print(f"Error appending to meal history journal {self.filepath}: {e}")
+            return
+        self._clear_dirty({meal_id: meal for meal_id, meal, _ in batch})
+        self._maybe_start_compaction()
+
+    def _locate_written(self, batch, lines):
+        """
+        Lazy mode: records where the just written records start and replaces
+        the written meals in memory by their summaries. The caller holds _journal_lock.
+        """
+        offset = self._offset
+        for (meal_id, meal, _), line in zip(batch, lines):
+            if meal is None:
+                self._locations.pop(meal_id, None)
+            else:
+                self._locations[meal_id] = (offset, len(line))
+            offset += len(line)
+        with self.lock.write_locked():
+            for meal_id, meal, _ in batch:
+                position = self._index.get(meal_id)
+                if meal is not None and position is not None and self.history[position] is meal:
+                    self.history[position] = _summary_of(meal)
+
+    def get_meal_by_id(self, meal_id):
+        """
+        Retrieves a single meal by its ID.
+
+        In lazy mode the full meal is read from the journal unless it is cached.
+
+        Args:
+            meal_id (str): The unique ID of the meal.
+
+        Returns:
+            dict or None: The meal data if found, otherwise None.
+        """
+        meal = super().get_meal_by_id(meal_id)
+        if isinstance(meal, _MealSummary):
+            return self._read_details(meal_id) or meal
+        return meal
+
+    def _read_details(self, meal_id):
+        """Lazy mode: returns the full meal from the detail cache or the journal, or None."""
+        with self._detail_cache_lock:
+            meal = self._detail_cache.get(meal_id)
+            if meal is not None:
+                self._detail_cache.move_to_end(meal_id)
+                return meal
+        line = None
+        try:
+            with self._journal_lock:
+                for _ in range(2):
+                    with open(self.filepath, 'rb') as f:
+                        if os.fstat(f.fileno()).st_ino == self._inode:
+                            location = self._locations.get(meal_id)
+                            if location is None:
+                                return None
+                            f.seek(location[0])
+                            line = f.read(location[1])
+                            break
+                    self._catch_up()  # Another process compacted the journal; locate the meal again
+            meal = json.loads(line).get("meal") if line else None
+        except (IOError, ValueError) as e:
+            print(f"Error reading meal {meal_id} from {self.filepath}: {e}")
+            return None
+        if not isinstance(meal, dict) or meal.get("id") != meal_id:
+            return None
+        with self._detail_cache_lock:
+            self._detail_cache[meal_id] = meal
+            while len(self._detail_cache) > self.detail_cache_size:
+                self._detail_cache.popitem(last=False)
+        return meal
+
+    def _save_history(self):
+        """Rewrites the journal with the current history (a synchronous compaction)."""
+        self.compact()
+
+    def dead_record_ratio(self):
+        """Returns the share of journal records that no longer describe a live meal."""
+        if self._record_count == 0:
+            return 0.0
+        return (self._record_count - len(self.history)) / self._record_count
+
+    def _start_compaction(self):
+        """Marks a compaction as running and snapshots the history; the caller holds _journal_lock."""
+        self._compacting = True
+        with self.lock.read_locked():
+            # Together with _offset: the live meals as of that journal position,
+            # plus changes whose records are still being appended.
+            locations = dict(self._locations) if self.lazy_details else None
+            return list(self.history), self._offset, self._inode, locations
+
+    def _maybe_start_compaction(self):
+        if self._record_count < self.min_compaction_records:
+            return
+        if self.dead_record_ratio() <= self.compaction_threshold:
+            return
+        with self._journal_lock:
+            if self._compacting:
+                return
+            args = self._start_compaction()
+        self._compaction_thread = threading.Thread(
+            target=self._compact, args=args, name="meal-history-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+
+    @timed("compact_history")
+    def _compact(self, snapshot, offset, inode, locations=None):
+        """
+        Writes `snapshot` to a new journal, then swaps it in together with every
+        record appended (by any process) after `offset`.
+
+        In lazy mode `locations` are the record locations as of the snapshot;
+        the records of meals held only as summaries are copied from the old journal.
+        """
+        tmp_path = self.filepath + ".compact"
+        new_locations = {}
+        try:
+            with open(tmp_path, 'wb') as f:
+                with open(self.filepath, 'rb') as source:
+                    if os.fstat(source.fileno()).st_ino != inode:
+                        return  # Another process compacted the journal meanwhile
+                    for meal in snapshot:
+                        if isinstance(meal, _MealSummary):
+                            location = locations.get(meal.get("id"))
+                            if location is None:  # Its record cannot be copied: keep the old journal
+                                print(f"Skipping compaction of {self.filepath}: no record for meal {meal.get('id')}")
+                                return
+                            start, length = location
+                            source.seek(start)
+                            line = source.read(length)
+                        else:
+                            line = self._encode({"op": "add", "meal": meal})
+                        if locations is not None:
+                            new_locations[meal["id"]] = (f.tell(), len(line))
+                        f.write(line)
+                snapshot_size = f.tell()
+                with interprocess_lock(self.filepath), self._journal_lock:
+                    with open(self.filepath, 'rb') as old:
+                        if os.fstat(old.fileno()).st_ino != inode or self._inode != inode:
+                            return  # Another process compacted the journal meanwhile
+                        old.seek(offset)
+                        tail = old.read()
+                    tail = tail[:tail.rfind(b"\n") + 1]
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._journal.close()
+                    os.replace(tmp_path, self.filepath)
+                    record_bytes_written("compact_history", snapshot_size + len(tail))
+                    self._journal = open(self.filepath, 'ab')
+                    applied = self._offset - offset  # Part of the tail already reflected in memory
+                    self._inode = os.fstat(self._journal.fileno()).st_ino
+                    self._offset = snapshot_size + applied
+                    self._record_count = len(snapshot) + tail[:applied].count(b"\n")
+                    if locations is not None:
+                        self._relocate(new_locations, offset, snapshot_size)
+        except IOError as e:
+            print(f"Error compacting meal history journal {self.filepath}: {e}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._journal_lock:
+                if self._journal.closed:  # Failed between closing the old journal and opening the new one
+                    self._journal = open(self.filepath, 'ab')
+                self._compacting = False
+
+    def _relocate(self, snapshot_locations, offset, snapshot_size):
+        """
+        Lazy mode: points _locations at the compacted journal. Records from before
+        `offset` moved to `snapshot_locations`; later ones moved by the same amount
+        as the tail. Meals deleted since the snapshot are dropped. The caller holds _journal_lock.
+        """
+        relocated = {}
+        for meal_id, (start, length) in self._locations.items():
+            if start >= offset:
+                relocated[meal_id] = (start - offset + snapshot_size, length)
+            elif meal_id in snapshot_locations:
+                relocated[meal_id] = snapshot_locations[meal_id]
+        self._locations = relocated
+
+    def compact(self):
+        """Synchronously rewrites the journal so that it holds only live meals."""
+        while True:
+            self.wait_for_compaction()
+            with self._journal_lock:
+                if not self._compacting:
+                    args = self._start_compaction()
+                    break
+        self._compact(*args)
+
+    def wait_for_compaction(self):
+        """Blocks until a running background compaction has finished."""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self):
+        """Writes scheduled records, waits for compaction and closes the journal file."""
+        super().close()
+        self.wait_for_compaction()
+        with self._journal_lock:
+            if self._journal is not None and not self._journal.closed:
+                self._journal.close()
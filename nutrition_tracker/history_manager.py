@@ -1,33 +1,306 @@
+import base64
+import binascii
+import bisect
 import json
 import os
+import threading
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from .file_sync import atomic_write, file_stamp, interprocess_lock
+from .locking import RWLock
+from .meal_columns import MealColumns
+from .metrics import record_bytes_written, timed
+from .rollups import BUCKETS, NutritionRollups, TOTAL_FIELDS, bucket_count, parse_day
+from .snapshot import MEALS_KIND, Snapshot, SnapshotMeals, snapshot_path, write_meal_snapshot
+from .write_behind import WriteBehind
+
+_MISSING = object()
+MAX_TOTALS_BUCKETS = 5000
+
+def _order_key(meal):
+    """Sort key for the time-ordered index: (timestamp, id)."""
+    return (str(meal.get("timestamp") or ""), meal["id"])
+
+def _summarize(meal):
+    total_nutrition = meal.get("total_nutrition", {})
+    return {
+        "id": meal.get("id"),
+        "name": meal.get("name"),
+        "timestamp": meal.get("timestamp"),
+        "total_calories": total_nutrition.get("total_calories", 0),
+        "total_protein_g": total_nutrition.get("total_protein_g", 0),
+        "total_carbs_g": total_nutrition.get("total_carbs_g", 0),
+        "total_fat_g": total_nutrition.get("total_fat_g", 0)
+    }
+
+def _totals_fields(values):
+    """Formats rollup values ([meal count, calories, protein, carbs, fat], or None for none) for the API."""
+    meals, *totals = values or [0] * (len(TOTAL_FIELDS) + 1)
+    result = {"meals": int(round(meals))}
+    result.update((field, round(total, 2)) for field, total in zip(TOTAL_FIELDS, totals))
+    return result
+
+def encode_cursor(order_key):
+    """Encodes a (timestamp, id) index key as an opaque, URL-safe cursor string."""
+    raw = "\n".join(order_key).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    timestamp, sep, meal_id = raw.partition("\n")
+    if not sep:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return (timestamp, meal_id)
 
 class MealHistoryManager:
-    def __init__(self, filepath="meal_history.json"):
+    """
+    Keeps the meal history in memory and in a JSON file.
+
+    Several processes may share the file: refresh() picks up meals that other
+    processes added or deleted, and every save merges this process's
+    unsaved changes into the current file under an interprocess lock before
+    replacing it atomically.
+
+    With `flush_interval` set, adding or deleting a meal only schedules the
+    write, and a background thread writes all changes made in the meantime at
+    once, at most `flush_interval` seconds after the oldest of them (sooner
+    after `flush_max_changes` changes). Call flush() to write immediately and
+    close() when done; pending changes are also written when the interpreter
+    exits.
+
+    With `columnar`, the entries are held in a MealColumns store instead of
+    a list of dicts, which takes a fraction of the memory; the entries read
+    back are equal dicts.
+
+    With `snapshot`, a binary snapshot of the history (see snapshot.py) is
+    kept next to the JSON file, which stays the file of record. Loading maps
+    the snapshot into memory instead of parsing the JSON file whenever it was
+    written from the current file; the indexes come from the snapshot and
+    meal entries are built when they are read. A history loaded that way is
+    not converted to columns even with `columnar`, which would build them all.
+    """
+
+    def __init__(self, filepath="meal_history.json", flush_interval=None, flush_max_changes=100, columnar=False,
+                 snapshot=False):
+        """
+        Args:
+            filepath (str): Path of the history file.
+            flush_interval (float or None): Seconds a change may stay unwritten
+                (write-behind mode); None writes every change before returning.
+            flush_max_changes (int): Number of pending changes that triggers a
+                write before flush_interval has passed.
+            columnar (bool): Keep the entries in compact columns (MealColumns).
+            snapshot (bool): Keep a binary snapshot of the history for fast loading.
+        """
         self.filepath = filepath
+        self.snapshot = snapshot
+        # Mutations hold the write lock only while they update memory; persistence
+        # runs afterwards, so readers never wait for the disk.
+        self.lock = RWLock()
+        self._save_lock = threading.Lock()  # Serializes saves and refreshes of the history file
+        self._file_stamp = None  # file_stamp() of the file as last read or written here
+        self._dirty = {}  # Changes not saved yet, by meal id: the meal entry, or None for a deletion
         self.history = self._load_history()
+        self._rebuild_index()
+        if snapshot and not isinstance(self.history, SnapshotMeals) and self._file_stamp is not None:
+            self._write_binary_snapshot(self.history)  # Missing or stale: the next load will use it
+        if columnar and not isinstance(self.history, SnapshotMeals):
+            self.history = MealColumns(self.history)  # Mapped entries are compact already, and built on demand
+        self._write_behind = None
+        if flush_interval:
+            self._write_behind = WriteBehind(
+                self._write_pending, flush_interval, flush_max_changes, name="meal-history-write-behind"
+            )
+
+    def _rebuild_index(self):
+        """Rebuilds the id -> position index and the time-ordered index over self.history."""
+        if isinstance(self.history, SnapshotMeals) and self.history.unchanged:
+            self._index = self.history.index()
+            self._order = self.history.order_keys()
+            self._rollups = self.history.rollups()
+            return
+        for meal in self.history:
+            if not isinstance(meal.get("id"), str):
+                # Hand-edited or very old entries: give them an id so they can be addressed.
+                meal["id"] = str(meal["id"]) if meal.get("id") is not None else str(uuid.uuid4())
+        self._index = {meal.get("id"): position for position, meal in enumerate(self.history)}
+        if len(self._index) != len(self.history):
+            # Duplicate ids: keep the last entry for each id so every entry is indexed.
+            print(f"Dropping {len(self.history) - len(self._index)} duplicate meal ids from {self.filepath}")
+            unique = {meal.get("id"): meal for meal in self.history}
+            self.history = list(unique.values())
+            self._index = {meal_id: position for position, meal_id in enumerate(unique)}
+        # (timestamp, id) keys in ascending order; ISO-8601 UTC timestamps sort chronologically as strings.
+        self._order = sorted(_order_key(meal) for meal in self.history)
+        self._rollups = NutritionRollups(self.history)
 
+    def _read_history_file(self):
+        """Reads the JSON file. Raises IOError or ValueError."""
+        with open(self.filepath, 'r') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError("meal history must be a JSON list")
+        return data
+
+    @timed("load_history")
     def _load_history(self):
-        """Loads meal history from the JSON file."""
-        if not os.path.exists(self.filepath):
+        """Loads meal history from the snapshot (if enabled and current) or from the JSON file."""
+        self._file_stamp = file_stamp(self.filepath)
+        if self._file_stamp is None:
             return []
+        if self.snapshot:
+            mapped = Snapshot.open(snapshot_path(self.filepath), MEALS_KIND, self._file_stamp)
+            if mapped is not None:
+                return SnapshotMeals(mapped)
         try:
-            with open(self.filepath, 'r') as f:
-                data = json.load(f)
-                # Could add data validation here if needed
-                return data
-        except (IOError, json.JSONDecodeError) as e:
+            return self._read_history_file()
+        except (IOError, ValueError) as e:
             print(f"Error loading meal history from {self.filepath}: {e}")
             return []
 
+    @timed("save_history")
     def _save_history(self):
-        """Saves the current meal history to the JSON file."""
+        """
+        Saves the current meal history to the JSON file, merged with changes saved by other processes.
+
+        Errors are reported and re-raised, so that write-behind keeps the changes pending and retries.
+        """
         try:
-            with open(self.filepath, 'w') as f:
-                json.dump(self.history, f, indent=4)
+            # One save at a time, each from a snapshot taken after the previous
+            # save finished, so a slower save can never overwrite a newer one.
+            with self._save_lock, interprocess_lock(self.filepath):
+                with self.lock.read_locked():
+                    pending = dict(self._dirty)
+                    history = list(self.history)
+                merged = None
+                if file_stamp(self.filepath) != self._file_stamp:
+                    # Another process saved since this one last synced: start from its file.
+                    try:
+                        merged = {meal.get("id"): meal for meal in self._read_history_file()}
+                    except (IOError, ValueError) as e:
+                        print(f"Error reading meal history from {self.filepath}: {e}. Overwriting it.")
+                    else:
+                        for meal_id, meal in pending.items():
+                            if meal is None:
+                                merged.pop(meal_id, None)
+                            else:
+                                merged[meal_id] = meal
+                        history = list(merged.values())
+                size = atomic_write(self.filepath, lambda f: json.dump(history, f, indent=4))
+                record_bytes_written("save_history", size)
+                self._file_stamp = file_stamp(self.filepath)
+                if self.snapshot:
+                    self._write_binary_snapshot(history)
+                self._clear_dirty(pending)
+                if merged is not None:
+                    self._apply_external(history)
         except IOError as e:
             print(f"Error saving meal history to {self.filepath}: {e}")
+            raise
+
+    def _write_binary_snapshot(self, history):
+        """Writes the snapshot of the JSON file as last read or written here. A failure only costs the next load its speed."""
+        path = snapshot_path(self.filepath)
+        try:
+            size = write_meal_snapshot(path, self._file_stamp, history)
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+            print(f"Error writing meal history snapshot to {path}: {e}")
+        else:
+            record_bytes_written("save_snapshot", size)
+
+    def refresh(self):
+        """
+        Picks up meals that other processes added or deleted.
+
+        Costs a single os.stat when the file is unchanged. Otherwise the file
+        is read and only the differences are applied; changes of this process
+        that are not saved yet take precedence.
+
+        Returns:
+            bool: True if the history changed.
+        """
+        if file_stamp(self.filepath) == self._file_stamp:
+            return False
+        with self._save_lock:
+            stamp = file_stamp(self.filepath)
+            if stamp is None or stamp == self._file_stamp:
+                return False
+            try:
+                history = self._read_history_file()
+            except (IOError, ValueError) as e:
+                print(f"Error reading meal history from {self.filepath}: {e}. Keeping the loaded history.")
+                history = None
+            self._file_stamp = stamp
+            return history is not None and self._apply_external(history)
+
+    def _apply_external(self, history):
+        """Brings memory in line with `history` (another copy's meals), touching only the differences."""
+        meals = {meal["id"]: meal for meal in history if isinstance(meal, dict) and isinstance(meal.get("id"), str)}
+        with self.lock.read_locked():
+            removed = [meal_id for meal_id in self._index if meal_id not in meals]
+            added = [meal for meal_id, meal in meals.items() if meal_id not in self._index]
+        if not removed and not added:
+            return False
+        with self.lock.write_locked():
+            for meal_id in removed:
+                if meal_id not in self._dirty:
+                    self._remove(meal_id)
+            for meal in added:
+                if meal["id"] not in self._dirty and meal["id"] not in self._index:
+                    self._insert(meal)
+        return True
+
+    def _mark_dirty(self, meal_id, meal):
+        """Records a change that still has to be persisted. Called under the write lock."""
+        self._dirty[meal_id] = meal
+
+    def _clear_dirty(self, persisted):
+        """Forgets the changes in `persisted` unless they were superseded meanwhile."""
+        with self.lock.write_locked():
+            for meal_id, meal in persisted.items():
+                if self._dirty.get(meal_id, _MISSING) is meal:
+                    del self._dirty[meal_id]
+
+    def _persist_add(self, meal_entry):
+        """Persists a newly added meal."""
+        self._persist()
+
+    def _persist_delete(self, meal_id):
+        """Persists the deletion of a meal."""
+        self._persist()
+
+    def _persist(self):
+        """Writes the pending changes now, or schedules them in write-behind mode."""
+        if self._write_behind is not None:
+            self._write_behind.mark_dirty()
+        else:
+            try:
+                self._write_pending()
+            except IOError:
+                pass  # Reported by _save_history; the changes stay unsaved and go with the next save
+
+    def _write_pending(self):
+        """Writes every change that is not saved yet. Storage subclasses override this."""
+        self._save_history()
+
+    def flush(self):
+        """Writes scheduled changes now (write-behind mode only)."""
+        if self._write_behind is not None:
+            self._write_behind.flush()
+
+    def close(self):
+        """Writes any scheduled changes and stops the write-behind thread."""
+        if self._write_behind is not None:
+            self._write_behind.close()
 
     def add_meal(self, meal_name, ingredients_used, total_nutrition, nutrition_per_100g):
         """
@@ -50,29 +323,193 @@ class MealHistoryManager:
             "total_nutrition": total_nutrition,
             "nutrition_per_100g": nutrition_per_100g
         }
-        self.history.append(new_meal_entry)
-        self._save_history()
+        with self.lock.write_locked():
+            self._insert(new_meal_entry)
+            self._mark_dirty(new_meal_entry["id"], new_meal_entry)
+        self._persist_add(new_meal_entry)
         return new_meal_entry
 
+    def _insert(self, meal):
+        """Adds a meal to the history and both indexes. Called under the write lock."""
+        self._index[meal["id"]] = len(self.history)
+        self.history.append(meal)
+        key = _order_key(meal)
+        if not self._order or key >= self._order[-1]:
+            self._order.append(key)  # New meals are almost always the most recent
+        else:
+            bisect.insort(self._order, key)
+        self._rollups.add(meal)
+
+    def _remove(self, meal_id):
+        """Removes a meal from the history and both indexes. Called under the write lock."""
+        position = self._index.pop(meal_id, None)
+        if position is None:
+            return False
+        meal = self.history[position]
+        key = _order_key(meal)
+        del self._order[bisect.bisect_left(self._order, key)]
+        self._rollups.remove(meal)
+        last_meal = self.history.pop()
+        if position < len(self.history):
+            self.history[position] = last_meal
+            self._index[last_meal.get("id")] = position
+        return True
+
+    def meal_count(self):
+        """Returns the number of meals in the history."""
+        return len(self._index)
+
     def get_all_meals_summary(self):
         """
         Returns a list of all meals with summary information, sorted by most recent first.
         Summary includes: id, name, timestamp, and total calories.
         """
-        summaries = []
-        for meal in sorted(self.history, key=lambda x: x.get("timestamp", ""), reverse=True):
-            total_nutrition = meal.get("total_nutrition", {})
-            summary = {
-                "id": meal.get("id"),
-                "name": meal.get("name"),
-                "timestamp": meal.get("timestamp"),
-                "total_calories": total_nutrition.get("total_calories", 0),
-                "total_protein_g": total_nutrition.get("total_protein_g", 0),
-                "total_carbs_g": total_nutrition.get("total_carbs_g", 0),
-                "total_fat_g": total_nutrition.get("total_fat_g", 0)
-            }
-            summaries.append(summary)
-        return summaries
+        with self.lock.read_locked():
+            return [self._summary_for_key(key) for key in reversed(self._order)]
+
+    def _summary_for_key(self, key):
+        position = self._index[key[1]]
+        if isinstance(self.history, (MealColumns, SnapshotMeals)):
+            summary = self.history.summary(position)
+            if summary is not None:
+                return summary
+        return _summarize(self.history[position])
+
+    def get_meals_page(self, limit=50, before=None, after=None, from_ts=None, to_ts=None):
+        """
+        Returns one page of meal summaries, most recent first.
+
+        The page is cut from the time-ordered index with binary searches, so
+        a page costs O(log n + limit) regardless of the history size.
+
+        Args:
+            limit (int): Maximum number of summaries to return.
+            before (str or None): Cursor; only meals older than it are returned.
+            after (str or None): Cursor; only meals newer than it are returned.
+                The page then holds the `limit` meals closest to the cursor.
+            from_ts (str or None): ISO-8601 timestamp (or date); inclusive lower bound.
+            to_ts (str or None): ISO-8601 timestamp (or date); exclusive upper bound.
+
+        Returns:
+            dict: {"history": [summaries], "next_cursor": cursor for the next
+                older page or None, "prev_cursor": cursor for the next newer
+                page or None}.
+
+        Raises:
+            ValueError: If a cursor is malformed or limit is not positive.
+        """
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+        with self.lock.read_locked():
+            return self._page(limit, before, after, from_ts, to_ts)
+
+    def _page(self, limit, before, after, from_ts, to_ts):
+        order = self._order
+        range_lo = bisect.bisect_left(order, (from_ts,)) if from_ts else 0
+        range_hi = bisect.bisect_left(order, (to_ts,)) if to_ts else len(order)
+        lo, hi = range_lo, range_hi
+        if before:
+            hi = min(hi, bisect.bisect_left(order, decode_cursor(before)))
+        if after:
+            lo = max(lo, bisect.bisect_right(order, decode_cursor(after)))
+        if lo >= hi:
+            return {"history": [], "next_cursor": None, "prev_cursor": None}
+
+        if after and not before:
+            start, end = lo, min(hi, lo + limit)
+        else:
+            start, end = max(lo, hi - limit), hi
+        keys = order[start:end]
+        return {
+            "history": [self._summary_for_key(key) for key in reversed(keys)],
+            "next_cursor": encode_cursor(keys[0]) if start > range_lo else None,
+            "prev_cursor": encode_cursor(keys[-1]) if end < range_hi else None,
+        }
+
+    def get_nutrition_totals(self, from_ts=None, to_ts=None, bucket="day"):
+        """
+        Returns the nutrition totals of the meals logged in a date range, per day, week or month.
+
+        The totals come from per-day rollups that add_meal() and delete_meal()
+        keep up to date, so a query costs O(1) per bucket regardless of the
+        number of meals. Days are UTC days.
+
+        Args:
+            from_ts (str or None): ISO-8601 date (or timestamp, of which the
+                day is used); inclusive. Defaults to the day of the oldest meal.
+            to_ts (str or None): ISO-8601 date (or timestamp); exclusive.
+                Defaults to the day after the most recent meal.
+            bucket (str): "day", "week" (starting on Monday) or "month".
+
+        Returns:
+            dict: {"bucket", "from", "to", "totals": {...}, "buckets": [{"start",
+                "meals", "total_calories", ...}, ...]}. Buckets without meals
+                are included; the first and last buckets only cover the part
+                of them inside the range.
+
+        Raises:
+            ValueError: If a date or the bucket is invalid, or the range spans
+                more than MAX_TOTALS_BUCKETS buckets.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}.")
+        try:
+            start = parse_day(from_ts) if from_ts else None
+            end = parse_day(to_ts) if to_ts else None
+        except ValueError as e:
+            raise ValueError(f"Invalid date: {e}") from e
+        with self.lock.read_locked():
+            data_range = self._rollups.day_range()
+            if start is None:
+                start = data_range[0] if data_range else end
+            if end is None:
+                end = data_range[1] if data_range else start
+            if start is None:  # No meals and no range
+                return {"bucket": bucket, "from": None, "to": None, "totals": _totals_fields(None), "buckets": []}
+            end = max(start, end)
+            if bucket_count(start, end, bucket) > MAX_TOTALS_BUCKETS:
+                raise ValueError(f"The range spans more than {MAX_TOTALS_BUCKETS} {bucket} buckets.")
+            overall, buckets = self._rollups.totals(start, end, bucket)
+
+        return {
+            "bucket": bucket,
+            "from": date.fromordinal(start).isoformat(),
+            "to": date.fromordinal(end).isoformat(),
+            "totals": _totals_fields(overall),
+            "buckets": [dict(start=date.fromordinal(day).isoformat(), **_totals_fields(values))
+                        for day, values in buckets],
+        }
+
+    def iter_meals(self, from_ts=None, to_ts=None, chunk_size=500):
+        """
+        Yields full meal entries, oldest first, in constant memory.
+
+        The time-ordered index is walked `chunk_size` keys at a time, holding
+        the read lock only while a chunk of keys is cut, so writers are not
+        blocked for the length of the walk. Meals deleted before their chunk
+        is reached are left out; meals added behind the current position
+        are not included.
+
+        Args:
+            from_ts (str or None): ISO-8601 timestamp (or date); inclusive lower bound.
+            to_ts (str or None): ISO-8601 timestamp (or date); exclusive upper bound.
+            chunk_size (int): Number of keys cut from the index at a time.
+        """
+        position = (from_ts,) if from_ts else None
+        while True:
+            with self.lock.read_locked():
+                start = bisect.bisect_left(self._order, position) if position is not None else 0
+                if position is not None and start < len(self._order) and self._order[start] == position:
+                    start += 1  # Resume after the last key of the previous chunk
+                end = bisect.bisect_left(self._order, (to_ts,)) if to_ts else len(self._order)
+                keys = self._order[start:min(end, start + chunk_size)]
+            if not keys:
+                return
+            for key in keys:
+                meal = self.get_meal_by_id(key[1])
+                if meal is not None:
+                    yield meal
+            position = keys[-1]
 
     def get_meal_by_id(self, meal_id):
         """
@@ -84,27 +521,32 @@ class MealHistoryManager:
         Returns:
             dict or None: The meal data if found, otherwise None.
         """
-        for meal in self.history:
-            if meal.get("id") == meal_id:
-                return meal
-        return None
+        with self.lock.read_locked():
+            position = self._index.get(meal_id)
+            if position is None:
+                return None
+            return self.history[position]
 
     def delete_meal(self, meal_id):
         """
         Deletes a meal from the history by its ID.
 
+        The last entry is moved into the freed slot, so the deletion is O(1)
+        but does not preserve insertion order (summaries are sorted by
+        timestamp anyway).
+
         Args:
             meal_id (str): The unique ID of the meal to delete.
 
         Returns:
             bool: True if the meal was found and deleted, False otherwise.
         """
-        initial_len = len(self.history)
-        self.history = [meal for meal in self.history if meal.get("id") != meal_id]
-        if len(self.history) < initial_len:
-            self._save_history()
-            return True
-        return False
+        with self.lock.write_locked():
+            if not self._remove(meal_id):
+                return False
+            self._mark_dirty(meal_id, None)
+        self._persist_delete(meal_id)
+        return True
 
 if __name__ == '__main__':
     # Example Usage (for testing the manager directly)
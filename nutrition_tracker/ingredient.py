@@ -1,6 +1,27 @@
+from operator import itemgetter
+
+_FIELDS = ("name", "calories", "protein", "carbs", "fat")
+_NUMBER_TYPES = {int, float}
+
+def _rows_are_valid(rows: list) -> bool:
+    """Checks a whole batch of (name, calories, protein, carbs, fat) rows in a few passes."""
+    name_of = itemgetter(0)
+    if not rows:
+        return True
+    if set(map(type, map(name_of, rows))) != {str} or not all(map(name_of, rows)):
+        return False
+    for column in range(1, len(_FIELDS)):
+        value_of = itemgetter(column)
+        if not set(map(type, map(value_of, rows))) <= _NUMBER_TYPES or min(map(value_of, rows)) < 0:
+            return False
+    return True
+
+
 class Ingredient:
     """Represents an ingredient and its nutritional information per 100g."""
 
+    __slots__ = _FIELDS
+
     def __init__(self, name: str, calories: float, protein: float, carbs: float, fat: float):
         """
         Initializes an Ingredient object.
@@ -97,3 +118,46 @@ class Ingredient:
             carbs=data["carbs"],
             fat=data["fat"],
         )
+
+    @classmethod
+    def from_rows(cls, rows) -> list['Ingredient']:
+        """
+        Creates Ingredient objects from many (name, calories, protein, carbs, fat) rows.
+
+        Meant for data the database wrote itself. The batch is validated as a
+        whole instead of field by field; only if that check fails are the rows
+        built one by one through __init__, which raises for the offending row.
+
+        Raises:
+            ValueError: If any row is invalid.
+        """
+        rows = list(rows)
+        if not _rows_are_valid(rows):
+            return [cls(*row) for row in rows]
+        new = cls.__new__
+        ingredients = []
+        append = ingredients.append
+        for name, calories, protein, carbs, fat in rows:
+            ingredient = new(cls)
+            ingredient.name = name
+            ingredient.calories = float(calories)
+            ingredient.protein = float(protein)
+            ingredient.carbs = float(carbs)
+            ingredient.fat = float(fat)
+            append(ingredient)
+        return ingredients
+
+    @classmethod
+    def from_dicts(cls, records) -> list['Ingredient']:
+        """
+        Creates Ingredient objects from many dictionaries (see from_rows).
+
+        Raises:
+            ValueError: If any dictionary is missing keys or has invalid values.
+        """
+        records = list(records)
+        try:
+            rows = list(map(itemgetter(*_FIELDS), records))
+        except (KeyError, TypeError, IndexError):
+            return [cls.from_dict(record) for record in records]
+        return cls.from_rows(rows)
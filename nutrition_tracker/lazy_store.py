@@ -0,0 +1,94 @@
+import threading
+import time
+
+class LazyStore:
+    """
+    Stands in for a manager (IngredientDatabase, MealHistoryManager) that is
+    created on first use.
+
+    Attribute access is forwarded to the manager, creating it first; a
+    thread that needs the manager while another thread creates it waits for
+    that load only. refresh(), flush() and close() do not create the manager:
+    a manager that is not loaded yet has nothing to pick up or write.
+    """
+
+    def __init__(self, name: str, factory):
+        """
+        Args:
+            name: Name of the store, used in readiness reports and metrics.
+            factory: Callable that creates and returns the manager.
+        """
+        self.name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()  # Held while the manager is created
+        self.load_seconds: float | None = None  # Time the creation took, once loaded
+        self.error: Exception | None = None  # Error of the last failed creation
+
+    def get(self):
+        """Returns the manager, creating it (or waiting for the thread creating it) if needed."""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    start = time.perf_counter()
+                    try:
+                        instance = self._factory()
+                    except Exception as e:
+                        self.error = e
+                        raise
+                    self.load_seconds = time.perf_counter() - start
+                    self.error = None
+                    self._instance = instance
+        return instance
+
+    def peek(self):
+        """Returns the manager if it is loaded, else None, without waiting."""
+        return self._instance
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def refresh(self) -> bool:
+        instance = self._instance
+        return instance.refresh() if instance is not None else False
+
+    def flush(self) -> None:
+        instance = self._instance
+        if instance is not None:
+            instance.flush()
+
+    def close(self) -> None:
+        instance = self._instance
+        if instance is not None:
+            instance.close()
+
+    def __repr__(self) -> str:
+        return f"<LazyStore {self.name}: {self._instance!r}>" if self.ready else f"<LazyStore {self.name}: not loaded>"
+
+def warm_up(stores, name: str = "store-warm-up") -> threading.Thread:
+    """
+    Loads `stores` (LazyStore objects) one after the other on a background
+    thread, so that they are ready before the first requests need them.
+    A store that fails to load is retried by the next thread that uses it.
+
+    Returns:
+        The started daemon thread.
+    """
+    def run():
+        for store in stores:
+            try:
+                store.get()
+            except Exception as e:
+                print(f"Error loading the {store.name} store: {e}")
+            else:
+                print(f"The {store.name} store is ready (loaded in {store.load_seconds:.3f} s)")
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,81 @@
+import threading
+from contextlib import contextmanager
+
+class RWLock:
+    """
+    Reader-writer lock that prefers writers.
+
+    Any number of threads may hold the read lock at once; the write lock is
+    exclusive. While a writer waits, new readers wait too, so a steady stream
+    of reads cannot starve writes. Both locks are reentrant: a thread that
+    holds the read lock may take it again even while a writer waits, and the
+    writer may take the read or write lock again. Upgrading a read lock to
+    the write lock is not supported and raises RuntimeError.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer = None  # Thread ident of the current writer
+        self._write_depth = 0
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        depth = getattr(self._local, "read_depth", 0)
+        with self._cond:
+            if not depth and self._writer != me:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers += 1
+        self._local.read_depth = depth + 1
+
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            self._local.read_depth -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, "read_depth", 0):
+                raise RuntimeError("Cannot upgrade a read lock to a write lock.")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        """Context manager holding the read (shared) lock."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        """Context manager holding the write (exclusive) lock."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -15,6 +15,7 @@ class Meal:
             raise ValueError("Meal name must be a non-empty string.")
         self.name = name
         self._ingredients: List[Tuple[Ingredient, float]] = [] # List of (Ingredient, weight_grams)
+        self._line_nutrition: List[Tuple[float, float, float, float]] = [] # (calories, protein, carbs, fat) per line
         self.total_calories: float = 0.0
         self.total_protein: float = 0.0
         self.total_carbs: float = 0.0
@@ -42,6 +43,7 @@ class Meal:
 
         # Update totals
         calories, protein, carbs, fat = ingredient.get_nutrition_for_weight(weight_grams)
+        self._line_nutrition.append((calories, protein, carbs, fat))
         self.total_calories += calories
         self.total_protein += protein
         self.total_carbs += carbs
@@ -49,6 +51,55 @@ class Meal:
         self.total_weight_grams += weight_grams
         print(f"Added {weight_grams}g of {ingredient.name} to {self.name}.")
 
+    def add_ingredients(self, items: List[Tuple[Ingredient, float]], nutrient_matrix=None) -> None:
+        """
+        Adds several ingredients at once.
+
+        With a NutrientMatrix (e.g. IngredientDatabase.nutrient_matrix) that
+        holds every ingredient, all lines are computed in one vectorized
+        operation; otherwise each item goes through add_ingredient. The passed
+        Ingredient objects are authoritative: the matrix is only used when its
+        rows hold exactly their values, so an ingredient that is missing from
+        the matrix or differs from its row is computed from the object itself.
+
+        Args:
+            items: List of (Ingredient, weight_grams) pairs.
+            nutrient_matrix: Optional NutrientMatrix to compute with.
+
+        Raises:
+            ValueError: If a weight is negative.
+            TypeError: If an item is not an Ingredient instance.
+        """
+        if nutrient_matrix is None:
+            for ingredient, weight_grams in items:
+                self.add_ingredient(ingredient, weight_grams)
+            return
+
+        for ingredient, weight_grams in items:
+            if not isinstance(ingredient, Ingredient):
+                raise TypeError("Item added must be an Ingredient object.")
+            if not isinstance(weight_grams, (int, float)) or weight_grams < 0:
+                raise ValueError("Weight must be a non-negative number.")
+        try:
+            rows = nutrient_matrix.rows_for([ingredient.name for ingredient, _ in items])
+        except KeyError:
+            rows = None
+        if rows is None or not nutrient_matrix.holds(rows, [ingredient for ingredient, _ in items]):
+            # Ingredients not managed by this matrix, or with other values: use the scalar path.
+            self.add_ingredients(items)
+            return
+
+        result = nutrient_matrix.compute(rows, [weight for _, weight in items])
+        self._ingredients.extend(items)
+        self._line_nutrition.extend(tuple(line) for line in result.meal_lines())
+        calories, protein, carbs, fat = result.totals[0].tolist()
+        self.total_calories += calories
+        self.total_protein += protein
+        self.total_carbs += carbs
+        self.total_fat += fat
+        self.total_weight_grams += float(result.total_weights[0])
+        print(f"Added {len(items)} ingredients to {self.name}.")
+
     def get_total_nutrition(self) -> Dict[str, float]:
         """
         Returns the total nutritional information for the entire meal.
@@ -91,8 +142,7 @@ class Meal:
     def get_ingredients_list(self) -> List[Dict[str, any]]:
         """Returns a list of ingredients in the meal with their details."""
         ingredients_details = []
-        for ingredient, weight in self._ingredients:
-            c, p, cb, f = ingredient.get_nutrition_for_weight(weight)
+        for (ingredient, weight), (c, p, cb, f) in zip(self._ingredients, self._line_nutrition):
             ingredients_details.append({
                 "name": ingredient.name,
                 "weight_g": weight,
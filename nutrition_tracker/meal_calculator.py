@@ -0,0 +1,262 @@
+import math
+import threading
+from collections import OrderedDict
+
+from .meal import Meal
+
+class MealInputError(ValueError):
+    """A meal in a calculation request is malformed or references unknown ingredients."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_meal_request(meal_data) -> tuple[str, list[tuple[str, float]]]:
+    """
+    Validates one meal of a calculation request.
+
+    Args:
+        meal_data: Dict with 'name' (optional) and 'ingredients', a list of
+                   {'name': str, 'weight': number} dicts.
+
+    Returns:
+        (meal_name, [(ingredient_name, weight_grams), ...])
+
+    Raises:
+        MealInputError: If the meal is malformed.
+    """
+    if not isinstance(meal_data, dict):
+        raise MealInputError("Each meal must be an object.")
+    meal_name = meal_data.get('name', 'My Meal')
+    if not isinstance(meal_name, str) or not meal_name:
+        raise MealInputError("Meal name must be a non-empty string.")
+    ingredient_inputs = meal_data.get('ingredients')
+    if not ingredient_inputs or not isinstance(ingredient_inputs, list):
+        raise MealInputError("No ingredients provided for the meal.")
+
+    items = []
+    for item in ingredient_inputs:
+        if not isinstance(item, dict):
+            raise MealInputError("Invalid ingredient data: name and weight are required.")
+        ingredient_name = item.get('name')
+        weight = item.get('weight')
+        if not ingredient_name or weight is None:
+            raise MealInputError("Invalid ingredient data: name and weight are required.")
+        if not isinstance(ingredient_name, str):
+            raise MealInputError("Ingredient name must be a non-empty string.")
+        try:
+            weight_float = float(weight)
+        except (TypeError, ValueError):
+            raise MealInputError(f"Invalid weight format for {ingredient_name}.") from None
+        if not math.isfinite(weight_float):
+            raise MealInputError(f"Weight for {ingredient_name} must be a finite number.")
+        if weight_float < 0:
+            raise MealInputError(f"Weight for {ingredient_name} cannot be negative.")
+        items.append((ingredient_name, weight_float))
+    return meal_name, items
+
+
+def _line(name, weight, values) -> dict:
+    calories, protein, carbs, fat = values
+    return {
+        "name": name,
+        "weight_g": weight,
+        "calories": round(calories, 2),
+        "protein_g": round(protein, 2),
+        "carbs_g": round(carbs, 2),
+        "fat_g": round(fat, 2),
+    }
+
+
+class MealCalculationCache:
+    """
+    Bounded LRU cache of calculated meals.
+
+    Keys are (database generation, sorted (name, weight) pairs), so the same
+    ingredients in any order share an entry, and any change to the ingredient
+    database makes older entries unreachable; they age out as new ones arrive.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Args:
+            maxsize: Maximum number of cached meals; 0 disables caching.
+        """
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative.")
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(generation: int, items) -> tuple:
+        """Returns the cache key of a meal given as (ingredient name, weight) pairs."""
+        return generation, tuple(sorted(items))
+
+    def get(self, key):
+        """Returns the cached entry for key, or None, and counts the hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry) -> None:
+        """Stores an entry, evicting the least recently used ones beyond maxsize."""
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops all entries; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the current size and the hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def _compute(db, ingredients, meal_items) -> list[tuple]:
+    """
+    Computes meals given as lists of (name, weight) pairs.
+
+    Returns (total_nutrition, nutrition_per_100g, {(name, weight): line}) per meal.
+    """
+    matrix = db.nutrient_matrix
+    if matrix is not None and meal_items:
+        names, weights, offsets = [], [], []
+        for items in meal_items:
+            offsets.append(len(names))
+            for name, weight in items:
+                names.append(name)
+                weights.append(weight)
+        try:
+            batch = matrix.compute(matrix.rows_for(names), weights, offsets)
+        except KeyError:
+            batch = None  # Matrix out of step with the catalog; use the scalar path.
+        if batch is not None:
+            return [
+                (
+                    batch.total_nutrition(position),
+                    batch.nutrition_per_100g(position),
+                    {item: _line(*item, values) for item, values in zip(items, batch.meal_lines(position))},
+                )
+                for position, items in enumerate(meal_items)
+            ]
+
+    computed = []
+    for items in meal_items:
+        meal = Meal(name="Meal")
+        meal.add_ingredients([(ingredients[name], weight) for name, weight in items])
+        lines = {(line["name"], line["weight_g"]): line for line in meal.get_ingredients_list()}
+        computed.append((meal.get_total_nutrition(), meal.get_nutrition_per_100g(), lines))
+    return computed
+
+
+def calculate_meals(db, meals: list, cache: MealCalculationCache | None = None) -> list[dict]:
+    """
+    Calculates the nutrition of many meals at once.
+
+    Every distinct ingredient name is looked up once for the whole batch,
+    and when the database has a nutrient matrix all meals that are not
+    cached are computed in a single vectorized operation. One bad meal never
+    fails the batch.
+
+    Args:
+        db: The IngredientDatabase to resolve ingredient names against.
+        meals: List of meal dicts as accepted by parse_meal_request.
+        cache: Optional MealCalculationCache. With a cache, meals are computed
+               with their lines in canonical (sorted) order, so a result does
+               not depend on whether it was cached.
+
+    Returns:
+        One dict per input meal, in order. Successful meals have the same
+        fields as the /api/calculate_meal response; failed meals are
+        {"success": False, "message": str, "status": int}.
+    """
+    # A consistent view of the catalog for the lookups and the matrix computation.
+    with db.lock.read_locked():
+        return _calculate_meals(db, meals, cache)
+
+
+def _calculate_meals(db, meals, cache):
+    generation = db.generation  # Read before any lookup so entries are never filed under a newer generation.
+    results: list[dict | None] = [None] * len(meals)
+    parsed = []  # (index, meal_name, items)
+    for index, meal_data in enumerate(meals):
+        try:
+            meal_name, items = parse_meal_request(meal_data)
+        except MealInputError as e:
+            results[index] = {"success": False, "message": str(e), "status": e.status}
+            continue
+        parsed.append((index, meal_name, items))
+
+    ingredients = {}
+    for _, _, items in parsed:
+        for name, _ in items:
+            if name not in ingredients:
+                ingredients[name] = db.get_ingredient(name)
+
+    resolved = []  # (index, meal_name, items, key)
+    pending = {}  # key -> items to compute; the key is a position when there is no cache
+    entries = {}  # key -> (total_nutrition, nutrition_per_100g, lines)
+    for index, meal_name, items in parsed:
+        missing = list(dict.fromkeys(name for name, _ in items if ingredients[name] is None))
+        if missing:
+            results[index] = {
+                "success": False,
+                "message": f"The following ingredients were not found in the database: {', '.join(missing)}. Please add them first.",
+                "status": 404,
+            }
+            continue
+        if cache is None:
+            key = len(pending)
+            pending[key] = items
+        else:
+            key = MealCalculationCache.make_key(generation, items)
+            if key not in pending and key not in entries:
+                entry = cache.get(key)
+                if entry is None:
+                    pending[key] = list(key[1])
+                else:
+                    entries[key] = entry
+        resolved.append((index, meal_name, items, key))
+
+    for key, entry in zip(pending, _compute(db, ingredients, list(pending.values()))):
+        entries[key] = entry
+        if cache is not None:
+            cache.put(key, entry)
+
+    for index, meal_name, items, key in resolved:
+        total_nutrition, nutrition_per_100g, lines = entries[key]
+        results[index] = {
+            "success": True,
+            "meal_name": meal_name,
+            "total_nutrition": dict(total_nutrition),
+            "nutrition_per_100g": dict(nutrition_per_100g),
+            "ingredients_list": [dict(lines[item]) for item in items],
+        }
+    return results
@@ -0,0 +1,213 @@
+import struct
+import uuid
+from array import array
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MEAL_KEYS = ["id", "name", "timestamp", "ingredients_used", "total_nutrition", "nutrition_per_100g"]
+_TOTAL_KEYS = ["total_calories", "total_protein_g", "total_carbs_g", "total_fat_g", "total_weight_g"]
+_PER_100G_KEYS = ["calories_per_100g", "protein_per_100g", "carbs_per_100g", "fat_per_100g"]
+_LINE_KEYS = ["name", "weight_g"]
+_LINE = struct.Struct("<Id")  # Ingredient name number (top bit: weight was an int), weight
+_INT_WEIGHT = 1 << 31
+
+def _timestamp_to_micros(timestamp):
+    """Returns microseconds since the epoch if `timestamp` is an ISO-8601 UTC string that round-trips, else None."""
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    if moment.utcoffset() != timedelta(0):
+        return None
+    micros = (moment - _EPOCH) // timedelta(microseconds=1)
+    return micros if _micros_to_timestamp(micros) == timestamp else None
+
+def _micros_to_timestamp(micros):
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+def _uuid_int(meal_id):
+    """Returns the 128-bit value of a canonical UUID string, else None."""
+    if not isinstance(meal_id, str) or len(meal_id) != 36:
+        return None
+    try:
+        value = uuid.UUID(meal_id)
+    except ValueError:
+        return None
+    return value.int if str(value) == meal_id else None
+
+def _floats(values, keys):
+    """Returns the values of `values` for exactly `keys`, in order, if they are all floats, else None."""
+    if not isinstance(values, dict) or list(values) != keys:
+        return None
+    numbers = list(values.values())
+    return numbers if all(isinstance(v, float) for v in numbers) else None
+
+class MealColumns:
+    """
+    Compact, column-oriented storage for meal history entries.
+
+    Behaves like the list of meal dicts it replaces (len, indexing, item
+    assignment, append, pop, iteration), but stores each field in its own
+    column: meal ids as two unsigned 64-bit halves of their 128-bit UUID
+    value, timestamps as microseconds since the epoch, the totals and
+    per-100g values as doubles, names interned, and ingredient lines packed
+    into one bytes object per meal that refers to a table of interned
+    ingredient names. Reading an entry builds an equal dict on the fly.
+
+    Entries whose shape or types would not survive that round trip exactly
+    (hand-edited files, integer totals, missing per-100g values, ...) are
+    kept as the original dicts.
+    """
+
+    def __init__(self, meals=()):
+        self._id_hi = array("Q")
+        self._id_lo = array("Q")
+        self._timestamps = array("q")
+        self._totals = [array("d") for _ in _TOTAL_KEYS]
+        self._per_100g = [array("d") for _ in _PER_100G_KEYS]
+        self._names = []
+        self._lines = []  # Packed ingredient lines, or None
+        self._other = []  # The original dict of entries that are not stored in columns, else None
+        self._strings = {}  # Interned meal names
+        self._ingredient_numbers = {}  # Ingredient name -> number
+        self._ingredient_names = []
+        for meal in meals:
+            self.append(meal)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def _pack_lines(self, lines):
+        if not isinstance(lines, list):
+            return None
+        packed = bytearray()
+        for line in lines:
+            if not isinstance(line, dict) or list(line) != _LINE_KEYS or not isinstance(line["name"], str):
+                return None
+            weight = line["weight_g"]
+            if type(weight) is int and -2 ** 53 <= weight <= 2 ** 53:
+                flag = _INT_WEIGHT
+            elif type(weight) is float:
+                flag = 0
+            else:
+                return None
+            number = self._ingredient_numbers.get(line["name"])
+            if number is None:
+                number = self._ingredient_numbers[line["name"]] = len(self._ingredient_names)
+                self._ingredient_names.append(line["name"])
+            packed += _LINE.pack(number | flag, weight)
+        return bytes(packed)
+
+    def _unpack_lines(self, packed):
+        lines = []
+        for number, weight in _LINE.iter_unpack(packed):
+            lines.append({
+                "name": self._ingredient_names[number & ~_INT_WEIGHT],
+                "weight_g": int(weight) if number & _INT_WEIGHT else weight,
+            })
+        return lines
+
+    def _encode(self, meal):
+        """Returns the column values of `meal`, or None if it has to be kept as a dict."""
+        if not isinstance(meal, dict) or list(meal) != _MEAL_KEYS or not isinstance(meal["name"], str):
+            return None
+        id_int = _uuid_int(meal["id"])
+        micros = _timestamp_to_micros(meal["timestamp"])
+        totals = _floats(meal["total_nutrition"], _TOTAL_KEYS)
+        per_100g = _floats(meal["nutrition_per_100g"], _PER_100G_KEYS)
+        if id_int is None or micros is None or totals is None or per_100g is None:
+            return None
+        lines = self._pack_lines(meal["ingredients_used"])
+        if lines is None:
+            return None
+        name = self._strings.setdefault(meal["name"], meal["name"])
+        return id_int, micros, totals, per_100g, name, lines
+
+    def _store(self, position, meal):
+        encoded = self._encode(meal)
+        if encoded is None:
+            id_int, micros, totals, per_100g, name, lines = 0, 0, [0.0] * 5, [0.0] * 4, "", None
+            other = meal
+        else:
+            (id_int, micros, totals, per_100g, name, lines), other = encoded, None
+        self._id_hi[position] = id_int >> 64
+        self._id_lo[position] = id_int & 0xFFFFFFFFFFFFFFFF
+        self._timestamps[position] = micros
+        for column, value in zip(self._totals, totals):
+            column[position] = value
+        for column, value in zip(self._per_100g, per_100g):
+            column[position] = value
+        self._names[position] = name
+        self._lines[position] = lines
+        self._other[position] = other
+
+    def append(self, meal):
+        """Adds an entry at the end."""
+        self._id_hi.append(0)
+        self._id_lo.append(0)
+        self._timestamps.append(0)
+        for column in self._totals + self._per_100g:
+            column.append(0.0)
+        self._names.append("")
+        self._lines.append(None)
+        self._other.append(None)
+        self._store(len(self._names) - 1, meal)
+
+    def __setitem__(self, position, meal):
+        if not -len(self) <= position < len(self):
+            raise IndexError("MealColumns assignment index out of range")
+        self._store(position % len(self), meal)
+
+    def pop(self):
+        """Removes and returns the last entry."""
+        if not self._names:
+            raise IndexError("pop from empty MealColumns")
+        meal = self[-1]
+        for column in [self._id_hi, self._id_lo, self._timestamps, self._names, self._lines, self._other,
+                       *self._totals, *self._per_100g]:
+            column.pop()
+        return meal
+
+    def _meal_id(self, position):
+        digits = "%016x%016x" % (self._id_hi[position], self._id_lo[position])  # Same as str(uuid.UUID(int=...))
+        return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+    def __getitem__(self, position):
+        if not -len(self) <= position < len(self):
+            raise IndexError("MealColumns index out of range")
+        position %= len(self)
+        other = self._other[position]
+        if other is not None:
+            return other
+        return {
+            "id": self._meal_id(position),
+            "name": self._names[position],
+            "timestamp": _micros_to_timestamp(self._timestamps[position]),
+            "ingredients_used": self._unpack_lines(self._lines[position]),
+            "total_nutrition": {key: column[position] for key, column in zip(_TOTAL_KEYS, self._totals)},
+            "nutrition_per_100g": {key: column[position] for key, column in zip(_PER_100G_KEYS, self._per_100g)},
+        }
+
+    def summary(self, position):
+        """
+        Returns the summary fields of an entry without building the whole entry,
+        or None for entries kept as dicts.
+        """
+        if self._other[position] is not None:
+            return None
+        calories, protein, carbs, fat, _ = (column[position] for column in self._totals)
+        return {
+            "id": self._meal_id(position),
+            "name": self._names[position],
+            "timestamp": _micros_to_timestamp(self._timestamps[position]),
+            "total_calories": calories,
+            "total_protein_g": protein,
+            "total_carbs_g": carbs,
+            "total_fat_g": fat
+        }
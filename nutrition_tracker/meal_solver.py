@@ -0,0 +1,196 @@
+import math
+
+from .meal_calculator import MealInputError, calculate_meals
+from .nutrient_matrix import NUTRIENT_COLUMNS, np, numpy_available
+
+# Keys of the "targets" object: the nutrient columns, per whole meal (kcal or grams).
+TARGET_FIELDS = NUTRIENT_COLUMNS
+# Field of Meal.get_total_nutrition holding each target's nutrient.
+TOTAL_FIELDS = {"calories": "total_calories", "protein": "total_protein_g",
+                "carbs": "total_carbs_g", "fat": "total_fat_g"}
+MAX_CANDIDATES = 50
+# Upper weight bound, in grams, of a candidate that does not give one.
+DEFAULT_MAX_WEIGHT = 1000.0
+# Largest bound, in grams, a candidate may give.
+MAX_WEIGHT = 10000.0
+# Solved weights are rounded to this many decimals (0.1 g), as a kitchen scale would weigh them.
+WEIGHT_DECIMALS = 1
+# Weight of the pull towards the lower bounds, relative to the fit; only decides
+# between weights that fit the targets equally well, so that a candidate that
+# does not help the targets stays at its minimum.
+_REGULARIZATION = 1e-6
+_MAX_ITERATIONS = 100
+
+def _number(value, what: str, maximum: float | None = None) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise MealInputError(f"{what} must be a non-negative number.")
+    if maximum is not None and value > maximum:
+        raise MealInputError(f"{what} must be at most {maximum:g}.")
+    return float(value)
+
+def parse_solve_request(data) -> tuple[str, list[str], list[float], list[float], dict[int, float]]:
+    """
+    Validates a /api/solve_meal request.
+
+    Args:
+        data: Dict with 'name' (optional), 'ingredients', a list of
+              {'name': str, 'min_weight': number, 'max_weight': number} dicts
+              (bounds in grams, default 0 and DEFAULT_MAX_WEIGHT, at most
+              MAX_WEIGHT), and
+              'targets', a dict with one or more of TARGET_FIELDS.
+
+    Returns:
+        (meal_name, names, lower bounds, upper bounds, {nutrient column: target})
+
+    Raises:
+        MealInputError: If the request is malformed.
+    """
+    if not isinstance(data, dict):
+        raise MealInputError("The request body must be a JSON object.")
+    meal_name = data.get('name', 'My Meal')
+    if not isinstance(meal_name, str) or not meal_name:
+        raise MealInputError("Meal name must be a non-empty string.")
+
+    candidates = data.get('ingredients')
+    if not candidates or not isinstance(candidates, list):
+        raise MealInputError("No candidate ingredients provided.")
+    if len(candidates) > MAX_CANDIDATES:
+        raise MealInputError(f"At most {MAX_CANDIDATES} candidate ingredients can be solved for.", status=413)
+    names, lower, upper = [], [], []
+    for item in candidates:
+        if not isinstance(item, dict) or not isinstance(item.get('name'), str) or not item['name']:
+            raise MealInputError("Each candidate ingredient needs a name.")
+        name = item['name']
+        if name in names:
+            raise MealInputError(f"Ingredient {name} is listed more than once.")
+        low = _number(item.get('min_weight', 0), f"Minimum weight for {name}", MAX_WEIGHT)
+        high = _number(item.get('max_weight', DEFAULT_MAX_WEIGHT), f"Maximum weight for {name}", MAX_WEIGHT)
+        if low > high:
+            raise MealInputError(f"Minimum weight for {name} exceeds its maximum weight.")
+        names.append(name)
+        lower.append(low)
+        upper.append(high)
+
+    targets = data.get('targets')
+    if not isinstance(targets, dict) or not targets:
+        raise MealInputError(f"Provide 'targets' with one or more of: {', '.join(TARGET_FIELDS)}.")
+    unknown = [field for field in targets if field not in TARGET_FIELDS]
+    if unknown:
+        raise MealInputError(f"Unknown targets: {', '.join(map(str, unknown))}. Use {', '.join(TARGET_FIELDS)}.")
+    goals = {TARGET_FIELDS.index(field): _number(value, f"Target {field}") for field, value in targets.items()}
+    return meal_name, names, lower, upper, goals
+
+def solve_weights(values, targets: dict[int, float], lower, upper):
+    """
+    Finds the ingredient weights whose nutrients come closest to the targets.
+
+    Minimizes the sum of squared relative deviations from the targets,
+    sum over targets k of ((weights @ values[:, k] / 100 - t_k) / max(t_k, 1))^2,
+    subject to lower <= weights <= upper, by projected Newton iterations
+    on the whole weight vector (a handful of small array operations each).
+    Among weights that fit equally well (more candidates than targets, or
+    candidates without the targeted nutrients), the ones closest to their
+    lower bounds are chosen.
+
+    Args:
+        values: (n, 4) array of per-100g nutrients, columns in NUTRIENT_COLUMNS order.
+        targets: {column: target amount for the whole meal}, at least one.
+        lower: (n,) minimum weights in grams.
+        upper: (n,) maximum weights in grams.
+
+    Returns:
+        (n,) array of weights in grams.
+    """
+    columns = sorted(targets)
+    goals = np.array([targets[column] for column in columns], dtype=np.float64)
+    scale = 1.0 / np.maximum(goals, 1.0)
+    fit = (np.asarray(values, dtype=np.float64)[:, columns] / 100.0 * scale).T  # (targets, n)
+    lower = np.asarray(lower, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+    # Objective 0.5 x.H.x - c.x; the ridge term is scaled to the fit so that it only breaks ties.
+    hessian = fit.T @ fit
+    ridge = _REGULARIZATION * max(float(np.trace(hessian)) / len(lower), 1e-12)
+    hessian[np.diag_indices_from(hessian)] += ridge
+    linear = fit.T @ (goals * scale) + ridge * lower
+    diagonal = np.diag(hessian)
+
+    def objective(x):
+        return 0.5 * x @ hessian @ x - linear @ x
+
+    weights = lower.copy()
+    for _ in range(_MAX_ITERATIONS):
+        gradient = hessian @ weights - linear
+        # Weights at a bound that the gradient pushes against stay there; Newton step on the others.
+        margin = min(1e-3, float(np.abs(weights - np.clip(weights - gradient / diagonal, lower, upper)).max()))
+        held = ((weights <= lower + margin) & (gradient > 0)) | ((weights >= upper - margin) & (gradient < 0))
+        free = ~held
+        step = -gradient / diagonal
+        if free.any():
+            step[free] = np.linalg.solve(hessian[np.ix_(free, free)], -gradient[free])
+        current, length = objective(weights), 1.0
+        while True:
+            candidate = np.clip(weights + length * step, lower, upper)
+            if objective(candidate) <= current + 1e-4 * gradient @ (candidate - weights) or length < 1e-10:
+                break
+            length /= 2
+        moved = float(np.abs(candidate - weights).max())
+        weights = candidate
+        if moved <= 1e-9 * (1.0 + float(np.abs(weights).max())):
+            break
+    return weights
+
+def solve_meal(db, data, cache=None) -> dict:
+    """
+    Solves a /api/solve_meal request: weighs the candidate ingredients to meet the targets.
+
+    Args:
+        db: The IngredientDatabase to resolve ingredient names against.
+        data: Request dict as accepted by parse_solve_request.
+        cache: Optional MealCalculationCache for the final calculation.
+
+    Returns:
+        On success, the fields of the /api/calculate_meal response for the
+        solved weights (rounded to WEIGHT_DECIMALS), plus "targets" and
+        "deviation" (total minus target for each target). On failure,
+        {"success": False, "message": str, "status": int}.
+    """
+    try:
+        if not numpy_available():
+            raise MealInputError("Solving meals requires NumPy (pip install numpy).", status=501)
+        meal_name, names, lower, upper, targets = parse_solve_request(data)
+    except MealInputError as e:
+        return {"success": False, "message": str(e), "status": e.status}
+
+    # One consistent view of the catalog for the solve and the final calculation.
+    with db.lock.read_locked():
+        ingredients = [db.get_ingredient(name) for name in names]
+        missing = [name for name, ingredient in zip(names, ingredients) if ingredient is None]
+        if missing:
+            return {
+                "success": False,
+                "message": f"The following ingredients were not found in the database: {', '.join(missing)}. Please add them first.",
+                "status": 404,
+            }
+        matrix = db.nutrient_matrix
+        values = None
+        if matrix is not None:
+            try:
+                rows = matrix.rows_for(names)
+            except KeyError:
+                rows = None  # Matrix out of step with the catalog; use the ingredients themselves.
+            if rows is not None and matrix.holds(rows, ingredients):
+                values = matrix.values[rows]
+        if values is None:
+            values = np.array([[getattr(ingredient, field) for field in NUTRIENT_COLUMNS] for ingredient in ingredients])
+
+        weights = np.clip(np.round(solve_weights(values, targets, lower, upper), WEIGHT_DECIMALS), lower, upper)
+        meal = {"name": meal_name, "ingredients": [{"name": name, "weight": weight}
+                                                   for name, weight in zip(names, weights.tolist())]}
+        result = calculate_meals(db, [meal], cache=cache)[0]
+
+    if result["success"]:
+        goals = {TARGET_FIELDS[column]: target for column, target in sorted(targets.items())}
+        result["targets"] = goals
+        result["deviation"] = {field: round(result["total_nutrition"][TOTAL_FIELDS[field]] - target, 2)
+                               for field, target in goals.items()}
+    return result
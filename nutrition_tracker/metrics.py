@@ -0,0 +1,165 @@
+import bisect
+import functools
+import math
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets (plus +Inf).
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield self.name + _labels(self.label_names, label_values), value
+
+class Histogram:
+    """
+    Counts observations into fixed buckets per label combination, as
+    Prometheus histograms do: an observation costs a bisect and a few
+    additions under a lock, so it is cheap enough for every request.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # label values -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        with self._lock:
+            series = self._series.get(label_values)
+            return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((labels, ([*counts], total, count)) for labels, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket" + _labels(self.label_names, label_values, (("le", _number(bound)),)),
+                       cumulative)
+            yield f"{self.name}_sum" + _labels(self.label_names, label_values), total
+            yield f"{self.name}_count" + _labels(self.label_names, label_values), count
+
+class Gauge:
+    """A value read when the metrics are rendered, from a callback returning it or {label values: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._read = read
+
+    def samples(self):
+        values = self._read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in sorted(values.items()):
+            if value is not None:
+                yield self.name + _labels(self.label_names, label_values), value
+
+class Registry:
+    """A set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Adds a metric, replacing any metric of the same name. Returns the metric."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{sample} {_number(value)}" for sample, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Storage operations of the managers, labelled by operation.
+STORAGE_DURATION = REGISTRY.register(Histogram(
+    "nutrition_storage_operation_duration_seconds",
+    "Time spent loading and saving the ingredient catalog and the meal history.",
+    labels=("operation",),
+))
+STORAGE_BYTES_WRITTEN = REGISTRY.register(Counter(
+    "nutrition_storage_bytes_written_total",
+    "Bytes written to the catalog and history files.",
+    labels=("operation",),
+))
+
+def timed(operation: str):
+    """Decorator that records the duration of each call in STORAGE_DURATION, failed calls included."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                STORAGE_DURATION.observe(time.perf_counter() - start, operation)
+        return wrapper
+    return decorate
+
+def record_bytes_written(operation: str, size: int) -> None:
+    """Adds `size` bytes to the bytes written by `operation`."""
+    STORAGE_BYTES_WRITTEN.inc(size, operation)
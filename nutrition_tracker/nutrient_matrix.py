@@ -0,0 +1,226 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; callers fall back to per-ingredient arithmetic.
+    np = None
+
+# Column order of the matrix and of every per-line / per-meal result array.
+NUTRIENT_COLUMNS = ("calories", "protein", "carbs", "fat")
+
+def numpy_available() -> bool:
+    """Returns True if NumPy is installed and NutrientMatrix can be used."""
+    return np is not None
+
+
+class MealBatchResult:
+    """
+    Result of NutrientMatrix.compute for one or more meals.
+
+    Attributes (NumPy arrays, columns in NUTRIENT_COLUMNS order):
+        line_values: (lines, 4) nutrients of every input line.
+        totals: (meals, 4) summed nutrients per meal.
+        total_weights: (meals,) summed weight in grams per meal.
+        per_100g: (meals, 4) nutrients per 100g of each meal; NaN where the meal weighs 0g.
+        offsets: (meals + 1,) start of every meal in the line arrays, plus the end.
+    """
+
+    def __init__(self, line_values, totals, total_weights, per_100g, offsets):
+        self.line_values = line_values
+        self.totals = totals
+        self.total_weights = total_weights
+        self.per_100g = per_100g
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    def total_nutrition(self, meal: int = 0) -> dict[str, float]:
+        """Returns the totals of one meal in the format of Meal.get_total_nutrition."""
+        calories, protein, carbs, fat = self.totals[meal].tolist()
+        return {
+            "total_calories": round(calories, 2),
+            "total_protein_g": round(protein, 2),
+            "total_carbs_g": round(carbs, 2),
+            "total_fat_g": round(fat, 2),
+            "total_weight_g": round(float(self.total_weights[meal]), 2),
+        }
+
+    def nutrition_per_100g(self, meal: int = 0) -> dict[str, float | None]:
+        """Returns the per-100g values of one meal in the format of Meal.get_nutrition_per_100g."""
+        if self.total_weights[meal] == 0:
+            return {
+                "calories_per_100g": None,
+                "protein_per_100g": None,
+                "carbs_per_100g": None,
+                "fat_per_100g": None,
+            }
+        calories, protein, carbs, fat = self.per_100g[meal].tolist()
+        return {
+            "calories_per_100g": round(calories, 2),
+            "protein_per_100g": round(protein, 2),
+            "carbs_per_100g": round(carbs, 2),
+            "fat_per_100g": round(fat, 2),
+        }
+
+    def meal_lines(self, meal: int = 0) -> list[list[float]]:
+        """Returns the unrounded [calories, protein, carbs, fat] of each line of one meal."""
+        start, end = int(self.offsets[meal]), int(self.offsets[meal + 1])
+        return self.line_values[start:end].tolist()
+
+
+class NutrientMatrix:
+    """
+    Dense matrix of per-100g nutrients, one row per ingredient.
+
+    Rows are addressed through a name -> row map. Removed rows are recycled,
+    so the matrix only grows when the catalog does. compute() evaluates any
+    number of meals in a handful of array operations.
+    """
+
+    _INITIAL_CAPACITY = 64
+
+    def __init__(self, ingredients=()):
+        """
+        Args:
+            ingredients: Optional iterable of Ingredient objects to load.
+
+        Raises:
+            RuntimeError: If NumPy is not installed.
+        """
+        if np is None:
+            raise RuntimeError("NutrientMatrix requires NumPy.")
+        ingredients = list(ingredients)
+        capacity = max(self._INITIAL_CAPACITY, len(ingredients))
+        self._values = np.zeros((capacity, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        self._rows: dict[str, int] = {}
+        self._free_rows: list[int] = []
+        self._next_row = 0
+        for ingredient in ingredients:
+            self.set(ingredient)
+
+    @classmethod
+    def from_array(cls, names, values):
+        """
+        Builds a matrix from a (len(names), 4) array of per-100g values, one row per name.
+
+        Raises:
+            RuntimeError: If NumPy is not installed.
+        """
+        matrix = cls()
+        names = list(names)
+        values = np.asarray(values, dtype=np.float64).reshape(len(names), len(NUTRIENT_COLUMNS))
+        matrix._values = np.zeros((max(cls._INITIAL_CAPACITY, len(names)), len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        matrix._values[:len(names)] = values
+        matrix._rows = {name: row for row, name in enumerate(names)}
+        matrix._next_row = len(names)
+        return matrix
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rows
+
+    @property
+    def values(self):
+        """Read-only view of the used part of the matrix (rows of removed ingredients are zero)."""
+        view = self._values[:self._next_row]
+        view.flags.writeable = False
+        return view
+
+    def set(self, ingredient) -> int:
+        """Adds or updates the row of an ingredient and returns its row index."""
+        row = self._rows.get(ingredient.name)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                if self._next_row == len(self._values):
+                    grown = np.zeros((2 * len(self._values), len(NUTRIENT_COLUMNS)), dtype=np.float64)
+                    grown[:self._next_row] = self._values
+                    self._values = grown
+                row = self._next_row
+                self._next_row += 1
+            self._rows[ingredient.name] = row
+        self._values[row] = (ingredient.calories, ingredient.protein, ingredient.carbs, ingredient.fat)
+        return row
+
+    def remove(self, name: str) -> None:
+        """Frees the row of an ingredient (no-op if unknown)."""
+        row = self._rows.pop(name, None)
+        if row is not None:
+            self._values[row] = 0.0
+            self._free_rows.append(row)
+
+    def row(self, name: str) -> int | None:
+        """Returns the row index of an ingredient, or None if unknown."""
+        return self._rows.get(name)
+
+    def rows_for(self, names):
+        """
+        Maps ingredient names to row indices.
+
+        Raises:
+            KeyError: If any name is unknown; the exception lists all unknown names.
+        """
+        rows = self._rows
+        names = list(names)
+        try:
+            return np.fromiter((rows[name] for name in names), dtype=np.intp)
+        except KeyError:
+            missing = [name for name in names if name not in rows]
+            raise KeyError(missing) from None
+
+    def holds(self, rows, ingredients) -> bool:
+        """
+        Returns True if the matrix rows hold exactly the nutrient values of `ingredients`.
+
+        Args:
+            rows: Row indices, e.g. from rows_for.
+            ingredients: Ingredient objects, one per row.
+        """
+        expected = np.array(
+            [(ing.calories, ing.protein, ing.carbs, ing.fat) for ing in ingredients], dtype=np.float64
+        ).reshape(-1, len(NUTRIENT_COLUMNS))
+        return bool(np.array_equal(self._values[np.asarray(rows, dtype=np.intp)], expected))
+
+    def compute(self, rows, weights, offsets=None) -> MealBatchResult:
+        """
+        Computes per-line values, totals and per-100g values for one or many meals.
+
+        Args:
+            rows: Row index of every meal line (see rows_for), for all meals back to back.
+            weights: Weight in grams of every line; same length as rows.
+            offsets: Start of each meal in rows/weights, in ascending order.
+                     None means a single meal. Meals may be empty.
+
+        Returns:
+            A MealBatchResult.
+
+        Raises:
+            ValueError: If lengths do not match or a weight is negative.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        weights = np.asarray(weights, dtype=np.float64)
+        if rows.shape != weights.shape or rows.ndim != 1:
+            raise ValueError("rows and weights must be 1-D arrays of the same length.")
+        if weights.size and weights.min() < 0:
+            raise ValueError("Weight must be a non-negative number.")
+        if offsets is None:
+            offsets = np.zeros(1, dtype=np.intp)
+        offsets = np.append(np.asarray(offsets, dtype=np.intp), len(rows))
+
+        line_values = self._values[rows] * (weights / 100.0)[:, None]
+
+        meal_count = len(offsets) - 1
+        # np.add.at accumulates strictly in line order, which keeps the totals
+        # bit-identical to Meal.add_ingredient (np.add.reduceat does not).
+        meal_of_line = np.repeat(np.arange(meal_count), np.diff(offsets))
+        totals = np.zeros((meal_count, len(NUTRIENT_COLUMNS)))
+        total_weights = np.zeros(meal_count)
+        np.add.at(totals, meal_of_line, line_values)
+        np.add.at(total_weights, meal_of_line, weights)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_100g = totals * (100.0 / total_weights)[:, None]
+        per_100g[total_weights == 0] = np.nan
+        return MealBatchResult(line_values, totals, total_weights, per_100g, offsets)
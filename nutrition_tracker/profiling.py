@@ -0,0 +1,209 @@
+import cProfile
+import collections
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+MODES = ("cprofile", "sampling")
+# Request header that asks for a profile of one request (when allowed), e.g. "X-Nutrition-Profile: sampling".
+PROFILE_HEADER = "X-Nutrition-Profile"
+# Seconds between two stack samples of a profiled request.
+SAMPLE_INTERVAL = 0.005
+# Functions listed by self time in the summary of a capture.
+SUMMARY_FUNCTIONS = 20
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    directory, name = os.path.split(filename)
+    return f"{code.co_name} ({os.path.basename(directory)}/{name}:{code.co_firstlineno})".replace(";", ":")
+
+class StackSampler:
+    """
+    Samples the Python stacks of registered threads from one background thread.
+
+    Each registered thread gets a Counter of stacks (tuples of frame labels,
+    outermost first), cut at the frame that was current when it registered,
+    which is the collapsed-stack input of flame graph tools.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self._targets: dict[int, tuple] = {}  # thread id -> (root frame, Counter of stacks)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+
+    def start(self, root_frame) -> collections.Counter:
+        """Starts sampling the calling thread below `root_frame`; returns the Counter that collects the stacks."""
+        stacks = collections.Counter()
+        with self._lock:
+            self._targets[threading.get_ident()] = (root_frame, stacks)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+        return stacks
+
+    def stop(self) -> None:
+        """Stops sampling the calling thread."""
+        with self._lock:
+            self._targets.pop(threading.get_ident(), None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:  # Held while sampling, so stop() returns once the thread's stacks are final
+                while not self._targets:
+                    self._wakeup.wait()
+                self._sample()
+            time.sleep(self.interval)
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        for thread_id, (root, stacks) in self._targets.items():
+            frame, stack = frames.get(thread_id), []
+            while frame is not None and frame is not root:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stacks[tuple(reversed(stack))] += 1
+
+def folded_stacks(stacks) -> str:
+    """Renders a Counter of stacks in the collapsed format of flamegraph.pl and speedscope ("a;b;c count")."""
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(stacks.items()))
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware that profiles requests and keeps the slow ones.
+
+    A request is profiled when profiling is on for every request (`mode`),
+    or when `allow_header` is set and the request carries PROFILE_HEADER
+    with a mode. "cprofile" records every call with cProfile; only one
+    request is profiled this way at a time, as cProfile cannot profile
+    several threads at once on every Python version, so concurrent requests
+    go unprofiled. "sampling" only samples the request thread's stack every
+    SAMPLE_INTERVAL seconds, which costs little, and works for any number of
+    concurrent requests. Both record sampled stacks.
+
+    A profiled request that takes at least `threshold` seconds, or that asked
+    for its profile with the header, is saved in `directory` as:
+        <name>.json    request, duration and the functions with the most samples
+        <name>.folded  sampled stacks in the collapsed flame graph format
+        <name>.prof    cProfile statistics (cprofile mode; open with pstats or snakeviz)
+    Once the directory holds more than `max_bytes`, the oldest captures are deleted.
+    The duration covers the application call; a streamed body is produced
+    after it and is not included.
+    """
+
+    def __init__(self, wsgi_app, mode: str | None = None, threshold: float = 0.2,
+                 directory: str = "profiles", max_bytes: int = 100 * 1024 * 1024,
+                 allow_header: bool = False, sampler: StackSampler | None = None):
+        if mode not in (None, *MODES):
+            raise ValueError(f"Profiling mode must be one of: {', '.join(MODES)}.")
+        self.wsgi_app = wsgi_app
+        self.mode = mode
+        self.threshold = threshold
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.allow_header = allow_header
+        self.sampler = sampler or StackSampler()
+        self._cprofile_lock = threading.Lock()  # One cProfile-profiled request at a time
+        self._save_lock = threading.Lock()
+        self._sequence = 0
+
+    def _requested_mode(self, environ):
+        if self.allow_header:
+            requested = environ.get("HTTP_" + PROFILE_HEADER.upper().replace("-", "_"), "").strip().lower()
+            if requested in MODES:
+                return requested, True
+        return self.mode, False
+
+    def __call__(self, environ, start_response):
+        mode, requested = self._requested_mode(environ)
+        if mode is None:
+            return self.wsgi_app(environ, start_response)
+        status = []
+
+        def recording_start_response(response_status, headers, exc_info=None):
+            status.append(response_status)
+            return start_response(response_status, headers, exc_info)
+
+        profiler = None
+        if mode == "cprofile" and self._cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        stacks = self.sampler.start(sys._getframe())
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                return self.wsgi_app(environ, recording_start_response)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        finally:
+            duration = time.perf_counter() - start
+            self.sampler.stop()
+            try:
+                if requested or duration >= self.threshold:
+                    self._save(environ, status[0] if status else None, mode, duration, stacks, profiler)
+            finally:
+                if profiler is not None:
+                    self._cprofile_lock.release()
+
+    def _save(self, environ, status, mode, duration, stacks, profiler) -> None:
+        path = environ.get("PATH_INFO", "")
+        with self._save_lock:
+            self._sequence += 1
+            name = "{}_{:04d}_{}_{}_{}ms".format(
+                datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S"), self._sequence % 10000,
+                environ.get("REQUEST_METHOD", ""), re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root",
+                round(duration * 1000))
+            own_samples = collections.Counter()
+            for stack, count in stacks.items():
+                own_samples[stack[-1]] += count
+            summary = {
+                "method": environ.get("REQUEST_METHOD"), "path": path, "query": environ.get("QUERY_STRING", ""),
+                "status": status, "duration_ms": round(duration * 1000, 3), "mode": mode,
+                "captured": datetime.now(timezone.utc).isoformat(), "samples": sum(stacks.values()),
+                "sample_interval_ms": self.sampler.interval * 1000,
+                "top_functions": [{"function": function, "samples": count}
+                                  for function, count in own_samples.most_common(SUMMARY_FUNCTIONS)],
+            }
+            base = os.path.join(self.directory, name)
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(base + ".folded", "w", encoding="utf-8") as f:
+                    f.write(folded_stacks(stacks))
+                if profiler is not None:
+                    profiler.dump_stats(base + ".prof")
+                with open(base + ".json", "w", encoding="utf-8") as f:
+                    json.dump(summary, f, indent=2)
+                self._enforce_cap()
+            except OSError as e:
+                print(f"Error saving request profile to {self.directory}: {e}")
+
+    def _enforce_cap(self) -> None:
+        """Deletes the oldest captures (all files of each) until the directory fits in max_bytes."""
+        captures = {}  # name -> [newest mtime, total size, paths]
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+            capture = captures.setdefault(os.path.splitext(entry.name)[0], [0.0, 0, []])
+            capture[0] = max(capture[0], st.st_mtime)
+            capture[1] += st.st_size
+            capture[2].append(entry.path)
+        total = sum(size for _, size, _ in captures.values())
+        for _, (_, size, paths) in sorted(captures.items(), key=lambda item: (item[1][0], item[0])):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
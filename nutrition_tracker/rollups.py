@@ -0,0 +1,171 @@
+import threading
+from datetime import date, datetime, timezone
+
+TOTAL_FIELDS = ("total_calories", "total_protein_g", "total_carbs_g", "total_fat_g")
+BUCKETS = ("day", "week", "month")
+
+def parse_day(value):
+    """Returns the UTC day (proleptic ordinal) of an ISO-8601 date or timestamp. Raises ValueError."""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.toordinal()
+
+def _meal_day(meal):
+    timestamp = meal.get("timestamp")
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        return parse_day(timestamp)
+    except ValueError:
+        return None
+
+def _meal_values(meal):
+    total_nutrition = meal.get("total_nutrition")
+    values = [1.0]  # Meal count
+    for field in TOTAL_FIELDS:
+        value = total_nutrition.get(field) if isinstance(total_nutrition, dict) else None
+        values.append(float(value) if isinstance(value, (int, float)) else 0.0)
+    return values
+
+def _bucket_start(day, bucket):
+    if bucket == "week":
+        return day - date.fromordinal(day).weekday()  # ISO weeks start on Monday
+    if bucket == "month":
+        return date.fromordinal(day).replace(day=1).toordinal()
+    return day
+
+def _next_bucket(start, bucket):
+    if bucket == "week":
+        return start + 7
+    if bucket == "month":
+        first = date.fromordinal(start)
+        return (first.replace(year=first.year + 1, month=1) if first.month == 12
+                else first.replace(month=first.month + 1)).toordinal()
+    return start + 1
+
+class NutritionRollups:
+    """
+    Per-day totals of the meal history, with prefix sums for range queries.
+
+    Days are UTC days. add() and remove() update the day of one meal in O(1);
+    the prefix sums (running totals over consecutive days) are kept up to
+    date in O(1) while meals land on the latest day, which is the common
+    case, and are rebuilt lazily, in O(days), after any other change. The
+    totals of any range of days are then the difference of two prefix sums,
+    so a query costs O(1) per returned bucket whatever the number of meals.
+    """
+
+    def __init__(self, meals=()):
+        self._days = {}  # Day -> [meal count, calories, protein, carbs, fat]
+        self._lock = threading.Lock()  # Guards the lazily rebuilt prefix sums
+        self._first_day = None
+        self._prefix = None  # _prefix[k]: totals of the days before _first_day + k; None when stale
+        for meal in meals:
+            self.add(meal)
+
+    @classmethod
+    def from_days(cls, days):
+        """Builds rollups from per-day totals as returned by days()."""
+        rollups = cls()
+        rollups._days = {day: list(values) for day, values in days.items()}
+        return rollups
+
+    def days(self):
+        """Returns a copy of the per-day totals: {day: [meal count, calories, protein, carbs, fat]}."""
+        with self._lock:
+            return {day: list(values) for day, values in self._days.items()}
+
+    def add(self, meal):
+        """Counts a meal in its day's totals."""
+        self._apply(meal, 1.0)
+
+    def remove(self, meal):
+        """Removes a meal counted by add() from its day's totals."""
+        self._apply(meal, -1.0)
+
+    def _apply(self, meal, sign):
+        day = _meal_day(meal)
+        if day is None:
+            return
+        delta = [sign * value for value in _meal_values(meal)]
+        with self._lock:
+            row = self._days.setdefault(day, [0.0] * len(delta))
+            for i, value in enumerate(delta):
+                row[i] += value
+            if row[0] <= 0:
+                del self._days[day]  # Drops the rounding residue along with the last meal
+                self._prefix = None
+            elif self._prefix is not None and day == self._first_day + len(self._prefix) - 2:
+                # The latest day only changes the last running total.
+                self._prefix[-1] = [total + value for total, value in zip(self._prefix[-1], delta)]
+            else:
+                self._prefix = None
+
+    def _prefix_sums(self):
+        with self._lock:
+            if self._prefix is None and self._days:
+                days = sorted(self._days)
+                self._first_day = days[0]
+                running = [0.0] * len(self._days[days[0]])
+                prefix = [list(running)]
+                for day in range(days[0], days[-1] + 1):
+                    row = self._days.get(day)
+                    if row is not None:
+                        running = [total + value for total, value in zip(running, row)]
+                    prefix.append(running)
+                self._prefix = prefix
+            return self._first_day, self._prefix
+
+    def day_range(self):
+        """Returns (first day, last day + 1) of the meals counted, or None if there are none."""
+        first_day, prefix = self._prefix_sums()
+        return None if prefix is None else (first_day, first_day + len(prefix) - 1)
+
+    def _range_totals(self, first_day, prefix, start, end):
+        def running(day):
+            return prefix[min(max(day - first_day, 0), len(prefix) - 1)]
+        return [high - low for high, low in zip(running(end), running(start))]
+
+    def totals(self, start, end, bucket="day"):
+        """
+        Returns the totals of the days in [start, end), overall and per bucket.
+
+        Args:
+            start: First day (ordinal), inclusive.
+            end: Last day (ordinal), exclusive.
+            bucket: "day", "week" (ISO weeks, starting on Monday) or "month".
+
+        Returns:
+            (overall, [(bucket start day, values), ...]) where values are
+            [meal count, calories, protein, carbs, fat]. Buckets at the edges
+            are clipped to the range (the first one then starts at `start`);
+            buckets without meals are included.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}.")
+        first_day, prefix = self._prefix_sums()
+        if prefix is None:
+            empty = [0.0] * (len(TOTAL_FIELDS) + 1)
+            prefix, first_day = [empty], start
+        buckets = []
+        bucket_start = _bucket_start(start, bucket)
+        while bucket_start < end:
+            bucket_end = _next_bucket(bucket_start, bucket)
+            values = self._range_totals(first_day, prefix, max(bucket_start, start), min(bucket_end, end))
+            buckets.append((max(bucket_start, start), values))
+            bucket_start = bucket_end
+        return self._range_totals(first_day, prefix, start, end), buckets
+
+def bucket_count(start, end, bucket):
+    """Returns the number of buckets totals() returns for [start, end), without building them."""
+    if end <= start:
+        return 0
+    if bucket == "month":
+        first, last = date.fromordinal(start), date.fromordinal(end - 1)
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    if bucket == "week":
+        return (_bucket_start(end - 1, "week") - _bucket_start(start, "week")) // 7 + 1
+    return end - start
+
+__all__ = ["NutritionRollups", "TOTAL_FIELDS", "BUCKETS", "bucket_count", "parse_day"]
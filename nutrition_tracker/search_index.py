@@ -0,0 +1,211 @@
+import bisect
+import heapq
+import math
+import unicodedata
+
+def normalize_name(text: str) -> str:
+    """
+    Normalizes a name for matching: strips accents, case-folds and collapses whitespace.
+
+    Example: "  Crème  Brûlée " -> "creme brulee"
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+def _trigrams(normalized: str) -> set[str]:
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Match tiers, best first. Prefix tiers are ordered alphabetically; the
+# substring and fuzzy tiers by trigram similarity, then name length.
+_EXACT, _PREFIX, _WORD_PREFIX, _SUBSTRING, _FUZZY = range(5)
+
+class IngredientSearchIndex:
+    """
+    In-memory index over ingredient names for ranked, incremental search.
+
+    Matching is case- and accent-insensitive. Four structures are kept:
+    a sorted list of normalized names (full-name prefix lookups by binary
+    search), a sorted list of (word, name) pairs (word-prefix lookups),
+    trigram posting sets (substring and typo-tolerant matches) and a list
+    sorted by name length (the order of equally similar substring matches).
+    All of them are updated per name by add() and remove(), or per batch by
+    add_many(), never rebuilt.
+    """
+
+    # Minimum share of the query's trigrams a name must contain for a fuzzy match.
+    FUZZY_THRESHOLD = 0.5
+
+    def __init__(self, names=()):
+        self._normalized: dict[str, str] = {}
+        self._names_sorted: list[tuple[str, str]] = []  # (normalized, name)
+        self._words_sorted: list[tuple[str, str]] = []  # (word, name), for words after the first
+        self._by_length: list[tuple[int, str, str]] = []  # (len(name), normalized, name): substring tier order
+        self._trigrams: dict[str, set[str]] = {}
+        self.add_many(names)
+
+    def __len__(self) -> int:
+        return len(self._normalized)
+
+    def _later_words(self, normalized: str) -> set[str]:
+        return set(normalized.split(" ")[1:])
+
+    def add(self, name: str) -> None:
+        """Adds a name to the index (no-op if already present)."""
+        if name in self._normalized:
+            return
+        normalized = normalize_name(name)
+        self._normalized[name] = normalized
+        bisect.insort(self._names_sorted, (normalized, name))
+        bisect.insort(self._by_length, (len(name), normalized, name))
+        for word in self._later_words(normalized):
+            bisect.insort(self._words_sorted, (word, name))
+        for trigram in _trigrams(normalized):
+            self._trigrams.setdefault(trigram, set()).add(name)
+
+    def add_many(self, names) -> None:
+        """
+        Adds many names at once (names already present are skipped).
+
+        The new entries are appended and each sorted list is re-sorted once,
+        which merges two sorted runs in linear time, instead of one insertion
+        per name.
+        """
+        names_added = len(self._names_sorted)
+        words_added = len(self._words_sorted)
+        for name in names:
+            if name in self._normalized:
+                continue
+            normalized = normalize_name(name)
+            self._normalized[name] = normalized
+            self._names_sorted.append((normalized, name))
+            self._by_length.append((len(name), normalized, name))
+            self._words_sorted.extend((word, name) for word in self._later_words(normalized))
+            for trigram in _trigrams(normalized):
+                self._trigrams.setdefault(trigram, set()).add(name)
+        if len(self._names_sorted) > names_added:
+            self._names_sorted.sort()
+            self._by_length.sort()
+        if len(self._words_sorted) > words_added:
+            self._words_sorted.sort()
+
+    def remove(self, name: str) -> None:
+        """Removes a name from the index (no-op if absent)."""
+        normalized = self._normalized.pop(name, None)
+        if normalized is None:
+            return
+        del self._names_sorted[bisect.bisect_left(self._names_sorted, (normalized, name))]
+        del self._by_length[bisect.bisect_left(self._by_length, (len(name), normalized, name))]
+        for word in self._later_words(normalized):
+            del self._words_sorted[bisect.bisect_left(self._words_sorted, (word, name))]
+        for trigram in _trigrams(normalized):
+            postings = self._trigrams[trigram]
+            postings.discard(name)
+            if not postings:
+                del self._trigrams[trigram]
+
+    @staticmethod
+    def _prefix_range(sorted_pairs, prefix):
+        start = bisect.bisect_left(sorted_pairs, (prefix,))
+        end = bisect.bisect_left(sorted_pairs, (prefix + "\U0010ffff",))
+        return start, end
+
+    def _shortest(self, names, count: int) -> list[str]:
+        """Returns the `count` names of `names` that come first by (length, normalized name), unordered."""
+        if len(names) <= count:
+            return list(names)
+        if count * len(self._by_length) <= len(names) ** 2:
+            # Dense enough that walking the catalog in that order finds them sooner than sorting would.
+            found = []
+            for _, _, name in self._by_length:
+                if name in names:
+                    found.append(name)
+                    if len(found) == count:
+                        break
+            return found
+        return heapq.nsmallest(count, names, key=lambda name: (len(name), self._normalized[name]))
+
+    def _add_substring_matches(self, q: str, ranked: dict, limit: int) -> None:
+        """
+        Adds the best names containing `q` to `ranked` until it holds `limit` names.
+
+        Candidates hold all of the query's interior (unpadded) trigrams, as
+        any name containing it does; a query too short to have one takes the
+        names of every trigram containing it. Since the interior trigrams are
+        shared by all of them, names only differ in similarity by the padded
+        boundary trigrams (the query starting or ending a word), so they are
+        grouped by those with set operations and only the shortest needed
+        are taken from each group.
+        """
+        trigrams = _trigrams(q)
+        interior = {q[i:i + 3] for i in range(len(q) - 2)}
+        if interior:
+            candidates = set.intersection(*(self._trigrams.get(t, set()) for t in interior))
+            if len(q) > 3:  # Holding every trigram does not mean holding them in sequence
+                candidates = {name for name in candidates if q in self._normalized[name]}
+        else:
+            candidates = set().union(*(posting for trigram, posting in self._trigrams.items() if q in trigram))
+        groups = {len(interior): candidates - ranked.keys()}
+        for trigram in trigrams - interior:
+            posting = self._trigrams.get(trigram, set())
+            regrouped: dict[int, set[str]] = {}
+            for shared, names in groups.items():
+                regrouped.setdefault(shared + 1, set()).update(names & posting)
+                regrouped.setdefault(shared, set()).update(names - posting)
+            groups = regrouped
+        for shared in sorted(groups, reverse=True):
+            needed = limit - len(ranked)
+            if needed <= 0:
+                break
+            for name in self._shortest(groups[shared], needed):
+                ranked[name] = (_SUBSTRING, -shared / len(trigrams), len(name), self._normalized[name])
+
+    def search(self, query: str, limit: int = 20) -> list[str]:
+        """
+        Returns up to `limit` ingredient names matching `query`, best match first.
+
+        Ranking: exact name, then names starting with the query, then names
+        with a later word starting with the query, then names containing
+        the query, then names that are merely similar (typos). An empty
+        query returns names in alphabetical order.
+        """
+        if limit <= 0:
+            return []
+        q = normalize_name(query)
+        ranked: dict[str, tuple] = {}
+
+        def consider(name, tier):
+            if name not in ranked or tier < ranked[name][0]:
+                ranked[name] = (tier, 0.0, 0, self._normalized[name])
+
+        start, end = self._prefix_range(self._names_sorted, q)
+        # Prefix ranges are walked in alphabetical order, and only up to
+        # `limit` entries are needed from each since they outrank later tiers.
+        for normalized, name in self._names_sorted[start:min(end, start + limit + 1)]:
+            consider(name, _EXACT if normalized == q else _PREFIX)
+        if q and len(ranked) < limit:
+            start, end = self._prefix_range(self._words_sorted, q)
+            for _, name in self._words_sorted[start:min(end, start + limit)]:
+                consider(name, _WORD_PREFIX)
+
+        if len(ranked) < limit and q:
+            self._add_substring_matches(q, ranked, limit)
+
+        if len(ranked) < limit and len(q) >= 3:
+            # Fuzzy matches share at least min_shared of the query's trigrams,
+            # so each one appears in at least one of the rarest
+            # (n - min_shared + 1) posting sets. Candidates come from those
+            # alone and are then counted by membership, which keeps the work
+            # proportional to the rare trigrams, not the common ones. Names
+            # containing the query are all ranked by now.
+            postings = sorted((self._trigrams.get(t, ()) for t in _trigrams(q)), key=len)
+            min_shared = math.ceil(self.FUZZY_THRESHOLD * len(postings))
+            for name in set().union(*postings[:len(postings) - min_shared + 1]):
+                if name in ranked:
+                    continue
+                similarity = sum(name in posting for posting in postings) / len(postings)
+                if similarity >= self.FUZZY_THRESHOLD:
+                    ranked[name] = (_FUZZY, -similarity, len(name), self._normalized[name])
+
+        return sorted(ranked, key=ranked.__getitem__)[:limit]
@@ -0,0 +1,405 @@
+import json
+import mmap
+import struct
+from collections.abc import MutableMapping
+from .file_sync import atomic_write
+from .ingredient import Ingredient
+from .nutrient_matrix import NutrientMatrix, np
+from .rollups import NutritionRollups
+
+# File layout: header, section table, then the sections, each 8-byte aligned.
+# A snapshot is a cache of a JSON file: it records the file_stamp() of the
+# JSON file it was written from and is only used while that stamp is current.
+_MAGIC = b"NTSNAP\x00\x01"
+_HEADER = struct.Struct("<8s4sqqqI")  # Magic, kind, source (mtime_ns, size, inode), section count
+_SECTION = struct.Struct("<4sQQ")  # Name, offset, length
+INGREDIENTS_KIND = b"INGR"
+MEALS_KIND = b"MEAL"
+
+# Ingredient records: calories, protein, carbs, fat (doubles, as Ingredient
+# stores them), in the order of the string table, which holds the names.
+_FIELDS = ("calories", "protein", "carbs", "fat")
+# Meal records. Flags: bits 0-4 int totals, 5-8 int per-100g values, 9-12
+# per-100g values that are None, bit 13 a meal kept as JSON (in the name
+# string; id and timestamp are still set, for the indexes).
+_MEAL = struct.Struct("<6I9d")  # id, name, timestamp, first line, line count, flags; totals, per-100g
+_LINE = struct.Struct("<IId")  # Ingredient name, 1 if the weight is an int, weight
+_DAY = struct.Struct("<q5d")  # Day ordinal, meal count, calories, protein, carbs, fat
+_MEAL_KEYS = ["id", "name", "timestamp", "ingredients_used", "total_nutrition", "nutrition_per_100g"]
+_TOTAL_KEYS = ["total_calories", "total_protein_g", "total_carbs_g", "total_fat_g", "total_weight_g"]
+_PER_100G_KEYS = ["calories_per_100g", "protein_per_100g", "carbs_per_100g", "fat_per_100g"]
+_LINE_KEYS = ["name", "weight_g"]
+_PER_100G_INT, _PER_100G_NONE, _RAW = 5, 9, 1 << 13
+_MAX_EXACT_INT = 2 ** 53
+
+def snapshot_path(filepath: str) -> str:
+    """Returns the path of the snapshot of a JSON file."""
+    return filepath + ".snap"
+
+def _exact_number(value):
+    """Returns (value as a float, is int) for an int or float that a double holds exactly, else None."""
+    if type(value) is float:
+        return value, False
+    if type(value) is int and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT:
+        return float(value), True
+    return None
+
+class _StringTable:
+    """Interns strings for a snapshot being written; each string is stored once."""
+
+    def __init__(self):
+        self._numbers: dict[str, int] = {}
+        self._strings: list[bytes] = []
+
+    def add(self, text: str) -> int:
+        number = self._numbers.get(text)
+        if number is None:
+            number = self._numbers[text] = len(self._strings)
+            self._strings.append(text.encode("utf-8", "surrogatepass"))
+        return number
+
+    def sections(self) -> dict[bytes, bytes]:
+        offsets = [0]
+        for data in self._strings:
+            offsets.append(offsets[-1] + len(data))
+        return {b"SOFF": struct.pack(f"<{len(offsets)}Q", *offsets), b"SSTR": b"".join(self._strings)}
+
+def _write(path: str, kind: bytes, stamp, sections: dict[bytes, bytes]) -> int:
+    """Writes a snapshot atomically. Returns its size in bytes."""
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table, body = [], []
+    for name, data in sections.items():
+        padding = -offset % 8
+        body.append(b"\x00" * padding)
+        offset += padding
+        table.append(_SECTION.pack(name, offset, len(data)))
+        body.append(data)
+        offset += len(data)
+
+    def write(f):
+        f.write(_HEADER.pack(_MAGIC, kind, *stamp, len(sections)))
+        for part in (*table, *body):
+            f.write(part)
+    return atomic_write(path, write, binary=True)
+
+class Snapshot:
+    """
+    A snapshot file mapped into memory (read-only, so the pages are shared
+    through the page cache by every process that maps the same file).
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, self.kind, *stamp, count = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("not a snapshot file")
+        self.stamp = tuple(stamp)
+        self.sections = {}
+        for i in range(count):
+            name, offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            if offset + length > len(view):
+                raise ValueError("truncated snapshot file")
+            self.sections[name] = view[offset:offset + length]
+        offsets = self.sections[b"SOFF"].cast("Q")
+        self.strings = _Strings(offsets, self.sections[b"SSTR"])
+
+    @classmethod
+    def open(cls, path: str, kind: bytes, stamp):
+        """Returns the snapshot at `path` if it is of `kind` and was written from the file with `stamp`, else None."""
+        if stamp is None:
+            return None
+        try:
+            snapshot = cls(path)
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            return None  # Missing, or not a snapshot this version can read
+        return snapshot if snapshot.kind == kind and snapshot.stamp == tuple(stamp) else None
+
+class _Strings:
+    """The string table of a mapped snapshot; strings are decoded on access."""
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, number):
+        return str(self._data[self._offsets[number]:self._offsets[number + 1]], "utf-8", "surrogatepass")
+
+# --- Ingredient catalog ---
+
+def write_ingredient_snapshot(path: str, stamp, ingredients) -> int:
+    """
+    Writes a snapshot of a catalog.
+
+    Args:
+        path: Snapshot file.
+        stamp: file_stamp() of the JSON file holding the same ingredients.
+        ingredients: Iterable of Ingredient objects.
+
+    Returns:
+        The size of the snapshot in bytes.
+    """
+    strings, values = _StringTable(), []
+    for ingredient in ingredients:
+        strings.add(ingredient.name)
+        values.extend(getattr(ingredient, field) for field in _FIELDS)
+    return _write(path, INGREDIENTS_KIND, stamp, {b"VALS": struct.pack(f"<{len(values)}d", *values),
+                                                  **strings.sections()})
+
+class SnapshotIngredients(MutableMapping):
+    """
+    The name -> Ingredient mapping of IngredientDatabase, read from a snapshot.
+
+    Ingredient objects are created on first access; until then an ingredient
+    is a record in the mapped file. Ingredients added or replaced later are
+    held as objects. Iteration order is that of a dict built the same way:
+    the snapshot's order, then the ingredients added since.
+    """
+
+    def __init__(self, snapshot: Snapshot, positions=None, loaded=None):
+        self._snapshot = snapshot
+        self._values = snapshot.sections[b"VALS"].cast("d")
+        names = snapshot.strings
+        # Name -> record number, or None for an ingredient added after loading.
+        self._positions = positions if positions is not None else {names[i]: i for i in range(len(names))}
+        self._loaded = loaded if loaded is not None else {}  # Name -> Ingredient, materialized or changed
+
+    def __getitem__(self, name):
+        ingredient = self._loaded.get(name)
+        if ingredient is None:
+            position = self._positions[name]
+            ingredient = self._loaded[name] = Ingredient(name, *self._values[4 * position:4 * position + 4].tolist())
+        return ingredient
+
+    def get(self, name, default=None):
+        ingredient = self._loaded.get(name)
+        if ingredient is not None:
+            return ingredient
+        return self[name] if name in self._positions else default
+
+    def __setitem__(self, name, ingredient):
+        self._positions.setdefault(name, None)
+        self._loaded[name] = ingredient
+
+    def __delitem__(self, name):
+        del self._positions[name]
+        self._loaded.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def copy(self):
+        """Returns a shallow copy; materializing entries of the copy does not affect this mapping."""
+        return SnapshotIngredients(self._snapshot, dict(self._positions), dict(self._loaded))
+
+    def nutrient_matrix(self) -> NutrientMatrix:
+        """Builds the NutrientMatrix of these ingredients from the mapped values, without creating Ingredient objects."""
+        if np is None:
+            raise RuntimeError("NutrientMatrix requires NumPy.")
+        stored = np.frombuffer(self._values, dtype=np.float64).reshape(-1, len(_FIELDS))
+        names = list(self._positions)
+        rows = np.fromiter((-1 if self._positions[name] is None or name in self._loaded else self._positions[name]
+                            for name in names), dtype=np.intp, count=len(names))
+        values = stored[np.maximum(rows, 0)] if len(names) else np.zeros((0, len(_FIELDS)))
+        for i in np.flatnonzero(rows < 0).tolist():
+            ingredient = self._loaded[names[i]]
+            values[i] = [getattr(ingredient, field) for field in _FIELDS]
+        return NutrientMatrix.from_array(names, values)
+
+# --- Meal history ---
+
+def _encode_meal(meal, strings: _StringTable, lines: list) -> bytes:
+    """Packs a meal record, appending its ingredient lines to `lines`; non-canonical meals are kept as JSON."""
+    id_number = strings.add(meal["id"])
+    timestamp_number = strings.add(str(meal.get("timestamp") or ""))
+    record = None
+    if list(meal) == _MEAL_KEYS and isinstance(meal["name"], str) and isinstance(meal["timestamp"], str):
+        record = _canonical_record(meal, strings)
+    if record is None:
+        return _MEAL.pack(id_number, strings.add(json.dumps(meal)), timestamp_number, 0, 0, _RAW, *[0.0] * 9)
+    name_number, flags, totals, per_100g, meal_lines = record
+    first_line = len(lines)
+    lines.extend(meal_lines)
+    return _MEAL.pack(id_number, name_number, timestamp_number, first_line, len(meal_lines), flags,
+                      *totals, *per_100g)
+
+def _canonical_record(meal, strings):
+    totals_dict, per_100g_dict, used = meal["total_nutrition"], meal["nutrition_per_100g"], meal["ingredients_used"]
+    if not (isinstance(totals_dict, dict) and list(totals_dict) == _TOTAL_KEYS and isinstance(per_100g_dict, dict)
+            and list(per_100g_dict) == _PER_100G_KEYS and isinstance(used, list)):
+        return None
+    flags, totals, per_100g = 0, [], []
+    for bit, value in enumerate(totals_dict.values()):
+        number = _exact_number(value)
+        if number is None:
+            return None
+        totals.append(number[0])
+        flags |= number[1] << bit
+    for bit, value in enumerate(per_100g_dict.values()):
+        if value is None:
+            per_100g.append(0.0)
+            flags |= 1 << (_PER_100G_NONE + bit)
+            continue
+        number = _exact_number(value)
+        if number is None:
+            return None
+        per_100g.append(number[0])
+        flags |= number[1] << (_PER_100G_INT + bit)
+    meal_lines = []
+    for line in used:
+        if not isinstance(line, dict) or list(line) != _LINE_KEYS or not isinstance(line["name"], str):
+            return None
+        weight = _exact_number(line["weight_g"])
+        if weight is None:
+            return None
+        meal_lines.append((strings.add(line["name"]), weight[1], weight[0]))
+    return strings.add(meal["name"]), flags, totals, per_100g, meal_lines
+
+def write_meal_snapshot(path: str, stamp, meals) -> int:
+    """
+    Writes a snapshot of a meal history, with its time-ordered index and per-day rollups.
+
+    Args:
+        path: Snapshot file.
+        stamp: file_stamp() of the JSON file holding the same meals.
+        meals: List of meal entries with unique string ids, as MealHistoryManager holds them.
+
+    Returns:
+        The size of the snapshot in bytes.
+    """
+    strings, lines, records = _StringTable(), [], []
+    for meal in meals:
+        records.append(_encode_meal(meal, strings, lines))
+    order = sorted(range(len(meals)), key=lambda i: (str(meals[i].get("timestamp") or ""), meals[i]["id"]))
+    days = NutritionRollups(meals).days()
+    return _write(path, MEALS_KIND, stamp, {
+        b"MREC": b"".join(records),
+        b"LINE": b"".join(_LINE.pack(*line) for line in lines),
+        b"ORDR": struct.pack(f"<{len(order)}I", *order),
+        b"DAYS": b"".join(_DAY.pack(day, *values) for day, values in sorted(days.items())),
+        **strings.sections(),
+    })
+
+class SnapshotMeals:
+    """
+    The list of meal entries of MealHistoryManager, read from a snapshot.
+
+    Supports what the manager does with its history list (len, indexing,
+    item assignment, append, pop, iteration). Reading an entry builds it
+    from the mapped records; entries assigned or appended later are held
+    as they are. Like MealColumns, it returns equal, freshly built dicts.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+        self._records = snapshot.sections[b"MREC"]
+        self._lines = snapshot.sections[b"LINE"]
+        self._strings = snapshot.strings
+        self._stored = len(self._records) // _MEAL.size
+        self._length = self._stored
+        self._overrides = {}  # Position -> entry assigned or appended after loading
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def _position(self, position):
+        if not -self._length <= position < self._length:
+            raise IndexError("SnapshotMeals index out of range")
+        return position % self._length
+
+    def _record(self, position):
+        return _MEAL.unpack_from(self._records, position * _MEAL.size)
+
+    def __getitem__(self, position):
+        position = self._position(position)
+        meal = self._overrides.get(position)
+        if meal is not None:
+            return meal
+        id_number, name_number, timestamp_number, first_line, line_count, flags, *values = self._record(position)
+        strings = self._strings
+        if flags & _RAW:
+            return json.loads(strings[name_number])
+        lines = self._lines[first_line * _LINE.size:(first_line + line_count) * _LINE.size]
+        return {
+            "id": strings[id_number],
+            "name": strings[name_number],
+            "timestamp": strings[timestamp_number],
+            "ingredients_used": [{"name": strings[name], "weight_g": int(weight) if is_int else weight}
+                                 for name, is_int, weight in _LINE.iter_unpack(lines)],
+            "total_nutrition": {key: int(value) if flags >> bit & 1 else value
+                                for bit, (key, value) in enumerate(zip(_TOTAL_KEYS, values[:5]))},
+            "nutrition_per_100g": {key: None if flags >> (_PER_100G_NONE + bit) & 1
+                                   else int(value) if flags >> (_PER_100G_INT + bit) & 1 else value
+                                   for bit, (key, value) in enumerate(zip(_PER_100G_KEYS, values[5:]))},
+        }
+
+    def summary(self, position):
+        """
+        Returns the summary fields of an entry without building the whole
+        entry, or None for entries that have to be built (see MealColumns.summary).
+        """
+        if position in self._overrides:
+            return None
+        id_number, name_number, timestamp_number, _, _, flags, *values = self._record(position)
+        if flags & _RAW:
+            return None
+        calories, protein, carbs, fat = (int(value) if flags >> bit & 1 else value
+                                         for bit, value in enumerate(values[:4]))
+        strings = self._strings
+        return {"id": strings[id_number], "name": strings[name_number], "timestamp": strings[timestamp_number],
+                "total_calories": calories, "total_protein_g": protein, "total_carbs_g": carbs, "total_fat_g": fat}
+
+    def __setitem__(self, position, meal):
+        self._overrides[self._position(position)] = meal
+
+    def append(self, meal):
+        """Adds an entry at the end."""
+        self._overrides[self._length] = meal
+        self._length += 1
+
+    def pop(self):
+        """Removes and returns the last entry."""
+        if not self._length:
+            raise IndexError("pop from empty SnapshotMeals")
+        meal = self[-1]
+        self._length -= 1
+        self._overrides.pop(self._length, None)
+        return meal
+
+    def index(self):
+        """Returns {meal id: position} of the meals as loaded, without building them."""
+        strings = self._strings
+        return {strings[record[0]]: position
+                for position, record in enumerate(_MEAL.iter_unpack(self._records))}
+
+    def order_keys(self):
+        """Returns the (timestamp, id) keys of the meals as loaded, in ascending order."""
+        strings, records = self._strings, self._records
+        keys = []
+        for position in self._snapshot.sections[b"ORDR"].cast("I"):
+            id_number, _, timestamp_number = struct.unpack_from("<3I", records, position * _MEAL.size)
+            keys.append((strings[timestamp_number], strings[id_number]))
+        return keys
+
+    def rollups(self) -> NutritionRollups:
+        """Returns the per-day rollups of the meals as loaded."""
+        return NutritionRollups.from_days({day: values for day, *values in _DAY.iter_unpack(self._snapshot.sections[b"DAYS"])})
+
+    @property
+    def unchanged(self) -> bool:
+        """True while the entries are exactly those loaded from the snapshot."""
+        return self._length == self._stored and not self._overrides
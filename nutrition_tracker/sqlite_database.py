@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+from .database import IngredientDatabase
+from .ingredient import Ingredient
+from .metrics import timed
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingredients (
+    name     TEXT PRIMARY KEY,
+    calories REAL NOT NULL CHECK (calories >= 0),
+    protein  REAL NOT NULL CHECK (protein >= 0),
+    carbs    REAL NOT NULL CHECK (carbs >= 0),
+    fat      REAL NOT NULL CHECK (fat >= 0)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+_UPSERT_SQL = (
+    "INSERT INTO ingredients (name, calories, protein, carbs, fat) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(name) DO UPDATE SET calories = excluded.calories, protein = excluded.protein, "
+    "carbs = excluded.carbs, fat = excluded.fat"
+)
+
+
+class SQLiteIngredientDatabase(IngredientDatabase):
+    """
+    IngredientDatabase stored in an SQLite file, one row per ingredient.
+
+    The table is keyed (and clustered) on the ingredient name, and every
+    add/remove is written as a single-row upsert/delete, so the cost of a
+    mutation no longer depends on the size of the catalog. The in-memory
+    dictionary of the base class is kept as a read cache; refresh() brings it
+    up to date with commits made by other connections, detected cheaply with
+    PRAGMA data_version.
+    """
+
+    def __init__(self, filepath: str = "ingredients.db", migrate_from: str | None = None):
+        """
+        Initializes the SQLiteIngredientDatabase.
+
+        Args:
+            filepath: Path to the SQLite database file. Defaults to "ingredients.db".
+            migrate_from: Optional path to a JSON file written by IngredientDatabase.
+                          Its contents are imported once, the first time this
+                          SQLite file is opened; later opens ignore it.
+        """
+        self._conn = sqlite3.connect(filepath, check_same_thread=False, isolation_level=None)
+        self._conn_lock = threading.Lock()  # One statement at a time on the shared connection
+        self._data_version = None  # PRAGMA data_version as of the last load or refresh
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        if migrate_from:
+            self._migrate_from_json(migrate_from)
+        super().__init__(filepath=filepath)
+
+    def _migrate_from_json(self, json_filepath: str) -> None:
+        """Imports a legacy JSON catalog in one transaction, unless already done."""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        if not os.path.exists(json_filepath):
+            return
+        try:
+            with open(json_filepath, 'r') as f:
+                data = json.load(f)
+            rows = []
+            for ing_data in data.values():
+                ing = Ingredient.from_dict(ing_data)
+                rows.append((ing.name, ing.calories, ing.protein, ing.carbs, ing.fat))
+        except (IOError, json.JSONDecodeError, ValueError, AttributeError) as e:
+            print(f"Could not migrate ingredients from {json_filepath}: {e}")
+            return
+
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(_UPSERT_SQL, rows)
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (json_filepath,)
+            )
+        print(f"Migrated {len(rows)} ingredients from {json_filepath} to SQLite.")
+
+    def add_ingredient(self, ingredient: Ingredient) -> None:
+        """
+        Adds a new ingredient and writes its row to the SQLite file.
+
+        Args:
+            ingredient: The Ingredient object to add.
+
+        Raises:
+            ValueError: If an ingredient with the same name already exists.
+        """
+        # The connection lock keeps memory and file changes of concurrent writers in the same order.
+        with self._conn_lock:
+            super().add_ingredient(ingredient)
+            try:
+                self._conn.execute(
+                    _UPSERT_SQL,
+                    (ingredient.name, ingredient.calories, ingredient.protein, ingredient.carbs, ingredient.fat),
+                )
+            except sqlite3.Error:
+                self._discard(ingredient.name)
+                raise
+
+    def import_ingredients(self, ingredients, overwrite: bool = False) -> tuple[int, int]:
+        """
+        Adds many ingredients at once and writes their rows in one transaction.
+
+        Args:
+            ingredients: Iterable of Ingredient objects.
+            overwrite: Replace existing ingredients with the same name; otherwise they are skipped.
+
+        Returns:
+            (added, replaced) counts, as for IngredientDatabase.import_ingredients.
+        """
+        with self._conn_lock:
+            batch, accepted = self._import_batch(ingredients, overwrite)
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(_UPSERT_SQL, [
+                    (ing.name, ing.calories, ing.protein, ing.carbs, ing.fat) for ing in batch.values()
+                ])
+            added, _ = super().import_ingredients(batch.values(), overwrite=True)
+        return added, accepted - added
+
+    def remove_ingredient(self, name: str) -> bool:
+        """
+        Removes an ingredient by its name and deletes its row.
+
+        Args:
+            name: The name of the ingredient to remove.
+
+        Returns:
+            True if the ingredient was removed, False if not found.
+        """
+        with self._conn_lock:
+            if not super().remove_ingredient(name):
+                return False
+            self._conn.execute("DELETE FROM ingredients WHERE name = ?", (name,))
+        return True
+
+    def _mark_dirty(self, name: str, ingredient: Ingredient | None) -> None:
+        """Every change is committed right away, so nothing is ever left unsaved."""
+
+    def _read_rows(self) -> dict[str, Ingredient]:
+        """Reads all rows and records the data version they belong to; the caller holds _conn_lock."""
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        rows = self._conn.execute("SELECT name, calories, protein, carbs, fat FROM ingredients").fetchall()
+        return {ingredient.name: ingredient for ingredient in Ingredient.from_rows(rows)}
+
+    def refresh(self) -> bool:
+        """
+        Picks up ingredients that other connections added or removed.
+
+        PRAGMA data_version only changes when another connection commits, so
+        an unchanged database costs one pragma; otherwise the rows are read
+        and only the differences are applied.
+
+        Returns:
+            True if any ingredient changed.
+        """
+        try:
+            with self._conn_lock:
+                if self._conn.execute("PRAGMA data_version").fetchone()[0] == self._data_version:
+                    return False
+                # The lock is held until memory matches the rows, so local writes queue behind it.
+                return self._apply_external(self._read_rows())
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error reading ingredients from {self.filepath}: {e}. Keeping the loaded ingredients.")
+            return False
+
+    def save_ingredients(self) -> None:
+        """
+        Kept for API compatibility: every add/remove is already committed
+        as its own single-row statement, so there is nothing left to write.
+        """
+
+    @timed("load_ingredients")
+    def load_ingredients(self) -> None:
+        """Loads all ingredient rows from the SQLite file into the read cache."""
+        try:
+            with self._conn_lock:
+                ingredients = self._read_rows()
+            print(f"Ingredients loaded from {self.filepath}")
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error loading ingredients from {self.filepath}: {e}. Starting with an empty database.")
+            ingredients = {}
+        self._replace_ingredients(ingredients)
+
+    def close(self) -> None:
+        """Closes the underlying SQLite connection."""
+        super().close()
+        with self._conn_lock:
+            self._conn.close()
+
+    def __repr__(self) -> str:
+        return f"<SQLiteIngredientDatabase: {len(self._ingredients)} ingredients, file='{self.filepath}'>"
@@ -0,0 +1,106 @@
+import atexit
+import threading
+import time
+
+class WriteBehind:
+    """
+    Coalesces changes into periodic writes on a background thread.
+
+    Callers invoke mark_dirty() after each change instead of writing. The
+    write runs once `interval` seconds have passed since the oldest unwritten
+    change, or as soon as `max_changes` changes are pending, whichever comes
+    first; no change therefore stays unwritten for longer than `interval` plus
+    the duration of one write. flush() writes synchronously, and close() (also
+    run when the interpreter exits) writes whatever is still pending.
+    """
+
+    def __init__(self, write, interval: float = 1.0, max_changes: int = 100, name: str = "write-behind"):
+        """
+        Args:
+            write: Callable that writes the current state. It takes its own
+                   snapshot, so one call covers every change marked before it.
+            interval: Maximum staleness of the file, in seconds.
+            max_changes: Number of pending changes that triggers a write early.
+            name: Name of the background thread.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive.")
+        if max_changes < 1:
+            raise ValueError("max_changes must be at least 1.")
+        self._write = write
+        self.interval = interval
+        self.max_changes = max_changes
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # One write at a time, from the thread or flush()
+        self._pending = 0
+        self._oldest = None  # time.monotonic() of the oldest unwritten change
+        self._closed = False
+        self.writes = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending(self) -> int:
+        """Number of changes marked since the last write started."""
+        return self._pending
+
+    def mark_dirty(self) -> None:
+        """Records one change; after close() the change is written right away."""
+        with self._cond:
+            if not self._closed:
+                if not self._pending:
+                    self._oldest = time.monotonic()
+                self._pending += 1
+                if self._pending == 1 or self._pending >= self.max_changes:
+                    self._cond.notify()  # Start the staleness timer, or write now
+                return
+        self._write()
+
+    def _due(self) -> bool:
+        return self._pending >= self.max_changes or time.monotonic() >= self._oldest + self.interval
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not (self._pending and self._due()):
+                    timeout = self._oldest + self.interval - time.monotonic() if self._pending else None
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:  # Keep the thread alive; the changes stay pending
+                print(f"Error in background write: {e}")
+                with self._cond:
+                    self._cond.wait(self.interval)
+
+    def flush(self) -> None:
+        """Writes pending changes now and returns once they are written."""
+        with self._write_lock:
+            with self._cond:
+                pending, self._pending = self._pending, 0
+                oldest, self._oldest = self._oldest, None
+            if not pending:
+                return
+            try:
+                self._write()
+                self.writes += 1
+            except BaseException:
+                with self._cond:
+                    self._pending += pending
+                    self._oldest = oldest if self._oldest is None else min(oldest, self._oldest)
+                raise
+
+    def close(self) -> None:
+        """Stops the background thread and writes anything still pending."""
+        with self._cond:
+            already_closed = self._closed
+            self._closed = True
+            self._cond.notify_all()
+        if already_closed:
+            return
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
@@ -0,0 +1,320 @@
+import unittest
+import os
+import sys
+import threading
+from io import StringIO
+
+import app as app_module
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.history_manager import MealHistoryManager
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.lazy_store import LazyStore
+from nutrition_tracker.meal_calculator import MealCalculationCache
+from nutrition_tracker.nutrient_matrix import numpy_available
+
+class TestAppApi(unittest.TestCase):
+    """Exercises the /api/* routes against throwaway data files."""
+
+    def setUp(self):
+        """Point the app at empty test files and create a test client."""
+        self.test_db_filepath = "test_app_ingredients.json"
+        self.test_history_filepath = "test_app_history.json"
+        self._remove_files()
+        self._saved_stdout = sys.stdout
+        sys.stdout = StringIO()  # The managers print CLI feedback
+        self._saved_db = app_module.db
+        self._saved_history_manager = app_module.history_manager
+        app_module.db = IngredientDatabase(filepath=self.test_db_filepath)
+        app_module.history_manager = MealHistoryManager(filepath=self.test_history_filepath)
+        self._saved_meal_cache = app_module.meal_cache
+        app_module.meal_cache = MealCalculationCache()
+        app_module.db.add_ingredient(Ingredient("Chicken Breast", 165, 31, 0, 3.6))
+        app_module.db.add_ingredient(Ingredient("Brown Rice", 111, 2.6, 23, 0.9))
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        """Restore the app's managers and remove the test files."""
+        app_module.db = self._saved_db
+        app_module.history_manager = self._saved_history_manager
+        app_module.meal_cache = self._saved_meal_cache
+        sys.stdout = self._saved_stdout
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.test_db_filepath, self.test_history_filepath,
+                     self.test_db_filepath + ".lock", self.test_history_filepath + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _log_meal(self, name="Lunch", weight=100):
+        response = self.client.post('/api/calculate_meal', json={
+            "name": name,
+            "ingredients": [{"name": "Chicken Breast", "weight": weight}],
+            "save_meal": True,
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_ingredients_etag(self):
+        """Test the ETag, 304 revalidation and invalidation of the catalog endpoint."""
+        first = self.client.get('/api/get_ingredients')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([ing["name"] for ing in first.get_json()], ["Chicken Breast", "Brown Rice"])
+        etag = first.headers["ETag"]
+        cached = self.client.get('/api/get_ingredients', headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_data(), b"")
+
+        app_module.db.add_ingredient(Ingredient("Oats", 389, 16.9, 66, 6.9))
+        changed = self.client.get('/api/get_ingredients', headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+        self.assertEqual(len(changed.get_json()), 3)
+
+    def test_search_ingredients(self):
+        """Test the ingredient search endpoint."""
+        data = self.client.get('/api/search_ingredients?q=rice').get_json()
+        self.assertEqual(data, [app_module.db.get_ingredient("Brown Rice").to_dict()])
+        data = self.client.get('/api/search_ingredients?q=&limit=1').get_json()
+        self.assertEqual([ing["name"] for ing in data], ["Brown Rice"])
+        self.assertEqual(self.client.get('/api/search_ingredients?q=x&limit=abc').status_code, 400)
+
+    def test_calculate_meal(self):
+        """Test a meal calculation and its per-line breakdown."""
+        response = self.client.post('/api/calculate_meal', json={
+            "name": "Dinner",
+            "ingredients": [{"name": "Chicken Breast", "weight": 200}, {"name": "Brown Rice", "weight": 150}],
+        })
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["total_nutrition"], {
+            "total_calories": 496.5, "total_protein_g": 65.9, "total_carbs_g": 34.5,
+            "total_fat_g": 8.55, "total_weight_g": 350,
+        })
+        self.assertEqual([line["name"] for line in data["ingredients_list"]], ["Chicken Breast", "Brown Rice"])
+        self.assertEqual(data["ingredients_list"][1]["calories"], 166.5)
+
+    def test_calculate_meal_missing_ingredient(self):
+        """Test that unknown ingredients are reported with 404."""
+        response = self.client.post('/api/calculate_meal', json={
+            "ingredients": [{"name": "Tofu", "weight": 100}],
+        })
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("Tofu", response.get_json()["message"])
+
+    def test_meal_cache_stats(self):
+        """Test that repeated meals are served from the cache and counted."""
+        for _ in range(3):
+            self._log_meal("Breakfast")
+        self.assertEqual(self.client.get('/api/meal_cache_stats').get_json(),
+                         {"size": 1, "maxsize": 1024, "hits": 2, "misses": 1, "evictions": 0})
+
+    def test_calculate_meals_batch(self):
+        """Test that a batch returns one result per meal and isolates failures."""
+        response = self.client.post('/api/calculate_meals', json={"meals": [
+            {"name": "Dinner", "ingredients": [{"name": "Chicken Breast", "weight": 200}, {"name": "Brown Rice", "weight": 150}]},
+            {"name": "Bad", "ingredients": [{"name": "Tofu", "weight": 100}]},
+            {"name": "Worse", "ingredients": [{"name": "Brown Rice", "weight": "lots"}]},
+            {"name": "Snack", "ingredients": [{"name": "Brown Rice", "weight": 50}], "save_meal": True},
+        ]})
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data["succeeded"], data["failed"]), (2, 2))
+        single = self.client.post('/api/calculate_meal', json={
+            "name": "Dinner",
+            "ingredients": [{"name": "Chicken Breast", "weight": 200}, {"name": "Brown Rice", "weight": 150}],
+        }).get_json()
+        self.assertEqual(data["results"][0], single)
+        self.assertEqual(data["results"][1]["status"], 404)
+        self.assertIn("Tofu", data["results"][1]["message"])
+        self.assertEqual(data["results"][2]["status"], 400)
+        self.assertEqual(data["results"][3]["total_nutrition"]["total_calories"], 55.5)
+        self.assertEqual([m["name"] for m in app_module.history_manager.get_all_meals_summary()], ["Snack"])
+
+    def test_calculate_meals_bad_items_do_not_fail_batch(self):
+        """Test that unhashable names and non-finite weights fail only their own meal."""
+        good = {"name": "Good", "ingredients": [{"name": "Brown Rice", "weight": 100}]}
+        response = self.client.post('/api/calculate_meals', json={"meals": [
+            good,
+            {"ingredients": [{"name": ["x"], "weight": 1}]},
+            {"ingredients": [{"name": {"a": 1}, "weight": 1}]},
+            {"ingredients": [{"name": "Brown Rice", "weight": "nan"}]},
+            {"ingredients": [{"name": "Brown Rice", "weight": "inf"}]},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertTrue(data["results"][0]["success"])
+        self.assertEqual([r["status"] for r in data["results"][1:]], [400, 400, 400, 400])
+        self.assertNotIn(b"NaN", response.get_data())
+        single = self.client.post('/api/calculate_meal', json={"ingredients": [{"name": "Brown Rice", "weight": "nan"}]})
+        self.assertEqual(single.status_code, 400)
+
+    def test_calculate_meals_limits(self):
+        """Test the empty-batch and batch-size checks."""
+        self.assertEqual(self.client.post('/api/calculate_meals', json={"meals": []}).status_code, 400)
+        saved_limit = app_module.app.config["MAX_MEAL_BATCH_SIZE"]
+        app_module.app.config["MAX_MEAL_BATCH_SIZE"] = 2
+        try:
+            meal = {"ingredients": [{"name": "Brown Rice", "weight": 10}]}
+            response = self.client.post('/api/calculate_meals', json={"meals": [meal] * 3})
+            self.assertEqual(response.status_code, 413)
+        finally:
+            app_module.app.config["MAX_MEAL_BATCH_SIZE"] = saved_limit
+
+    def test_get_meal_history_full_list(self):
+        """Test that the history endpoint without parameters returns everything."""
+        for i in range(3):
+            self._log_meal(f"Meal {i}")
+        data = self.client.get('/api/get_meal_history').get_json()
+        self.assertTrue(data["success"])
+        self.assertEqual(len(data["history"]), 3)
+        self.assertNotIn("next_cursor", data)
+
+    def test_get_meal_history_pagination(self):
+        """Test limit and before on the history endpoint."""
+        for i in range(5):
+            self._log_meal(f"Meal {i}")
+        first = self.client.get('/api/get_meal_history?limit=2').get_json()
+        self.assertEqual(len(first["history"]), 2)
+        self.assertIsNotNone(first["next_cursor"])
+        self.assertIsNone(first["prev_cursor"])
+
+        ids = [m["id"] for m in first["history"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            page = self.client.get(f'/api/get_meal_history?limit=2&before={cursor}').get_json()
+            ids.extend(m["id"] for m in page["history"])
+            cursor = page["next_cursor"]
+        full = self.client.get('/api/get_meal_history').get_json()["history"]
+        self.assertEqual(ids, [m["id"] for m in full])
+
+    def test_get_meal_history_bad_parameters(self):
+        """Test validation of the paging parameters."""
+        self.assertEqual(self.client.get('/api/get_meal_history?limit=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/get_meal_history?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/get_meal_history?limit=100000').status_code, 400)
+        self.assertEqual(self.client.get('/api/get_meal_history?before=%25%25').status_code, 400)
+
+
+    def test_nutrition_totals(self):
+        """Test the totals endpoint against the meals logged through the API."""
+        self._log_meal("Lunch", 100)
+        self._log_meal("Dinner", 200)
+        data = self.client.get('/api/nutrition_totals?bucket=week').get_json()
+        self.assertTrue(data["success"])
+        self.assertEqual(data["bucket"], "week")
+        self.assertEqual(data["totals"]["meals"], 2)
+        self.assertEqual(data["totals"]["total_calories"], 495)
+        self.assertEqual(sum(b["total_calories"] for b in data["buckets"]), 495)
+        self.assertEqual(self.client.get('/api/nutrition_totals?bucket=year').status_code, 400)
+        self.assertEqual(self.client.get('/api/nutrition_totals?from=soon').status_code, 400)
+
+    def test_import_ingredients_upload(self):
+        """Test bulk import from a multipart upload and from a raw body."""
+        from io import BytesIO
+        csv_body = b"name,calories,protein,carbs,fat,portion_size\nOats,389,16.9,66.3,6.9,\nBrown Rice,1,1,1,1,\nBad,-1,0,0,0,\n"
+        data = self.client.post('/api/import_ingredients', data={"file": (BytesIO(csv_body), "foods.csv")},
+                                content_type="multipart/form-data").get_json()
+        self.assertEqual((data["added"], data["skipped"], data["invalid"]), (1, 1, 1))
+        self.assertEqual(app_module.db.get_ingredient("Brown Rice").calories, 111)
+
+        jsonl_body = b'{"name": "Brown Rice", "calories": 112, "protein": 2.3, "carbs": 23.5, "fat": 0.8}\n'
+        data = self.client.post('/api/import_ingredients?on_duplicate=overwrite', data=jsonl_body,
+                                content_type="application/x-ndjson").get_json()
+        self.assertTrue(data["success"])
+        self.assertEqual(data["replaced"], 1)
+        self.assertEqual(app_module.db.get_ingredient("Brown Rice").calories, 112)
+
+        self.assertEqual(self.client.post('/api/import_ingredients', data=b"x").status_code, 400)
+        self.assertEqual(self.client.post('/api/import_ingredients?format=csv&on_duplicate=merge',
+                                          data=csv_body).status_code, 400)
+        self.assertEqual(self.client.post('/api/import_ingredients?format=csv', data=b"name\nx\n").status_code, 400)
+
+    def test_export_history(self):
+        """Test the streamed history export and its parameters."""
+        self._log_meal("Lunch", 100)
+        self._log_meal("Dinner", 200)
+        response = self.client.get('/api/export_history?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertIn("meal_history.csv", response.headers["Content-Disposition"])
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn("Chicken Breast", lines[1])
+        ndjson = self.client.get('/api/export_history').get_data(as_text=True).splitlines()
+        self.assertEqual(len(ndjson), 2)
+        self.assertEqual(len(self.client.get('/api/export_history?from=2999-01-01').get_data()), 0)
+        self.assertEqual(self.client.get('/api/export_history?format=xml').status_code, 400)
+
+    def test_metrics(self):
+        """Test request, storage and size metrics in the Prometheus text format."""
+        self._log_meal("Lunch", 100)
+        self.client.get('/api/get_meal_detail/nope')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        body = response.get_data(as_text=True)
+        self.assertIn('nutrition_http_requests_total{route="/api/calculate_meal",method="POST",status="200"}', body)
+        self.assertIn('nutrition_http_requests_total{route="/api/get_meal_detail/<meal_id>",method="GET",status="404"}', body)
+        self.assertIn('nutrition_http_request_duration_seconds_bucket{route="/api/calculate_meal",method="POST",le="+Inf"}', body)
+        self.assertIn('nutrition_storage_operation_duration_seconds_count{operation="save_history"}', body)
+        self.assertIn('nutrition_storage_bytes_written_total{operation="save_history"}', body)
+        self.assertIn("nutrition_catalog_ingredients 2\n", body)
+        self.assertIn("nutrition_history_meals 1\n", body)
+        self.assertIn(f'nutrition_storage_file_bytes{{store="history"}} {os.path.getsize(self.test_history_filepath)}\n', body)
+
+    @unittest.skipUnless(numpy_available(), "NumPy is not installed")
+    def test_solve_meal(self):
+        """Test solving for macro targets, saving the solved meal and rejecting bad requests."""
+        response = self.client.post('/api/solve_meal', json={
+            "name": "Bulk", "save_meal": True, "targets": {"protein": 51.7, "carbs": 46},
+            "ingredients": [{"name": "Chicken Breast", "max_weight": 300}, {"name": "Brown Rice", "max_weight": 300}],
+        })
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertEqual([line["weight_g"] for line in result["ingredients_list"]], [150.0, 200.0])
+        self.assertEqual(result["total_nutrition"]["total_weight_g"], 350.0)
+        self.assertEqual(result["deviation"], {"protein": 0.0, "carbs": 0.0})
+        self.assertIn("calories_per_100g", result["nutrition_per_100g"])
+        history = app_module.history_manager.get_all_meals_summary()
+        self.assertEqual([meal["name"] for meal in history], ["Bulk"])
+
+        response = self.client.post('/api/solve_meal', json={"ingredients": [{"name": "Brown Rice"}], "targets": {}})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/solve_meal', json={"ingredients": [{"name": "Kale"}], "targets": {"fat": 5}})
+        self.assertEqual(response.status_code, 404)
+
+    def test_ready_and_lazy_stores(self):
+        """Test that a request waits only for the store it uses, and that /ready reports the loading stores."""
+        release = threading.Event()
+        loaded_db = app_module.db
+
+        def open_history():
+            release.wait(5)
+            return MealHistoryManager(filepath=self.test_history_filepath)
+
+        app_module.db = LazyStore("catalog", lambda: loaded_db)
+        app_module.history_manager = LazyStore("history", open_history)
+        saved_thread, app_module._warmup_thread = app_module._warmup_thread, None
+        try:
+            response = self.client.get('/api/get_ingredients')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()), 2)
+            response = self.client.get('/ready')
+            self.assertEqual(response.status_code, 503)
+            stores = response.get_json()["stores"]
+            self.assertTrue(stores["catalog"]["ready"])
+            self.assertFalse(stores["history"]["ready"])
+            self.assertNotIn("\nnutrition_history_meals ", self.client.get('/metrics').get_data(as_text=True))
+
+            release.set()
+            app_module._warmup_thread.join(5)
+            response = self.client.get('/ready')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.get_json()["ready"])
+            self.assertIsNotNone(response.get_json()["stores"]["history"]["load_seconds"])
+        finally:
+            release.set()
+            app_module._warmup_thread = saved_thread
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+from io import StringIO
+
+import asgi
+import app as app_module
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.history_manager import MealHistoryManager
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.lazy_store import LazyStore
+
+async def _call(method, path, body=None, query=b""):
+    """Calls the ASGI app once; returns the messages it sent."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {"type": "http", "method": method, "path": path, "query_string": query, "http_version": "1.1",
+             "headers": [(b"content-type", b"application/json")] if body is not None else [],
+             "server": ("testserver", 80), "client": ("127.0.0.1", 1234), "scheme": "http", "root_path": ""}
+    messages = [{"type": "http.request", "body": payload[:5], "more_body": True},
+                {"type": "http.request", "body": payload[5:], "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.application(scope, receive, send)
+    return sent
+
+async def _request(method, path, body=None, query=b""):
+    """Calls the ASGI app once; returns (status, headers, body)."""
+    sent = await _call(method, path, body, query)
+    return sent[0]["status"], dict(sent[0]["headers"]), b"".join(message["body"] for message in sent[1:])
+
+class TestAsgiApp(unittest.TestCase):
+    """Serves the Flask routes through the ASGI app, with write-behind managers as in async mode."""
+
+    def setUp(self):
+        """Point the app at empty write-behind managers."""
+        self.test_db_filepath = "test_asgi_ingredients.json"
+        self.test_history_filepath = "test_asgi_history.json"
+        self._remove_files()
+        self._saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+        self._saved = (app_module.db, app_module.history_manager, asgi.FLUSH_BEFORE_RESPONSE)
+        app_module.db = IngredientDatabase(filepath=self.test_db_filepath, flush_interval=60)
+        app_module.history_manager = MealHistoryManager(filepath=self.test_history_filepath, flush_interval=60)
+        asgi.FLUSH_BEFORE_RESPONSE = True
+
+    def tearDown(self):
+        """Restore the app's managers and remove the test files."""
+        app_module.db.close()
+        app_module.history_manager.close()
+        app_module.db, app_module.history_manager, asgi.FLUSH_BEFORE_RESPONSE = self._saved
+        sys.stdout = self._saved_stdout
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.test_db_filepath, self.test_history_filepath,
+                     self.test_db_filepath + ".lock", self.test_history_filepath + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_writes_are_flushed_before_the_response(self):
+        """Test that a mutating request returns only once the persistence thread wrote its change."""
+        status, headers, body = asyncio.run(_request("POST", "/api/add_ingredient", {
+            "name": "Oats", "calories": 389, "protein": 16.9, "carbs": 66, "fat": 6.9}))
+        self.assertEqual(status, 200)
+        self.assertTrue(json.loads(body)["success"])
+        with open(self.test_db_filepath) as f:
+            self.assertIn("Oats", json.load(f))
+
+        app_module.db.add_ingredient(Ingredient("Kale", 49, 4.3, 8.8, 0.9))  # Pending, not written yet
+        status, headers, body = asyncio.run(_request("GET", "/api/get_ingredients"))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b"content-type"], b"application/json")
+        self.assertEqual(json.loads(body), app_module.app.test_client().get('/api/get_ingredients').get_json())
+        with open(self.test_db_filepath) as f:
+            self.assertNotIn("Kale", json.load(f))  # Reads do not flush
+
+    def test_many_concurrent_requests(self):
+        """Test that concurrent mutating requests all succeed and are all persisted."""
+        app_module.db.add_ingredient(Ingredient("Chicken Breast", 165, 31, 0, 3.6))
+
+        async def log_meals():
+            return await asyncio.gather(*(_request("POST", "/api/calculate_meal", {
+                "name": f"Meal {i}", "ingredients": [{"name": "Chicken Breast", "weight": 100 + i}],
+                "save_meal": True}) for i in range(50)))
+
+        responses = asyncio.run(log_meals())
+        self.assertEqual({status for status, _, _ in responses}, {200})
+        with open(self.test_history_filepath) as f:
+            self.assertEqual(len(json.load(f)), 50)
+        status, _, body = asyncio.run(_request("GET", "/api/nutrition_totals", query=b"bucket=month"))
+        self.assertEqual(json.loads(body)["totals"]["meals"], 50)
+
+    def test_configure_persistence(self):
+        """Test that the persistence mode is set through app.py, not the environment, and only before loading."""
+        self.assertNotIn("NUTRITION_FLUSH_INTERVAL", os.environ)
+        self.assertEqual(app_module.FLUSH_INTERVAL, asgi._BACKSTOP_FLUSH_INTERVAL)
+        self.assertFalse(app_module.configure_persistence(asgi._BACKSTOP_FLUSH_INTERVAL))  # Loaded managers
+
+        saved_warmup = app_module._warmup_thread
+        app_module._warmup_thread = None
+        app_module.history_manager.close()
+        app_module.db.close()
+        app_module.db = LazyStore("catalog", lambda: IngredientDatabase(filepath=self.test_db_filepath,
+                                                                        flush_interval=app_module.FLUSH_INTERVAL))
+        app_module.history_manager = LazyStore("history", lambda: MealHistoryManager(
+            filepath=self.test_history_filepath, flush_interval=app_module.FLUSH_INTERVAL))
+        try:
+            self.assertTrue(app_module.configure_persistence(asgi._BACKSTOP_FLUSH_INTERVAL))
+            self.assertEqual(app_module.db.get()._write_behind.interval, asgi._BACKSTOP_FLUSH_INTERVAL)
+            self.assertFalse(app_module.configure_persistence(asgi._BACKSTOP_FLUSH_INTERVAL))
+        finally:
+            app_module._warmup_thread = saved_warmup
+
+    def _log_meals(self, count):
+        app_module.db.add_ingredient(Ingredient("Chicken Breast", 165, 31, 0, 3.6))
+        for i in range(count):
+            app_module.history_manager.add_meal(f"Meal {i}", [{"name": "Chicken Breast", "weight_g": 100 + i}],
+                                                {"total_calories": 165.0 + i}, {})
+
+    def test_streamed_response(self):
+        """Test that a streamed export is sent in parts, not joined into one body."""
+        self._log_meals(1000)
+        sent = asyncio.run(_call("GET", "/api/export_history", query=b"format=ndjson"))
+        parts = [message["body"] for message in sent[1:]]
+        self.assertGreater(len(parts), 2)
+        self.assertTrue(all(message["more_body"] for message in sent[1:-1]))
+        self.assertFalse(sent[-1]["more_body"])
+        self.assertEqual(b"".join(parts), app_module.app.test_client().get('/api/export_history').data)
+
+    def test_builtin_server(self):
+        """Test keep-alive requests through the built-in asyncio HTTP server."""
+        async def run():
+            ready = asyncio.get_running_loop().create_future()
+            server = asyncio.ensure_future(asgi.serve("127.0.0.1", 0, ready=ready.set_result))
+            port = await ready
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            replies = []
+            for path in ("/api/get_ingredients", "/api/no_such_route"):
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+                status_line = await reader.readline()
+                headers = {}
+                while (line := await reader.readline()) != b"\r\n":
+                    name, _, value = line.decode().partition(":")
+                    headers[name.lower()] = value.strip()
+                replies.append((status_line.split()[1], await reader.readexactly(int(headers["content-length"]))))
+            writer.close()
+            server.cancel()
+            try:
+                await server
+            except asyncio.CancelledError:
+                pass
+            return replies
+
+        replies = asyncio.run(run())
+        self.assertEqual(replies[0], (b"200", b"[]\n"))
+        self.assertEqual(replies[1][0], b"404")
+
+    def _serve(self, exchange):
+        """Runs `exchange(reader, writer)` against the built-in server; returns its result."""
+        async def run():
+            ready = asyncio.get_running_loop().create_future()
+            server = asyncio.ensure_future(asgi.serve("127.0.0.1", 0, ready=ready.set_result))
+            reader, writer = await asyncio.open_connection("127.0.0.1", await ready)
+            try:
+                return await exchange(reader, writer)
+            finally:
+                writer.close()
+                server.cancel()
+                try:
+                    await server
+                except asyncio.CancelledError:
+                    pass
+        return asyncio.run(run())
+
+    def test_builtin_server_streams_chunked(self):
+        """Test that the built-in server sends a streamed body with chunked encoding."""
+        self._log_meals(1000)
+
+        async def exchange(reader, writer):
+            writer.write(b"GET /api/export_history HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            status_line = await reader.readline()
+            headers = {}
+            while (line := await reader.readline()) != b"\r\n":
+                name, _, value = line.decode().partition(":")
+                headers[name.lower()] = value.strip()
+            chunks = []
+            while size := int(await reader.readline(), 16):
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            await reader.readexactly(2)
+            return status_line.split()[1], headers, chunks
+
+        status, headers, chunks = self._serve(exchange)
+        self.assertEqual(status, b"200")
+        self.assertEqual(headers["transfer-encoding"], "chunked")
+        self.assertNotIn("content-length", headers)
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(b"".join(chunks), app_module.app.test_client().get('/api/export_history').data)
+
+
+    def test_builtin_server_request_errors_and_expect(self):
+        """Test 400 for an overlong request line, 417 for an unknown expectation and 100-continue uploads."""
+        async def exchange(reader, writer):
+            writer.write(b"GET /" + b"a" * 100_000 + b" HTTP/1.1\r\n\r\n")
+            return await reader.read()
+
+        self.assertTrue(self._serve(exchange).startswith(b"HTTP/1.1 400 "))
+
+        async def exchange(reader, writer):
+            writer.write(b"POST /api/add_ingredient HTTP/1.1\r\nExpect: something\r\nContent-Length: 2\r\n\r\n")
+            return await reader.read()
+
+        self.assertTrue(self._serve(exchange).startswith(b"HTTP/1.1 417 "))
+
+        async def exchange(reader, writer):
+            body = json.dumps({"name": "Oats", "calories": 389, "protein": 16.9, "carbs": 66, "fat": 6.9}).encode()
+            writer.write(b"POST /api/add_ingredient HTTP/1.1\r\nContent-Type: application/json\r\n"
+                         b"Expect: 100-continue\r\nContent-Length: %d\r\nConnection: close\r\n\r\n" % len(body))
+            interim = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 1)
+            writer.write(body)
+            return interim, await reader.read()
+
+        interim, reply = self._serve(exchange)
+        self.assertEqual(interim, b"HTTP/1.1 100 Continue\r\n\r\n")
+        self.assertTrue(reply.startswith(b"HTTP/1.1 200 "))
+        self.assertIsNotNone(app_module.db.get_ingredient("Oats"))
+
+
+if __name__ == '__main__':
+    unittest.main()
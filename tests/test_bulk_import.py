@@ -0,0 +1,111 @@
+import unittest
+import io
+import json
+import os
+import sys
+from io import StringIO
+
+import main_cli
+from nutrition_tracker.bulk_import import import_ingredients, read_records
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.sqlite_database import SQLiteIngredientDatabase
+
+CSV_FILE = """Name, Calories,protein,carbs,fat,portion_size
+Oats,389,16.9,66.3,6.9,
+Milk,84,6.8,10,2,200
+Negative,-5,1,1,1,
+,100,1,1,1,
+Oats,1,1,1,1,
+Rice,abc,1,1,1,
+"""
+
+class TestBulkImport(unittest.TestCase):
+
+    def setUp(self):
+        """Set up an empty database and silence its CLI feedback."""
+        self.test_filepath = "test_bulk_import_ingredients.json"
+        self._remove_files()
+        self._saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+        self.db = IngredientDatabase(filepath=self.test_filepath)
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        sys.stdout = self._saved_stdout
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.test_filepath, self.test_filepath + ".lock", "test_bulk_import.db",
+                     "test_bulk_import.db-wal", "test_bulk_import.db-shm", "test_bulk_import.csv"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_csv_import_normalizes_and_reports(self):
+        """Test portion normalization, duplicate skipping and per-line errors."""
+        report = import_ingredients(self.db, StringIO(CSV_FILE), "csv")
+        self.assertEqual((report.added, report.replaced, report.skipped, report.invalid), (2, 0, 1, 3))
+        self.assertEqual([error["line"] for error in report.errors], [4, 5, 7])
+        milk = self.db.get_ingredient("Milk")
+        self.assertEqual((milk.calories, milk.protein, milk.carbs, milk.fat), (42, 3.4, 5, 1))
+        self.assertEqual(self.db.get_ingredient("Oats").calories, 389)  # First one kept
+        with open(self.test_filepath) as f:
+            self.assertEqual(set(json.load(f)), {"Oats", "Milk"})
+        self.assertEqual([i.name for i in self.db.search_ingredients("oa")], ["Oats"])
+
+    def test_jsonl_import_overwrite(self):
+        """Test the overwrite policy and JSONL parse errors."""
+        self.db.add_ingredient(Ingredient("Oats", 389, 16.9, 66.3, 6.9))
+        lines = [json.dumps({"name": "Oats", "calories": 379, "protein": 13, "carbs": 68, "fat": 6.5}),
+                 "{not json", "[1, 2]", "",
+                 json.dumps({"name": "Kale", "calories": 49, "protein": 4.3, "carbs": 8.8, "fat": 0.9}),
+                 json.dumps({"name": "Kale", "calories": 35, "protein": 2.9, "carbs": 4.4, "fat": 1.5})]
+        report = import_ingredients(self.db, StringIO("\n".join(lines)), "jsonl", overwrite=True, batch_size=2)
+        self.assertEqual((report.added, report.replaced, report.skipped, report.invalid), (1, 2, 0, 2))
+        self.assertEqual(self.db.get_ingredient("Oats").calories, 379)
+        self.assertEqual(self.db.get_ingredient("Kale").calories, 35)  # Last one wins
+
+    def test_bad_input(self):
+        """Test that an unusable file is rejected before anything is imported."""
+        with self.assertRaises(ValueError):
+            import_ingredients(self.db, StringIO("name,calories\nOats,389\n"), "csv")
+        with self.assertRaises(ValueError):
+            list(read_records(StringIO(""), "xml"))
+        report = import_ingredients(self.db, io.TextIOWrapper(io.BytesIO(b"name,calories,protein,carbs,fat\n\xff,1,1,1,1\n"),
+                                                              encoding="utf-8"), "csv")
+        self.assertEqual(report.invalid, 1)
+        self.assertEqual(self.db.list_ingredients(), [])
+        self.assertFalse(os.path.exists(self.test_filepath))
+
+    def test_sqlite_import(self):
+        """Test that the SQLite engine writes imported rows."""
+        db = SQLiteIngredientDatabase(filepath="test_bulk_import.db")
+        try:
+            report = import_ingredients(db, StringIO(CSV_FILE), "csv")
+            self.assertEqual(report.added, 2)
+        finally:
+            db.close()
+        db = SQLiteIngredientDatabase(filepath="test_bulk_import.db")
+        try:
+            self.assertEqual(sorted(db.list_ingredients()), ["Milk", "Oats"])
+        finally:
+            db.close()
+
+    def test_cli_import_command(self):
+        """Test the import subcommand of main_cli.py."""
+        with open("test_bulk_import.csv", "w") as f:
+            f.write(CSV_FILE)
+        saved = main_cli.DB_FILEPATH, main_cli.DB_ENGINE
+        main_cli.DB_FILEPATH, main_cli.DB_ENGINE = self.test_filepath, "json"
+        try:
+            status = main_cli.main(["import", "test_bulk_import.csv", "--on-duplicate", "overwrite"])
+        finally:
+            main_cli.DB_FILEPATH, main_cli.DB_ENGINE = saved
+        self.assertEqual(status, 1)  # Some records were invalid
+        self.assertIn("2 added, 1 replaced", sys.stdout.getvalue())
+        with open(self.test_filepath) as f:
+            self.assertEqual(json.load(f)["Oats"]["calories"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
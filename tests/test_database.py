@@ -1,6 +1,7 @@
 import unittest
 import os
 import json
+import shutil
 from nutrition_tracker.ingredient import Ingredient
 from nutrition_tracker.database import IngredientDatabase
 
@@ -18,8 +19,9 @@ class TestIngredientDatabase(unittest.TestCase):
 
     def tearDown(self):
         """Clean up after test methods."""
-        if os.path.exists(self.test_db_filepath):
-            os.remove(self.test_db_filepath)
+        for path in (self.test_db_filepath, self.test_db_filepath + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
 
     def test_initial_database_empty(self):
         """Test that a new database is initially empty if file doesn't exist."""
@@ -76,6 +78,31 @@ class TestIngredientDatabase(unittest.TestCase):
         self.assertFalse(self.db.remove_ingredient("Orange"))
         self.assertEqual(len(self.db.list_ingredients()), 0)
 
+    def test_search_ingredients(self):
+        """Test that search follows add and remove, and survives a reload."""
+        self.db.add_ingredient(self.ing1)
+        self.db.add_ingredient(Ingredient("Pineapple", 50, 0.5, 13, 0.1))
+        self.assertEqual([ing.name for ing in self.db.search_ingredients("APPLE")], ["Apple", "Pineapple"])
+        self.db.remove_ingredient("Apple")
+        self.assertEqual([ing.name for ing in self.db.search_ingredients("apple")], ["Pineapple"])
+        self.db.save_ingredients()
+        new_db = IngredientDatabase(filepath=self.test_db_filepath)
+        self.assertEqual([ing.name for ing in new_db.search_ingredients("pine")], ["Pineapple"])
+
+    def test_nutrient_matrix_follows_changes(self):
+        """Test that the nutrient matrix tracks add, remove and reload."""
+        if self.db.nutrient_matrix is None:
+            self.skipTest("NumPy is not installed")
+        self.db.add_ingredient(self.ing1)
+        self.db.add_ingredient(self.ing2)
+        self.assertIn("Apple", self.db.nutrient_matrix)
+        self.db.remove_ingredient("Apple")
+        self.assertNotIn("Apple", self.db.nutrient_matrix)
+        self.db.save_ingredients()
+        new_db = IngredientDatabase(filepath=self.test_db_filepath)
+        row = new_db.nutrient_matrix.row("Banana")
+        self.assertEqual(new_db.nutrient_matrix.values[row].tolist(), [89, 1.1, 23, 0.3])
+
     def test_save_and_load_ingredients_empty(self):
         """Test saving and loading an empty database."""
         self.db.save_ingredients()
@@ -150,6 +177,23 @@ class TestIngredientDatabase(unittest.TestCase):
         finally:
             sys.stdout = saved_stdout
 
+    def test_generation_changes_on_mutation(self):
+        """Test that every mutation changes the generation and reads do not."""
+        start = self.db.generation
+        self.db.add_ingredient(self.ing1)
+        after_add = self.db.generation
+        self.assertGreater(after_add, start)
+        self.db.get_ingredient(self.ing1.name)
+        self.db.list_ingredients()
+        self.assertEqual(self.db.generation, after_add)
+        self.db.remove_ingredient("Unknown")
+        self.assertEqual(self.db.generation, after_add)
+        self.db.remove_ingredient(self.ing1.name)
+        self.assertGreater(self.db.generation, after_add)
+        after_remove = self.db.generation
+        self.db.load_ingredients()
+        self.assertGreater(self.db.generation, after_remove)
+
     def test_repr_method(self):
         """Test the __repr__ method of IngredientDatabase."""
         self.assertEqual(repr(self.db), f"<IngredientDatabase: 0 ingredients, file='{self.test_db_filepath}'>")
@@ -157,5 +201,76 @@ class TestIngredientDatabase(unittest.TestCase):
         self.assertEqual(repr(self.db), f"<IngredientDatabase: 1 ingredients, file='{self.test_db_filepath}'>")
 
 
+    def test_two_databases_share_one_file(self):
+        """Test that saves merge with, and refresh picks up, another instance's changes."""
+        self.db.add_ingredient(self.ing1)
+        self.db.save_ingredients()
+        other = IngredientDatabase(filepath=self.test_db_filepath)
+        self.assertFalse(other.refresh())  # Unchanged file
+
+        other.add_ingredient(self.ing2)
+        self.db.remove_ingredient("Apple")
+        other.save_ingredients()
+        self.db.save_ingredients()  # Must keep Banana and drop Apple
+        with open(self.test_db_filepath, 'r') as f:
+            self.assertEqual(list(json.load(f)), ["Banana"])
+        self.assertEqual(self.db.list_ingredients(), ["Banana"])
+
+        generation = other.generation
+        self.assertTrue(other.refresh())
+        self.assertEqual(other.list_ingredients(), ["Banana"])
+        self.assertGreater(other.generation, generation)
+        self.assertFalse(other.refresh())
+
+    def test_refresh_keeps_unsaved_changes(self):
+        """Test that refresh never overrides changes that are not saved yet."""
+        self.db.save_ingredients()
+        other = IngredientDatabase(filepath=self.test_db_filepath)
+        other.add_ingredient(self.ing1)
+        other.save_ingredients()
+        self.db.add_ingredient(Ingredient("Apple", 60, 0.3, 14, 0.2))
+        self.db.refresh()
+        self.assertEqual(self.db.get_ingredient("Apple").calories, 60)
+
+    def test_write_behind_save(self):
+        """Test that saves are deferred in write-behind mode until flush or close."""
+        db = IngredientDatabase(filepath=self.test_db_filepath, flush_interval=60)
+        try:
+            db.add_ingredient(self.ing1)
+            db.save_ingredients()
+            self.assertFalse(os.path.exists(self.test_db_filepath))
+            db.flush()
+            self.assertEqual(IngredientDatabase(filepath=self.test_db_filepath).list_ingredients(), ["Apple"])
+            db.add_ingredient(self.ing2)
+            db.save_ingredients()
+        finally:
+            db.close()
+        self.assertCountEqual(IngredientDatabase(filepath=self.test_db_filepath).list_ingredients(), ["Apple", "Banana"])
+
+    def test_write_behind_failed_write_stays_pending(self):
+        """Test that a write that fails is reported to flush() and retried, not dropped."""
+        directory = "test_db_missing_dir"
+        filepath = os.path.join(directory, "ingredients.json")
+        db = IngredientDatabase(filepath=filepath, flush_interval=60)
+        try:
+            db.add_ingredient(self.ing1)
+            db.save_ingredients()
+            with self.assertRaises(OSError):
+                db.flush()
+            self.assertEqual(db._write_behind.pending, 1)
+            os.mkdir(directory)
+            db.flush()
+            self.assertEqual(IngredientDatabase(filepath=filepath).list_ingredients(), ["Apple"])
+        finally:
+            db.close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def test_failed_save_is_not_raised_without_write_behind(self):
+        """Test that a failed synchronous save is reported but leaves the change in memory."""
+        db = IngredientDatabase(filepath=os.path.join("test_db_missing_dir", "ingredients.json"))
+        db.add_ingredient(self.ing1)
+        db.save_ingredients()
+        self.assertEqual(db.list_ingredients(), ["Apple"])
+
 if __name__ == '__main__':
     unittest.main()
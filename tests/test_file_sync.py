@@ -0,0 +1,70 @@
+import unittest
+import os
+import threading
+import time
+from nutrition_tracker.file_sync import atomic_write, file_stamp, interprocess_lock
+
+class TestFileSync(unittest.TestCase):
+
+    def setUp(self):
+        """Set up for test methods."""
+        self.test_filepath = "test_file_sync.txt"
+        self._remove_files()
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.test_filepath, self.test_filepath + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_file_stamp(self):
+        """Test that the stamp is None for a missing file and changes on every atomic write."""
+        self.assertIsNone(file_stamp(self.test_filepath))
+        atomic_write(self.test_filepath, lambda f: f.write("one"))
+        first = file_stamp(self.test_filepath)
+        self.assertIsNotNone(first)
+        self.assertEqual(file_stamp(self.test_filepath), first)
+        atomic_write(self.test_filepath, lambda f: f.write("two"))  # Same size, maybe same mtime
+        self.assertNotEqual(file_stamp(self.test_filepath), first)
+
+    def test_atomic_write_keeps_old_contents_on_error(self):
+        """Test that a failed write leaves the previous file and no temporary files behind."""
+        atomic_write(self.test_filepath, lambda f: f.write("old"))
+
+        def failing_write(f):
+            f.write("partial")
+            raise RuntimeError("disk full")
+
+        with self.assertRaises(RuntimeError):
+            atomic_write(self.test_filepath, failing_write)
+        with open(self.test_filepath) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual([name for name in os.listdir(".") if name.startswith(self.test_filepath + ".")], [])
+
+    def test_interprocess_lock_is_exclusive(self):
+        """Test that holders of the lock never overlap, even within one process."""
+        inside = []
+        overlaps = []
+
+        def worker():
+            for _ in range(20):
+                with interprocess_lock(self.test_filepath):
+                    inside.append(1)
+                    if len(inside) > 1:
+                        overlaps.append(1)
+                    time.sleep(0.0005)
+                    inside.pop()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlaps, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
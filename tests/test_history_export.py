@@ -0,0 +1,148 @@
+import unittest
+import csv
+import io
+import json
+import os
+import sys
+from io import StringIO
+
+import main_cli
+from nutrition_tracker import history_export
+from nutrition_tracker.history_export import LINE_COLUMNS, arrow_available, export_history
+from nutrition_tracker.history_manager import MealHistoryManager
+
+def _entry(meal_id, timestamp, lines):
+    return {
+        "id": meal_id,
+        "name": f"Meal {meal_id}",
+        "timestamp": timestamp,
+        "ingredients_used": lines,
+        "total_nutrition": {"total_calories": 330, "total_protein_g": 40, "total_carbs_g": 0,
+                            "total_fat_g": 7.2, "total_weight_g": 200},
+        "nutrition_per_100g": {"calories_per_100g": 165},
+    }
+
+class TestHistoryExport(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a history of three days and silence its CLI feedback."""
+        self.test_filepath = "test_history_export.json"
+        self._remove_files()
+        self._saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+        self.hm = MealHistoryManager(filepath=self.test_filepath)
+        self.hm.history = [
+            _entry("b", "2024-03-02T12:00:00", [{"name": "Chicken", "weight_g": 150}, {"name": "Rice", "weight_g": 50}]),
+            _entry("a", "2024-03-01T12:00:00", [{"name": "Chicken", "weight_g": 200}]),
+            _entry("c", "2024-03-03T12:00:00", []),
+        ]
+        self.hm._rebuild_index()
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        sys.stdout = self._saved_stdout
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.test_filepath, self.test_filepath + ".lock", "test_history_export.csv"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_iter_meals_range_and_chunks(self):
+        """Test that iter_meals walks the range oldest first across chunk boundaries."""
+        self.assertEqual([m["id"] for m in self.hm.iter_meals(chunk_size=1)], ["a", "b", "c"])
+        self.assertEqual([m["id"] for m in self.hm.iter_meals(from_ts="2024-03-02", chunk_size=2)], ["b", "c"])
+        self.assertEqual([m["id"] for m in self.hm.iter_meals(to_ts="2024-03-03", chunk_size=1)], ["a", "b"])
+        meals = self.hm.iter_meals(chunk_size=1)
+        next(meals)
+        self.hm.delete_meal("b")  # Deleted before its chunk is reached
+        self.assertEqual([m["id"] for m in meals], ["c"])
+
+    def test_ndjson(self):
+        """Test that NDJSON holds the full entries, one per line."""
+        body = b"".join(export_history(self.hm.iter_meals(), "ndjson")).decode()
+        meals = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([m["id"] for m in meals], ["a", "b", "c"])
+        self.assertEqual(meals[1]["ingredients_used"][1], {"name": "Rice", "weight_g": 50})
+
+    def test_csv_lines_and_chunking(self):
+        """Test one CSV row per ingredient line, one chunk per CHUNK_MEALS meals."""
+        saved = history_export.CHUNK_MEALS
+        history_export.CHUNK_MEALS = 1
+        try:
+            chunks = list(history_export._csv(self.hm.iter_meals()))
+        finally:
+            history_export.CHUNK_MEALS = saved
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(tuple(rows[0]), LINE_COLUMNS)
+        self.assertEqual([(r[0], r[8], r[9]) for r in rows[1:]],
+                         [("a", "Chicken", "200.0"), ("b", "Chicken", "150.0"), ("b", "Rice", "50.0"), ("c", "", "")])
+        self.assertEqual(rows[1][3], "330.0")
+        empty = b"".join(export_history(iter(()), "csv")).decode()
+        self.assertEqual(empty.splitlines(), [",".join(LINE_COLUMNS)])
+
+    def test_unknown_format(self):
+        """Test that a bad format is rejected before anything is streamed."""
+        with self.assertRaises(ValueError):
+            export_history(iter(()), "xml")
+
+    def test_arrow_requires_pyarrow(self):
+        """Test that the arrow format is refused without pyarrow."""
+        saved = history_export.pa
+        history_export.pa = None  # As if pyarrow were not installed
+        try:
+            self.assertFalse(arrow_available())
+            with self.assertRaises(ValueError):
+                export_history(iter(()), "arrow")
+        finally:
+            history_export.pa = saved
+
+    @unittest.skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_arrow(self):
+        """Test that the Arrow stream holds the CSV rows."""
+        import pyarrow as pa
+        body = b"".join(export_history(self.hm.iter_meals(), "arrow"))
+        table = pa.ipc.open_stream(body).read_all()
+        self.assertEqual(table.column_names, list(LINE_COLUMNS))
+        self.assertEqual(table.column("ingredient_name").to_pylist(), ["Chicken", "Chicken", "Rice", None])
+        self.assertEqual(table.column("weight_g").to_pylist(), [200.0, 150.0, 50.0, None])
+        self.assertEqual(table.column("total_fat_g").to_pylist(), [7.2] * 4)
+
+        # Hand-edited entries with values of other types are exported as the csv would write them.
+        odd = dict(_entry("d", "2024-03-04T12:00:00", [{"name": 5, "weight_g": "10"}]), name=None)
+        table = pa.ipc.open_stream(b"".join(export_history(iter([odd]), "arrow"))).read_all()
+        self.assertEqual(table.to_pylist()[0]["ingredient_name"], "5")
+        self.assertIsNone(table.to_pylist()[0]["weight_g"])
+
+    def test_cli_export_command(self):
+        """Test the export subcommand of main_cli.py."""
+        self.hm._save_history()
+        saved = main_cli.MEAL_HISTORY_FILEPATH, main_cli.HISTORY_STORAGE
+        main_cli.MEAL_HISTORY_FILEPATH, main_cli.HISTORY_STORAGE = self.test_filepath, "json"
+        try:
+            status = main_cli.main(["export", "--format", "csv", "--from", "2024-03-02", "-o", "test_history_export.csv"])
+        finally:
+            main_cli.MEAL_HISTORY_FILEPATH, main_cli.HISTORY_STORAGE = saved
+        self.assertEqual(status, 0)
+        with open("test_history_export.csv", newline="") as f:
+            self.assertEqual([row[0] for row in csv.reader(f)][1:], ["b", "b", "c"])
+
+    def test_cli_failed_export_creates_no_file(self):
+        """Test that an export refused up front leaves no output file behind."""
+        self.hm._save_history()
+        saved = main_cli.MEAL_HISTORY_FILEPATH, main_cli.HISTORY_STORAGE, history_export.pa
+        main_cli.MEAL_HISTORY_FILEPATH, main_cli.HISTORY_STORAGE = self.test_filepath, "json"
+        history_export.pa = None
+        saved_stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            self.assertEqual(main_cli.main(["export", "--format", "arrow", "-o", "test_history_export.csv"]), 1)
+            self.assertIn("requires pyarrow", sys.stderr.getvalue())
+        finally:
+            main_cli.MEAL_HISTORY_FILEPATH, main_cli.HISTORY_STORAGE, history_export.pa = saved
+            sys.stderr = saved_stderr
+        self.assertFalse(os.path.exists("test_history_export.csv"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+import unittest
+import os
+import json
+from nutrition_tracker.history_journal import JournaledMealHistoryManager
+from tests.test_history_manager import _add_sample_meal
+
+class TestJournaledMealHistoryManager(unittest.TestCase):
+
+    def setUp(self):
+        """Set up for test methods."""
+        self.journal_filepath = "test_meal_history.ndjson"
+        self.legacy_filepath = "test_meal_history_legacy.json"
+        self._remove_files()
+        self.hm = self._open()
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        self.hm.close()
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.journal_filepath, self.journal_filepath + ".compact",
+                     self.journal_filepath + ".lock", self.legacy_filepath):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _open(self, **kwargs):
+        return JournaledMealHistoryManager(
+            filepath=self.journal_filepath, legacy_filepath=self.legacy_filepath, **kwargs
+        )
+
+    def _journal_records(self):
+        with open(self.journal_filepath, 'r') as f:
+            return [json.loads(line) for line in f]
+
+    def test_add_appends_one_record(self):
+        """Test that each add appends exactly one line."""
+        _add_sample_meal(self.hm, "Breakfast")
+        _add_sample_meal(self.hm, "Lunch")
+        records = self._journal_records()
+        self.assertEqual([r["op"] for r in records], ["add", "add"])
+        self.assertEqual(records[1]["meal"]["name"], "Lunch")
+
+    def test_delete_appends_tombstone(self):
+        """Test that a delete appends a tombstone rather than rewriting the file."""
+        meal = _add_sample_meal(self.hm)
+        self.assertTrue(self.hm.delete_meal(meal["id"]))
+        self.assertEqual(self._journal_records()[-1], {"op": "delete", "id": meal["id"]})
+
+    def test_replay_on_startup(self):
+        """Test that a reopened manager replays adds and tombstones."""
+        kept = _add_sample_meal(self.hm, "Kept")
+        deleted = _add_sample_meal(self.hm, "Deleted")
+        self.hm.delete_meal(deleted["id"])
+        self.hm.close()
+
+        self.hm = self._open()
+        self.assertEqual(self.hm.get_meal_by_id(kept["id"]), kept)
+        self.assertIsNone(self.hm.get_meal_by_id(deleted["id"]))
+
+    def test_torn_last_line_is_dropped(self):
+        """Test that a partially written last record is ignored and truncated."""
+        kept = _add_sample_meal(self.hm)
+        self.hm.close()
+        with open(self.journal_filepath, 'a') as f:
+            f.write('{"op": "add", "meal": {"id": "tor')
+
+        self.hm = self._open()
+        self.assertEqual([m["id"] for m in self.hm.history], [kept["id"]])
+        new_meal = _add_sample_meal(self.hm)
+        self.assertEqual(self._journal_records()[-1]["meal"]["id"], new_meal["id"])
+
+    def test_non_object_records_are_skipped(self):
+        """Test that valid JSON lines that are not records are skipped like corrupt ones."""
+        kept = _add_sample_meal(self.hm)
+        self.hm.close()
+        with open(self.journal_filepath, 'a') as f:
+            f.write('5\n[]\n"add"\n{"op": "add", "meal": 7}\n')
+
+        for lazy_details in (False, True):
+            self.hm = self._open(lazy_details=lazy_details)
+            self.assertEqual([m["id"] for m in self.hm.history], [kept["id"]])
+            self.hm.close()
+        self.hm = self._open()
+
+    def test_legacy_json_is_imported(self):
+        """Test that a legacy JSON history is read when no journal exists."""
+        self.hm.close()
+        os.remove(self.journal_filepath)
+        legacy_meal = {"id": "legacy-1", "name": "Old", "timestamp": "2024-01-01T12:00:00+00:00",
+                       "ingredients_used": [], "total_nutrition": {}, "nutrition_per_100g": {}}
+        with open(self.legacy_filepath, 'w') as f:
+            json.dump([legacy_meal], f)
+
+        self.hm = self._open()
+        self.assertEqual(self.hm.get_meal_by_id("legacy-1"), legacy_meal)
+        self.assertEqual(self._journal_records(), [{"op": "add", "meal": legacy_meal}])
+
+    def test_background_compaction(self):
+        """Test that compaction runs once the dead record ratio passes the threshold."""
+        self.hm.close()
+        self.hm = self._open(compaction_threshold=0.5, min_compaction_records=4)
+        meals = [_add_sample_meal(self.hm, f"Meal {i}") for i in range(3)]
+        self.hm.delete_meal(meals[0]["id"])  # 4 records, 2 dead: not above threshold
+        self.assertEqual(len(self._journal_records()), 4)
+        self.hm.delete_meal(meals[1]["id"])  # 5 records, 4 dead: compaction starts
+        self.hm.wait_for_compaction()
+
+        self.assertEqual(self._journal_records(), [{"op": "add", "meal": meals[2]}])
+        self.assertEqual(self.hm.dead_record_ratio(), 0.0)
+        after = _add_sample_meal(self.hm, "After")
+        self.hm.close()
+        self.hm = self._open()
+        self.assertCountEqual([m["id"] for m in self.hm.history], [meals[2]["id"], after["id"]])
+
+    def test_compact(self):
+        """Test an explicit synchronous compaction."""
+        meal = _add_sample_meal(self.hm)
+        self.hm.delete_meal(_add_sample_meal(self.hm)["id"])
+        self.hm.compact()
+        self.assertEqual(self._journal_records(), [{"op": "add", "meal": meal}])
+
+
+    def test_two_managers_share_one_journal(self):
+        """Test that refresh and appends pick up another manager's records, also across compactions."""
+        kept = _add_sample_meal(self.hm, "Kept")
+        other = self._open()
+        self.assertFalse(other.refresh())
+        try:
+            from_other = _add_sample_meal(other, "From other")
+            self.assertTrue(self.hm.refresh())
+            self.assertIsNotNone(self.hm.get_meal_by_id(from_other["id"]))
+
+            other.delete_meal(kept["id"])
+            mine = _add_sample_meal(self.hm, "Mine")  # Applies the tombstone before appending
+            self.assertIsNone(self.hm.get_meal_by_id(kept["id"]))
+
+            self.hm.compact()
+            self.assertTrue(other.refresh())  # Replays the compacted journal
+            self.assertCountEqual([m["id"] for m in other.history], [from_other["id"], mine["id"]])
+            after = _add_sample_meal(other, "After compaction")
+            self.assertTrue(self.hm.refresh())
+            self.assertIsNotNone(self.hm.get_meal_by_id(after["id"]))
+        finally:
+            other.close()
+        self.assertEqual(len(self._open_and_close().history), 3)
+
+    def _open_and_close(self):
+        manager = self._open()
+        manager.close()
+        return manager
+
+    def test_write_behind_group_commit(self):
+        """Test that write-behind appends the queued records as one group, in order."""
+        self.hm.close()
+        self.hm = self._open(flush_interval=60)
+        meal = _add_sample_meal(self.hm)
+        self.hm.delete_meal(meal["id"])
+        self.assertEqual(self._journal_records(), [])
+        self.hm.flush()
+        self.assertEqual(self._journal_records(), [{"op": "add", "meal": meal}, {"op": "delete", "id": meal["id"]}])
+
+    def test_lazy_details(self):
+        """Test that lazy mode keeps summaries resident and reads full meals on demand."""
+        eager_meal = _add_sample_meal(self.hm, "Written eagerly")  # No summary prefix
+        self.hm.close()
+        self.hm = self._open(lazy_details=True, detail_cache_size=1)
+        lazy_meal = _add_sample_meal(self.hm, "Written lazily")
+        self.hm.close()
+
+        self.hm = self._open(lazy_details=True, detail_cache_size=1)
+        self.assertTrue(all("ingredients_used" not in meal for meal in self.hm.history))
+        self.assertEqual([m["name"] for m in self.hm.get_all_meals_summary()], ["Written lazily", "Written eagerly"])
+        self.assertEqual(self.hm.get_meal_by_id(eager_meal["id"]), eager_meal)
+        self.assertEqual(self.hm.get_meal_by_id(lazy_meal["id"]), lazy_meal)
+        self.assertEqual(list(self.hm._detail_cache), [lazy_meal["id"]])
+        self.assertIsNone(self.hm.get_meal_by_id("nonexistent-id"))
+
+        # Records written in lazy mode remain plain journal records.
+        self.assertEqual(self._journal_records()[-1]["meal"], lazy_meal)
+
+    def test_lazy_details_survive_compaction(self):
+        """Test that full meals stay readable after the journal is compacted in lazy mode."""
+        self.hm.close()
+        self.hm = self._open(lazy_details=True, detail_cache_size=0)
+        meals = [_add_sample_meal(self.hm, f"Meal {i}") for i in range(4)]
+        self.hm.delete_meal(meals[0]["id"])
+        self.hm.compact()
+        after = _add_sample_meal(self.hm, "After compaction")
+        for meal in meals[1:] + [after]:
+            self.assertEqual(self.hm.get_meal_by_id(meal["id"]), meal)
+        self.assertIsNone(self.hm.get_meal_by_id(meals[0]["id"]))
+
+        other = self._open()
+        try:
+            other.compact()  # Compaction by another process moves every record
+            other.delete_meal(meals[1]["id"])
+        finally:
+            other.close()
+        self.assertEqual(self.hm.get_meal_by_id(after["id"]), after)  # Catches up with the new journal
+        self.assertFalse(self.hm.refresh())
+        self.assertIsNone(self.hm.get_meal_by_id(meals[1]["id"]))
+        self.assertEqual(self.hm.get_meal_by_id(meals[2]["id"]), meals[2])
+
+    def test_compaction_without_a_record_location_keeps_the_journal(self):
+        """Test that a lazy compaction that cannot copy a meal's record leaves the journal as it was."""
+        self.hm.close()
+        self.hm = self._open(lazy_details=True, detail_cache_size=0)
+        meals = [_add_sample_meal(self.hm, f"Meal {i}") for i in range(2)]
+        self.hm.close()
+        self.hm = self._open(lazy_details=True, detail_cache_size=0)
+        before = self._journal_records()
+        del self.hm._locations[meals[0]["id"]]
+        self.hm.compact()
+        self.assertEqual(self._journal_records(), before)
+        self.assertFalse(self.hm._compacting)
+        after = _add_sample_meal(self.hm, "After")  # The journal is still open for appends
+        self.assertEqual(self.hm.get_meal_by_id(after["id"]), after)
+
+if __name__ == '__main__':
+    unittest.main()
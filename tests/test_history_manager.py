@@ -0,0 +1,248 @@
+import unittest
+import os
+import json
+import shutil
+from nutrition_tracker.history_manager import MealHistoryManager
+
+def _add_sample_meal(manager, name="Lunch", calories=500):
+    return manager.add_meal(
+        meal_name=name,
+        ingredients_used=[{"name": "Chicken", "weight_g": 100}],
+        total_nutrition={"total_calories": calories, "total_protein_g": 40},
+        nutrition_per_100g={"calories_per_100g": 200},
+    )
+
+def _sample_entry(meal_id, timestamp, calories=500):
+    return {
+        "id": meal_id,
+        "name": f"Meal {meal_id}",
+        "timestamp": timestamp,
+        "ingredients_used": [{"name": "Chicken", "weight_g": 100}],
+        "total_nutrition": {"total_calories": calories, "total_protein_g": 40},
+        "nutrition_per_100g": {"calories_per_100g": 200},
+    }
+
+class TestMealHistoryManager(unittest.TestCase):
+
+    def setUp(self):
+        """Set up for test methods."""
+        self.test_filepath = "test_meal_history.json"
+        if os.path.exists(self.test_filepath):
+            os.remove(self.test_filepath)
+        self.hm = MealHistoryManager(filepath=self.test_filepath)
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        for path in (self.test_filepath, self.test_filepath + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_initial_history_empty(self):
+        """Test that a new manager starts empty if the file doesn't exist."""
+        self.assertEqual(self.hm.get_all_meals_summary(), [])
+
+    def test_add_meal_persists(self):
+        """Test that an added meal is saved and reloaded."""
+        meal = _add_sample_meal(self.hm)
+        reloaded = MealHistoryManager(filepath=self.test_filepath)
+        self.assertEqual(reloaded.get_meal_by_id(meal["id"]), meal)
+
+    def test_get_meal_by_id_not_found(self):
+        """Test retrieving an unknown meal id."""
+        self.assertIsNone(self.hm.get_meal_by_id("nonexistent-id"))
+
+    def test_delete_meal(self):
+        """Test deleting a meal, and deleting it again."""
+        meal = _add_sample_meal(self.hm)
+        self.assertTrue(self.hm.delete_meal(meal["id"]))
+        self.assertFalse(self.hm.delete_meal(meal["id"]))
+        reloaded = MealHistoryManager(filepath=self.test_filepath)
+        self.assertIsNone(reloaded.get_meal_by_id(meal["id"]))
+
+    def test_delete_keeps_other_meals_reachable(self):
+        """Test that deleting from the middle keeps the id index consistent."""
+        meals = [_add_sample_meal(self.hm, f"Meal {i}") for i in range(5)]
+        self.assertTrue(self.hm.delete_meal(meals[1]["id"]))
+        self.assertTrue(self.hm.delete_meal(meals[0]["id"]))
+        for meal in meals[2:]:
+            self.assertEqual(self.hm.get_meal_by_id(meal["id"]), meal)
+        self.assertEqual(len(self.hm.history), 3)
+        reloaded = MealHistoryManager(filepath=self.test_filepath)
+        self.assertCountEqual([m["id"] for m in reloaded.history], [m["id"] for m in meals[2:]])
+
+    def test_duplicate_ids_on_load(self):
+        """Test that duplicate ids in a history file collapse to the last entry."""
+        with open(self.test_filepath, 'w') as f:
+            json.dump([_sample_entry("a", "2024-01-01T08:00:00+00:00", 300),
+                       _sample_entry("a", "2024-01-02T08:00:00+00:00", 700)], f)
+        import sys
+        from io import StringIO
+        saved_stdout = sys.stdout
+        try:
+            sys.stdout = StringIO()
+            hm = MealHistoryManager(filepath=self.test_filepath)
+        finally:
+            sys.stdout = saved_stdout
+        self.assertEqual(hm.get_meal_by_id("a")["total_nutrition"]["total_calories"], 700)
+        self.assertTrue(hm.delete_meal("a"))
+        self.assertEqual(hm.history, [])
+
+    def test_summary_most_recent_first(self):
+        """Test that summaries are sorted by timestamp, newest first."""
+        with open(self.test_filepath, 'w') as f:
+            json.dump([_sample_entry("b", "2024-01-02T08:00:00+00:00", 700),
+                       _sample_entry("a", "2024-01-01T08:00:00+00:00", 300),
+                       _sample_entry("c", "2024-01-03T08:00:00+00:00", 400)], f)
+        hm = MealHistoryManager(filepath=self.test_filepath)
+        summaries = hm.get_all_meals_summary()
+        self.assertEqual([s["id"] for s in summaries], ["c", "b", "a"])
+        self.assertEqual(summaries[1]["total_calories"], 700)
+        self.assertEqual(summaries[1]["total_carbs_g"], 0)
+
+    def _load_entries(self, count):
+        entries = [_sample_entry(f"m{i:02d}", f"2024-01-{i + 1:02d}T08:00:00+00:00", i) for i in range(count)]
+        with open(self.test_filepath, 'w') as f:
+            json.dump(entries, f)
+        return MealHistoryManager(filepath=self.test_filepath)
+
+    def test_get_meals_page_walks_backwards(self):
+        """Test paging through the history with next_cursor."""
+        hm = self._load_entries(7)
+        seen = []
+        page = hm.get_meals_page(limit=3)
+        while True:
+            seen.extend(s["id"] for s in page["history"])
+            if not page["next_cursor"]:
+                break
+            page = hm.get_meals_page(limit=3, before=page["next_cursor"])
+        self.assertEqual(seen, [f"m{i:02d}" for i in range(6, -1, -1)])
+
+    def test_get_meals_page_after_cursor(self):
+        """Test fetching the newer page adjacent to a cursor."""
+        hm = self._load_entries(7)
+        older = hm.get_meals_page(limit=3, before=hm.get_meals_page(limit=3)["next_cursor"])
+        self.assertEqual([s["id"] for s in older["history"]], ["m03", "m02", "m01"])
+        newer = hm.get_meals_page(limit=2, after=older["prev_cursor"])
+        self.assertEqual([s["id"] for s in newer["history"]], ["m05", "m04"])
+        self.assertIsNotNone(newer["prev_cursor"])
+        self.assertIsNotNone(newer["next_cursor"])
+
+    def test_get_meals_page_time_range(self):
+        """Test the inclusive from / exclusive to bounds."""
+        hm = self._load_entries(7)
+        page = hm.get_meals_page(limit=10, from_ts="2024-01-02", to_ts="2024-01-05")
+        self.assertEqual([s["id"] for s in page["history"]], ["m03", "m02", "m01"])
+        self.assertIsNone(page["next_cursor"])
+        self.assertIsNone(page["prev_cursor"])
+
+    def test_get_meals_page_tracks_add_and_delete(self):
+        """Test that the time-ordered index follows add and delete."""
+        hm = self._load_entries(3)
+        new_meal = _add_sample_meal(hm)
+        hm.delete_meal("m01")
+        page = hm.get_meals_page(limit=10)
+        self.assertEqual([s["id"] for s in page["history"]], [new_meal["id"], "m02", "m00"])
+        self.assertEqual(page["history"], hm.get_all_meals_summary())
+
+    def test_nutrition_totals_follow_add_and_delete(self):
+        """Test that the totals reflect the loaded, added and deleted meals."""
+        hm = self._load_entries(7)
+        totals = hm.get_nutrition_totals(from_ts="2024-01-02", to_ts="2024-01-05")
+        self.assertEqual((totals["from"], totals["to"]), ("2024-01-02", "2024-01-05"))
+        self.assertEqual([b["total_calories"] for b in totals["buckets"]], [1, 2, 3])
+        self.assertEqual(totals["totals"]["meals"], 3)
+        self.assertEqual(totals["totals"]["total_protein_g"], 120)
+
+        hm.delete_meal("m06")
+        new_meal = _add_sample_meal(hm, calories=250)
+        today = new_meal["timestamp"][:10]
+        totals = hm.get_nutrition_totals(from_ts=today, bucket="month")
+        self.assertEqual(totals["totals"]["total_calories"], 250)
+        self.assertEqual(hm.get_nutrition_totals(to_ts="2024-02-01")["totals"]["total_calories"], sum(range(6)))
+
+    def test_nutrition_totals_invalid_arguments(self):
+        """Test that bad dates, buckets and oversized ranges raise ValueError."""
+        self.assertEqual(self.hm.get_nutrition_totals()["buckets"], [])
+        with self.assertRaises(ValueError):
+            self.hm.get_nutrition_totals(from_ts="last week")
+        with self.assertRaises(ValueError):
+            self.hm.get_nutrition_totals(bucket="year")
+        with self.assertRaises(ValueError):
+            self.hm.get_nutrition_totals(from_ts="1900-01-01", to_ts="2100-01-01")
+
+    def test_get_meals_page_invalid_cursor(self):
+        """Test that a malformed cursor raises ValueError."""
+        with self.assertRaises(ValueError):
+            self.hm.get_meals_page(before="not a cursor!")
+        with self.assertRaises(ValueError):
+            self.hm.get_meals_page(limit=0)
+
+    def test_load_corrupted_file(self):
+        """Test loading a corrupted history file."""
+        with open(self.test_filepath, 'w') as f:
+            f.write("this is not json")
+        import sys
+        from io import StringIO
+        saved_stdout = sys.stdout
+        try:
+            sys.stdout = StringIO()
+            hm = MealHistoryManager(filepath=self.test_filepath)
+        finally:
+            sys.stdout = saved_stdout
+        self.assertEqual(hm.history, [])
+
+    def test_saved_file_is_json_list(self):
+        """Test the on-disk format of the JSON storage."""
+        _add_sample_meal(self.hm)
+        with open(self.test_filepath, 'r') as f:
+            self.assertIsInstance(json.load(f), list)
+
+
+    def test_two_managers_share_one_file(self):
+        """Test that saves merge with, and refresh picks up, another manager's meals."""
+        kept = _add_sample_meal(self.hm, "Kept")
+        deleted = _add_sample_meal(self.hm, "Deleted")
+        other = MealHistoryManager(filepath=self.test_filepath)
+        self.assertFalse(other.refresh())  # Unchanged file
+
+        from_other = _add_sample_meal(other, "From other")
+        self.hm.delete_meal(deleted["id"])  # Must keep the other manager's meal
+        with open(self.test_filepath, 'r') as f:
+            self.assertCountEqual([m["id"] for m in json.load(f)], [kept["id"], from_other["id"]])
+        self.assertIsNotNone(self.hm.get_meal_by_id(from_other["id"]))
+
+        self.assertTrue(other.refresh())
+        self.assertIsNone(other.get_meal_by_id(deleted["id"]))
+        self.assertEqual(len(other.get_all_meals_summary()), 2)
+        self.assertFalse(other.refresh())
+
+    def test_write_behind_persistence(self):
+        """Test that changes are written together in write-behind mode, at the latest on close."""
+        hm = MealHistoryManager(filepath=self.test_filepath, flush_interval=60)
+        kept = _add_sample_meal(hm, "Kept")
+        _add_sample_meal(hm, "Dropped")
+        hm.delete_meal(hm.get_all_meals_summary()[0]["id"])
+        self.assertFalse(os.path.exists(self.test_filepath))
+        self.assertEqual(hm._write_behind.pending, 3)
+        hm.close()
+        reloaded = MealHistoryManager(filepath=self.test_filepath)
+        self.assertEqual([m["id"] for m in reloaded.history], [kept["id"]])
+
+    def test_write_behind_failed_write_stays_pending(self):
+        """Test that a failed write-behind save is reported to flush() and retried."""
+        directory = "test_history_missing_dir"
+        hm = MealHistoryManager(filepath=os.path.join(directory, "history.json"), flush_interval=60)
+        try:
+            meal = _add_sample_meal(hm)
+            with self.assertRaises(OSError):
+                hm.flush()
+            self.assertEqual(hm._write_behind.pending, 1)
+            os.mkdir(directory)
+            hm.flush()
+            self.assertEqual([m["id"] for m in MealHistoryManager(filepath=hm.filepath).history], [meal["id"]])
+        finally:
+            hm.close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -138,5 +138,33 @@ class TestIngredient(unittest.TestCase):
         ing = Ingredient("Apple", 52, 0.3, 14, 0.2)
         self.assertEqual(repr(ing), "Ingredient(name='Apple', calories=52.0, protein=0.3, carbs=14.0, fat=0.2)")
 
+    def test_slots(self):
+        """Test that Ingredient has no per-instance __dict__."""
+        ing = Ingredient("Apple", 52, 0.3, 14, 0.2)
+        self.assertFalse(hasattr(ing, "__dict__"))
+        with self.assertRaises(AttributeError):
+            ing.color = "red"
+
+    def test_from_rows_and_from_dicts(self):
+        """Test bulk construction matches the validating constructor."""
+        rows = [("Apple", 52, 0.3, 14, 0.2), ("Banana", 89.0, 1.1, 23, 0.3)]
+        ingredients = Ingredient.from_rows(rows)
+        self.assertEqual([repr(i) for i in ingredients], [repr(Ingredient(*row)) for row in rows])
+        self.assertIsInstance(ingredients[0].calories, float)
+        from_dicts = Ingredient.from_dicts(i.to_dict() for i in ingredients)
+        self.assertEqual([repr(i) for i in from_dicts], [repr(i) for i in ingredients])
+        self.assertEqual(Ingredient.from_rows([]), [])
+
+    def test_bulk_construction_invalid_data(self):
+        """Test that one bad record fails bulk construction with the usual errors."""
+        with self.assertRaisesRegex(ValueError, "Fat"):
+            Ingredient.from_rows([("Apple", 52, 0.3, 14, 0.2), ("Bad", 10, 1, 1, -1)])
+        with self.assertRaisesRegex(ValueError, "name"):
+            Ingredient.from_rows([("", 52, 0.3, 14, 0.2)])
+        with self.assertRaisesRegex(ValueError, "Calories"):
+            Ingredient.from_dicts([{"name": "Bad", "calories": "many", "protein": 1, "carbs": 1, "fat": 1}])
+        with self.assertRaisesRegex(ValueError, "missing"):
+            Ingredient.from_dicts([{"name": "Incomplete"}])
+
 if __name__ == '__main__':
     unittest.main()
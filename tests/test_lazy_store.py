@@ -0,0 +1,93 @@
+import unittest
+import io
+import sys
+import threading
+from nutrition_tracker.lazy_store import LazyStore, warm_up
+
+class _Manager:
+    def __init__(self):
+        self.refreshed = 0
+        self.flushed = 0
+
+    def refresh(self):
+        self.refreshed += 1
+        return True
+
+    def flush(self):
+        self.flushed += 1
+
+    def count(self):
+        return 42
+
+class TestLazyStore(unittest.TestCase):
+
+    def setUp(self):
+        self.held_output = io.StringIO()
+        sys.stdout = self.held_output
+
+    def tearDown(self):
+        sys.stdout = sys.__stdout__
+
+    def test_created_once_on_first_use(self):
+        """Test that the manager is created by the first attribute access only, and timed."""
+        created = []
+        store = LazyStore("catalog", lambda: created.append(_Manager()) or created[-1])
+        self.assertFalse(store.ready)
+        self.assertIsNone(store.peek())
+        self.assertFalse(store.refresh())
+        store.flush()
+        self.assertEqual(created, [])
+
+        self.assertEqual(store.count(), 42)
+        self.assertEqual(store.count(), 42)
+        self.assertEqual(len(created), 1)
+        self.assertTrue(store.ready)
+        self.assertIs(store.peek(), created[0])
+        self.assertIsNotNone(store.load_seconds)
+        self.assertTrue(store.refresh())
+        store.flush()
+        self.assertEqual((created[0].refreshed, created[0].flushed), (1, 1))
+
+    def test_concurrent_users_share_one_load(self):
+        """Test that threads needing a store that is loading wait for that load instead of starting another."""
+        started, release, created = threading.Event(), threading.Event(), []
+
+        def factory():
+            started.set()
+            release.wait(5)
+            created.append(_Manager())
+            return created[-1]
+
+        store = LazyStore("history", factory)
+        thread = warm_up([store])
+        self.assertTrue(started.wait(5))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(store.get()))
+        waiter.start()
+        release.set()
+        waiter.join(5)
+        thread.join(5)
+        self.assertEqual(len(created), 1)
+        self.assertEqual(results, created)
+        self.assertIn("The history store is ready", self.held_output.getvalue())
+
+    def test_failed_load_is_retried(self):
+        """Test that a failing factory is reported and tried again by the next user."""
+        attempts = []
+
+        def factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("disk unavailable")
+            return _Manager()
+
+        store = LazyStore("catalog", factory)
+        warm_up([store]).join(5)
+        self.assertFalse(store.ready)
+        self.assertIsInstance(store.error, OSError)
+        self.assertIn("Error loading the catalog store: disk unavailable", self.held_output.getvalue())
+        self.assertEqual(store.count(), 42)
+        self.assertIsNone(store.error)
+
+if __name__ == '__main__':
+    unittest.main()
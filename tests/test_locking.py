@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+from nutrition_tracker.locking import RWLock
+
+class TestRWLock(unittest.TestCase):
+
+    def setUp(self):
+        """Set up for test methods."""
+        self.lock = RWLock()
+
+    def test_readers_share_the_lock(self):
+        """Test that several threads can hold the read lock at once."""
+        inside = threading.Barrier(3, timeout=5)
+
+        def reader():
+            with self.lock.read_locked():
+                inside.wait()  # Only passes if all three readers are inside together
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertFalse(inside.broken)
+
+    def test_writer_excludes_readers_and_is_preferred(self):
+        """Test that a waiting writer blocks new readers and runs before them."""
+        events = []
+        self.lock.acquire_read()
+        writer = threading.Thread(target=lambda: self._locked(self.lock.write_locked, events, "write"))
+        writer.start()
+        while not self.lock._waiting_writers:
+            time.sleep(0.001)
+        reader = threading.Thread(target=lambda: self._locked(self.lock.read_locked, events, "read"))
+        reader.start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+        self.lock.release_read()
+        writer.join(5)
+        reader.join(5)
+        self.assertEqual(events, ["write", "read"])
+
+    def test_reentrancy(self):
+        """Test nested read and write acquisitions and the forbidden upgrade."""
+        with self.lock.write_locked():
+            with self.lock.write_locked():
+                with self.lock.read_locked():
+                    pass
+        with self.lock.read_locked():
+            with self.lock.read_locked():
+                with self.assertRaises(RuntimeError):
+                    self.lock.acquire_write()
+        with self.lock.write_locked():  # Everything was released
+            pass
+
+    @staticmethod
+    def _locked(context, events, label):
+        with context():
+            events.append(label)
+
+
+if __name__ == '__main__':
+    unittest.main()
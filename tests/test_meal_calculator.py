@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+from io import StringIO
+
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.meal_calculator import MealCalculationCache, MealInputError, calculate_meals, parse_meal_request
+
+class TestMealCalculator(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a small database for test methods."""
+        self.test_db_filepath = "test_meal_calculator_db.json"
+        if os.path.exists(self.test_db_filepath):
+            os.remove(self.test_db_filepath)
+        self._saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+        self.db = IngredientDatabase(filepath=self.test_db_filepath)
+        self.db.add_ingredient(Ingredient("Chicken Breast", 165, 31, 0, 3.6))
+        self.db.add_ingredient(Ingredient("Brown Rice", 111, 2.6, 23, 0.9))
+        self.meals = [
+            {"name": "A", "ingredients": [{"name": "Chicken Breast", "weight": 175}, {"name": "Brown Rice", "weight": 65}]},
+            {"name": "B", "ingredients": [{"name": "Brown Rice", "weight": 0}]},
+            {"name": "C", "ingredients": [{"name": "Kale", "weight": 10}, {"name": "Kale", "weight": 5}]},
+        ]
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        sys.stdout = self._saved_stdout
+        for path in (self.test_db_filepath, self.test_db_filepath + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_parse_meal_request(self):
+        """Test validation of a single meal."""
+        self.assertEqual(
+            parse_meal_request({"ingredients": [{"name": "Brown Rice", "weight": "50"}]}),
+            ("My Meal", [("Brown Rice", 50.0)]),
+        )
+        for bad in (None, {"ingredients": []}, {"name": "", "ingredients": [{"name": "x", "weight": 1}]},
+                    {"ingredients": [{"name": "x", "weight": -1}]}, {"ingredients": ["x"]}):
+            with self.assertRaises(MealInputError):
+                parse_meal_request(bad)
+
+    def test_vectorized_matches_scalar(self):
+        """Test that the batch result is the same with and without the nutrient matrix."""
+        vectorized = calculate_meals(self.db, self.meals)
+        matrix, self.db.nutrient_matrix = self.db.nutrient_matrix, None
+        try:
+            scalar = calculate_meals(self.db, self.meals)
+        finally:
+            self.db.nutrient_matrix = matrix
+        self.assertEqual(vectorized, scalar)
+        self.assertTrue(scalar[0]["success"])
+        self.assertIsNone(scalar[1]["nutrition_per_100g"]["calories_per_100g"])
+        self.assertEqual(scalar[2]["message"].count("Kale"), 1)
+
+
+    def test_cache_hits_ignore_line_order(self):
+        """Test that the same ingredients in another order and meal name hit the cache."""
+        cache = MealCalculationCache(maxsize=8)
+        first = calculate_meals(self.db, self.meals[:1], cache=cache)[0]
+        reordered = {"name": "A again", "ingredients": list(reversed(self.meals[0]["ingredients"]))}
+        second = calculate_meals(self.db, [reordered], cache=cache)[0]
+        self.assertEqual(cache.stats(), {"size": 1, "maxsize": 8, "hits": 1, "misses": 1, "evictions": 0})
+        self.assertEqual(second["meal_name"], "A again")
+        self.assertEqual(second["total_nutrition"], first["total_nutrition"])
+        self.assertEqual([line["name"] for line in second["ingredients_list"]], ["Brown Rice", "Chicken Breast"])
+        second["total_nutrition"]["total_calories"] = -1  # Results must not alias cache entries
+        third = calculate_meals(self.db, self.meals[:1], cache=cache)[0]
+        self.assertEqual(third, first)
+
+    def test_cache_invalidated_by_database_changes(self):
+        """Test that removing or replacing an ingredient is never answered from the cache."""
+        cache = MealCalculationCache()
+        meal = {"ingredients": [{"name": "Brown Rice", "weight": 100}]}
+        self.assertEqual(calculate_meals(self.db, [meal], cache=cache)[0]["total_nutrition"]["total_calories"], 111)
+        self.db.remove_ingredient("Brown Rice")
+        self.assertEqual(calculate_meals(self.db, [meal], cache=cache)[0]["status"], 404)
+        self.db.add_ingredient(Ingredient("Brown Rice", 120, 2.6, 23, 0.9))
+        self.assertEqual(calculate_meals(self.db, [meal], cache=cache)[0]["total_nutrition"]["total_calories"], 120)
+        self.assertEqual(cache.hits, 0)
+
+    def test_cache_eviction(self):
+        """Test LRU eviction and that maxsize 0 disables caching."""
+        cache = MealCalculationCache(maxsize=2)
+        meals = [{"ingredients": [{"name": "Brown Rice", "weight": w}]} for w in (10, 20, 30)]
+        calculate_meals(self.db, meals, cache=cache)
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+        calculate_meals(self.db, meals[2:] + meals[:1], cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        disabled = MealCalculationCache(maxsize=0)
+        calculate_meals(self.db, meals, cache=disabled)
+        self.assertEqual(len(disabled), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
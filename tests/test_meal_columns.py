@@ -0,0 +1,88 @@
+import unittest
+import os
+import uuid
+from nutrition_tracker.history_manager import MealHistoryManager
+from nutrition_tracker.meal_columns import MealColumns
+
+def _app_meal(name="Lunch", timestamp="2024-05-01T12:30:00.123456+00:00"):
+    """An entry shaped like the ones app.py logs."""
+    return {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "timestamp": timestamp,
+        "ingredients_used": [{"name": "Chicken Breast", "weight_g": 150}, {"name": "Brown Rice", "weight_g": 75.5}],
+        "total_nutrition": {"total_calories": 331.3, "total_protein_g": 48.45, "total_carbs_g": 17.25,
+                            "total_fat_g": 6.08, "total_weight_g": 225.5},
+        "nutrition_per_100g": {"calories_per_100g": 146.92, "protein_per_100g": 21.49,
+                               "carbs_per_100g": 7.65, "fat_per_100g": 2.7},
+    }
+
+class TestMealColumns(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Test that entries read back equal to what was stored, and are stored in columns."""
+        meals = [_app_meal(), _app_meal("Dinner", "2024-05-01T19:00:00+00:00")]
+        columns = MealColumns(meals)
+        self.assertEqual(len(columns), 2)
+        self.assertEqual(list(columns), meals)
+        self.assertEqual(columns[-1], meals[1])
+        self.assertEqual([type(line["weight_g"]) for line in columns[0]["ingredients_used"]], [int, float])
+        self.assertEqual(columns._other, [None, None])
+        self.assertEqual(columns._ingredient_names, ["Chicken Breast", "Brown Rice"])
+        self.assertEqual(columns.summary(0)["total_protein_g"], 48.45)
+
+    def test_irregular_entries_are_kept_as_dicts(self):
+        """Test that entries that would not round-trip exactly are stored unchanged."""
+        irregular = [
+            dict(_app_meal(), id="1"),
+            dict(_app_meal(), timestamp="2024-05-01"),
+            dict(_app_meal(), timestamp="2024-05-01T12:30:00+02:00"),
+            dict(_app_meal(), total_nutrition={"total_calories": 500, "total_protein_g": 40}),
+            dict(_app_meal(), nutrition_per_100g={"calories_per_100g": None, "protein_per_100g": None,
+                                                  "carbs_per_100g": None, "fat_per_100g": None}),
+            dict(_app_meal(), ingredients_used=[{"name": "Kale", "weight_g": "10"}]),
+            dict(_app_meal(), extra="field"),
+        ]
+        columns = MealColumns(irregular)
+        self.assertEqual(list(columns), irregular)
+        self.assertTrue(all(other is not None for other in columns._other))
+        self.assertIsNone(columns.summary(0))
+
+    def test_assignment_and_pop(self):
+        """Test the list operations the history manager uses."""
+        first, second, irregular = _app_meal("First"), _app_meal("Second"), dict(_app_meal(), id="x")
+        columns = MealColumns([first, irregular])
+        self.assertEqual(columns.pop(), irregular)
+        columns.append(second)
+        columns[0] = irregular
+        self.assertEqual(list(columns), [irregular, second])
+        self.assertEqual(columns.pop(), second)
+        self.assertEqual(columns.pop(), irregular)
+        with self.assertRaises(IndexError):
+            columns.pop()
+        with self.assertRaises(IndexError):
+            columns[0]
+
+    def test_columnar_history_manager(self):
+        """Test that a columnar manager behaves like the default one."""
+        filepath = "test_meal_columns_history.json"
+        try:
+            hm = MealHistoryManager(filepath=filepath, columnar=True)
+            meals = [hm.add_meal(f"Meal {i}", _app_meal()["ingredients_used"], _app_meal()["total_nutrition"],
+                                 _app_meal()["nutrition_per_100g"]) for i in range(3)]
+            hm.delete_meal(meals[0]["id"])
+            self.assertIsInstance(hm.history, MealColumns)
+            self.assertEqual(hm.get_meal_by_id(meals[1]["id"]), meals[1])
+            self.assertEqual([s["name"] for s in hm.get_all_meals_summary()], ["Meal 2", "Meal 1"])
+
+            reloaded = MealHistoryManager(filepath=filepath, columnar=True)
+            self.assertEqual(reloaded.get_all_meals_summary(), MealHistoryManager(filepath=filepath).get_all_meals_summary())
+            self.assertEqual(reloaded.get_meal_by_id(meals[2]["id"]), meals[2])
+        finally:
+            for path in (filepath, filepath + ".lock"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
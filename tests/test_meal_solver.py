@@ -0,0 +1,111 @@
+import unittest
+import os
+import sys
+from io import StringIO
+
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.meal_calculator import MealInputError, calculate_meals
+from nutrition_tracker.meal_solver import parse_solve_request, solve_meal, solve_weights
+from nutrition_tracker.nutrient_matrix import np, numpy_available
+
+@unittest.skipUnless(numpy_available(), "NumPy is not installed")
+class TestMealSolver(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a small database for test methods."""
+        self.test_db_filepath = "test_meal_solver_db.json"
+        if os.path.exists(self.test_db_filepath):
+            os.remove(self.test_db_filepath)
+        self._saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+        self.db = IngredientDatabase(filepath=self.test_db_filepath)
+        self.db.add_ingredient(Ingredient("Chicken Breast", 165, 31, 0, 3.6))
+        self.db.add_ingredient(Ingredient("Brown Rice", 111, 2.6, 23, 0.9))
+        self.db.add_ingredient(Ingredient("Olive Oil", 884, 0, 0, 100))
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        sys.stdout = self._saved_stdout
+        for path in (self.test_db_filepath, self.test_db_filepath + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _request(self, targets, bounds=None):
+        bounds = bounds or {}
+        return {"name": "Solved", "targets": targets,
+                "ingredients": [dict(name=name, **bounds.get(name, {}))
+                                for name in ("Chicken Breast", "Brown Rice", "Olive Oil")]}
+
+    def test_parse_solve_request(self):
+        """Test validation of the candidates, bounds and targets."""
+        self.assertEqual(
+            parse_solve_request({"ingredients": [{"name": "Brown Rice", "max_weight": 200}], "targets": {"carbs": 46}}),
+            ("My Meal", ["Brown Rice"], [0.0], [200.0], {2: 46.0}),
+        )
+        for data in (None, {"targets": {"fat": 1}},
+                     {"ingredients": [{"name": "A"}, {"name": "A"}], "targets": {"fat": 1}},
+                     {"ingredients": [{"name": "A", "min_weight": 5, "max_weight": 1}], "targets": {"fat": 1}},
+                     {"ingredients": [{"name": "A", "max_weight": -1}], "targets": {"fat": 1}},
+                     {"ingredients": [{"name": "A", "max_weight": 1e300}], "targets": {"fat": 1}},
+                     {"ingredients": [{"name": "A", "min_weight": 10001}], "targets": {"fat": 1}},
+                     {"ingredients": [{"name": "A"}], "targets": {}},
+                     {"ingredients": [{"name": "A"}], "targets": {"sugar": 1}},
+                     {"ingredients": [{"name": "A"}], "targets": {"fat": "1"}}):
+            with self.assertRaises(MealInputError):
+                parse_solve_request(data)
+
+    def test_exact_targets(self):
+        """Test that reachable targets are met, with the totals of /api/calculate_meal for the solved weights."""
+        result = solve_meal(self.db, self._request({"protein": 51.7, "carbs": 46, "fat": 17.2}))
+        self.assertTrue(result["success"])
+        self.assertEqual([line["weight_g"] for line in result["ingredients_list"]], [150.0, 200.0, 10.0])
+        self.assertEqual(result["targets"], {"protein": 51.7, "carbs": 46.0, "fat": 17.2})
+        self.assertEqual(result["deviation"], {"protein": 0.0, "carbs": 0.0, "fat": 0.0})
+        expected = calculate_meals(self.db, [{"name": "Solved", "ingredients": [
+            {"name": line["name"], "weight": line["weight_g"]} for line in result["ingredients_list"]]}])[0]
+        for field in ("meal_name", "total_nutrition", "nutrition_per_100g", "ingredients_list"):
+            self.assertEqual(result[field], expected[field])
+
+    def test_bounds_are_respected(self):
+        """Test that weights stay within their bounds and unreachable targets are approached as closely as possible."""
+        result = solve_meal(self.db, self._request(
+            {"protein": 100}, {"Chicken Breast": {"max_weight": 200}, "Brown Rice": {"min_weight": 50, "max_weight": 80},
+                               "Olive Oil": {"min_weight": 5, "max_weight": 5}}))
+        self.assertEqual([line["weight_g"] for line in result["ingredients_list"]], [200.0, 80.0, 5.0])
+        self.assertEqual(result["deviation"], {"protein": -35.92})
+
+    def test_unhelpful_candidates_stay_at_their_minimum(self):
+        """Test that candidates without the targeted nutrients, or not needed for them, keep their minimum weight."""
+        self.db.add_ingredient(Ingredient("Water", 0, 0, 0, 0))
+        result = solve_meal(self.db, {"targets": {"protein": 31}, "ingredients": [
+            {"name": "Chicken Breast"}, {"name": "Water"}, {"name": "Olive Oil", "min_weight": 5}]})
+        self.assertEqual([line["weight_g"] for line in result["ingredients_list"]], [100.0, 0.0, 5.0])
+        self.assertEqual(result["deviation"], {"protein": 0.0})
+
+    def test_least_squares_optimality(self):
+        """Test that solved weights are no worse than any of many random feasible weights."""
+        rng = np.random.default_rng(7)
+        values = rng.uniform(0, 40, (6, 4))
+        values[:, 0] = values[:, 1:] @ [4, 4, 9]
+        lower, upper = np.zeros(6), rng.uniform(50, 300, 6)
+        targets = {0: 700.0, 1: 40.0, 3: 20.0}
+        scale = np.array([1 / 700, 1 / 40, 1 / 20])
+
+        def error(weights):
+            totals = np.asarray(weights) @ values[:, [0, 1, 3]] / 100
+            return np.sum(((totals - [700, 40, 20]) * scale) ** 2, axis=-1)
+
+        weights = solve_weights(values, targets, lower, upper)
+        self.assertTrue(np.all(weights >= lower) and np.all(weights <= upper))
+        samples = rng.uniform(lower, upper, (2000, 6))
+        self.assertLessEqual(error(weights), error(samples).min() + 1e-9)
+
+    def test_unknown_ingredient(self):
+        """Test that unknown candidates are reported like in /api/calculate_meal."""
+        result = solve_meal(self.db, {"ingredients": [{"name": "Kale"}], "targets": {"protein": 10}})
+        self.assertEqual((result["success"], result["status"]), (False, 404))
+        self.assertIn("Kale", result["message"])
+
+if __name__ == '__main__':
+    unittest.main()
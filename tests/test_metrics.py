@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+from io import StringIO
+
+from nutrition_tracker import metrics
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.metrics import Counter, Gauge, Histogram, Registry, timed
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts, sum and count of a labelled histogram."""
+        histogram = Histogram("latency_seconds", "Latency.", labels=("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "/a")
+        samples = dict(histogram.samples())
+        self.assertEqual(samples['latency_seconds_bucket{route="/a",le="0.1"}'], 2)
+        self.assertEqual(samples['latency_seconds_bucket{route="/a",le="1.0"}'], 3)
+        self.assertEqual(samples['latency_seconds_bucket{route="/a",le="+Inf"}'], 4)
+        self.assertAlmostEqual(samples['latency_seconds_sum{route="/a"}'], 3.65)
+        self.assertEqual(histogram.count("/a"), 4)
+        self.assertEqual(histogram.count("/b"), 0)
+
+    def test_render(self):
+        """Test the text format, label escaping and gauges that have no value."""
+        registry = Registry()
+        counter = registry.register(Counter("requests_total", "Requests.", labels=("path",)))
+        counter.inc(2, 'say "hi"')
+        registry.register(Gauge("items", "Items.", lambda: 7))
+        registry.register(Gauge("file_bytes", "Sizes.", lambda: {("a",): 10, ("b",): None}, labels=("store",)))
+        self.assertEqual(registry.render(), (
+            "# HELP requests_total Requests.\n# TYPE requests_total counter\n"
+            'requests_total{path="say \\"hi\\""} 2\n'
+            "# HELP items Items.\n# TYPE items gauge\nitems 7\n"
+            '# HELP file_bytes Sizes.\n# TYPE file_bytes gauge\nfile_bytes{store="a"} 10\n'
+        ))
+
+    def test_timed_records_failures(self):
+        """Test that a timed call is recorded whether or not it raises."""
+        before = metrics.STORAGE_DURATION.count("test_operation")
+
+        @timed("test_operation")
+        def fail():
+            raise IOError("disk full")
+
+        with self.assertRaises(IOError):
+            fail()
+        self.assertEqual(metrics.STORAGE_DURATION.count("test_operation"), before + 1)
+
+    def test_database_save_records_bytes(self):
+        """Test that saving the catalog records its duration and the bytes written."""
+        filepath = "test_metrics_ingredients.json"
+        saved_stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            db = IngredientDatabase(filepath=filepath)
+            saves = metrics.STORAGE_DURATION.count("save_ingredients")
+            written = metrics.STORAGE_BYTES_WRITTEN.value("save_ingredients")
+            db.add_ingredient(Ingredient("Oats", 389, 16.9, 66.3, 6.9))
+            db.save_ingredients()
+            self.assertEqual(metrics.STORAGE_DURATION.count("save_ingredients"), saves + 1)
+            self.assertEqual(metrics.STORAGE_BYTES_WRITTEN.value("save_ingredients") - written,
+                             os.path.getsize(filepath))
+        finally:
+            sys.stdout = saved_stdout
+            for path in (filepath, filepath + ".lock"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
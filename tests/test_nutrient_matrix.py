@@ -0,0 +1,102 @@
+import unittest
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.meal import Meal
+from nutrition_tracker.nutrient_matrix import NutrientMatrix, numpy_available
+
+@unittest.skipUnless(numpy_available(), "NumPy is not installed")
+class TestNutrientMatrix(unittest.TestCase):
+
+    def setUp(self):
+        """Set up for test methods."""
+        self.chicken = Ingredient("Chicken Breast", 165, 31, 0, 3.6)
+        self.rice = Ingredient("Brown Rice", 111, 2.6, 23, 0.9)
+        self.oil = Ingredient("Olive Oil", 884, 0, 0, 100)
+        self.matrix = NutrientMatrix([self.chicken, self.rice, self.oil])
+
+    def _scalar_meal(self, items):
+        meal = Meal("Scalar")
+        for ingredient, weight in items:
+            meal.add_ingredient(ingredient, weight)
+        return meal
+
+    def test_single_meal_matches_scalar_path(self):
+        """Test that a vectorized meal equals the Meal computed line by line."""
+        items = [(self.chicken, 175), (self.rice, 65), (self.oil, 12)]
+        rows = self.matrix.rows_for([ing.name for ing, _ in items])
+        result = self.matrix.compute(rows, [w for _, w in items])
+        expected = self._scalar_meal(items)
+        self.assertEqual(result.total_nutrition(), expected.get_total_nutrition())
+        self.assertEqual(result.nutrition_per_100g(), expected.get_nutrition_per_100g())
+        self.assertEqual(result.meal_lines(), [list(ing.get_nutrition_for_weight(w)) for ing, w in items])
+
+    def test_many_meals_with_empty_and_zero_weight(self):
+        """Test offsets, including an empty meal and a zero-weight meal."""
+        meals = [[(self.chicken, 200)], [], [(self.rice, 0)], [(self.rice, 100), (self.oil, 10)]]
+        names, weights, offsets = [], [], []
+        for items in meals:
+            offsets.append(len(names))
+            names.extend(ing.name for ing, _ in items)
+            weights.extend(w for _, w in items)
+        result = self.matrix.compute(self.matrix.rows_for(names), weights, offsets)
+        self.assertEqual(len(result), 4)
+        for i, items in enumerate(meals):
+            expected = self._scalar_meal(items)
+            self.assertEqual(result.total_nutrition(i), expected.get_total_nutrition())
+            self.assertEqual(result.nutrition_per_100g(i), expected.get_nutrition_per_100g())
+            self.assertEqual(len(result.meal_lines(i)), len(items))
+
+    def test_rows_for_unknown_names(self):
+        """Test that unknown names are all reported."""
+        with self.assertRaises(KeyError) as ctx:
+            self.matrix.rows_for(["Brown Rice", "Tofu", "Kale"])
+        self.assertEqual(ctx.exception.args[0], ["Tofu", "Kale"])
+
+    def test_negative_weight(self):
+        """Test that negative weights are rejected."""
+        with self.assertRaises(ValueError):
+            self.matrix.compute(self.matrix.rows_for(["Brown Rice"]), [-1])
+
+    def test_set_remove_and_growth(self):
+        """Test row updates, recycling of freed rows and growth past the initial capacity."""
+        row = self.matrix.row("Brown Rice")
+        self.matrix.set(Ingredient("Brown Rice", 100, 2, 20, 1))
+        self.assertEqual(self.matrix.row("Brown Rice"), row)
+        self.assertEqual(self.matrix.values[row].tolist(), [100, 2, 20, 1])
+        self.matrix.remove("Brown Rice")
+        self.assertNotIn("Brown Rice", self.matrix)
+        self.assertEqual(self.matrix.set(Ingredient("Tofu", 76, 8, 1.9, 4.8)), row)
+        for i in range(200):
+            self.matrix.set(Ingredient(f"Item {i}", i, 0, 0, 0))
+        self.assertEqual(len(self.matrix), 203)
+        self.assertEqual(self.matrix.values[self.matrix.row("Item 150")][0], 150)
+
+    def test_meal_add_ingredients_with_matrix(self):
+        """Test Meal.add_ingredients on the vectorized path."""
+        items = [(self.chicken, 100), (self.rice, 50)]
+        meal = Meal("Vectorized")
+        meal.add_ingredients(items, nutrient_matrix=self.matrix)
+        expected = self._scalar_meal(items)
+        self.assertEqual(meal.get_total_nutrition(), expected.get_total_nutrition())
+        self.assertEqual(meal.get_nutrition_per_100g(), expected.get_nutrition_per_100g())
+        self.assertEqual(meal.get_ingredients_list(), expected.get_ingredients_list())
+
+    def test_meal_add_ingredients_unknown_to_matrix(self):
+        """Test that ingredients missing from the matrix fall back to the scalar path."""
+        tofu = Ingredient("Tofu", 76, 8, 1.9, 4.8)
+        meal = Meal("Fallback")
+        meal.add_ingredients([(tofu, 100)], nutrient_matrix=self.matrix)
+        self.assertEqual(meal.get_total_nutrition()["total_calories"], 76)
+
+
+    def test_meal_add_ingredients_with_stale_matrix_row(self):
+        """Test that passed Ingredient values win over a differing matrix row."""
+        richer_rice = Ingredient("Brown Rice", 500, 2.6, 23, 0.9)
+        meal = Meal("Stale")
+        meal.add_ingredients([(richer_rice, 100), (self.chicken, 100)], nutrient_matrix=self.matrix)
+        self.assertEqual(meal.get_total_nutrition()["total_calories"], 665)
+        rows = self.matrix.rows_for(["Brown Rice"])
+        self.assertTrue(self.matrix.holds(rows, [self.rice]))
+        self.assertFalse(self.matrix.holds(rows, [richer_rice]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import json
+import os
+import pstats
+import shutil
+import sys
+import time
+from io import StringIO
+
+from nutrition_tracker.profiling import PROFILE_HEADER, ProfilingMiddleware, StackSampler, folded_stacks
+
+PROFILE_DIR = "test_profiles"
+
+def slow_handler():
+    time.sleep(0.05)
+
+def wsgi_app(environ, start_response):
+    if environ["PATH_INFO"] == "/slow":
+        slow_handler()
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+def call(app, path, headers=None):
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "a=1"}
+    for name, value in (headers or {}).items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+    statuses = []
+    body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    return statuses[0], b"".join(body)
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+        self.sampler = StackSampler(interval=0.001)
+
+    def tearDown(self):
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+
+    def _captures(self):
+        if not os.path.isdir(PROFILE_DIR):
+            return []
+        return sorted(os.listdir(PROFILE_DIR))
+
+    def test_slow_request_is_saved(self):
+        """Test the summary, folded stacks and cProfile dump of a request over the threshold."""
+        app = ProfilingMiddleware(wsgi_app, mode="cprofile", threshold=0.02, directory=PROFILE_DIR, sampler=self.sampler)
+        self.assertEqual(call(app, "/fast"), ("200 OK", b"ok"))
+        self.assertEqual(self._captures(), [])
+        self.assertEqual(call(app, "/slow"), ("200 OK", b"ok"))
+        files = self._captures()
+        self.assertEqual(sorted(os.path.splitext(name)[1] for name in files), [".folded", ".json", ".prof"])
+        base = os.path.join(PROFILE_DIR, os.path.splitext(files[0])[0])
+        with open(base + ".json") as f:
+            summary = json.load(f)
+        self.assertEqual((summary["path"], summary["status"], summary["mode"]), ("/slow", "200 OK", "cprofile"))
+        self.assertGreaterEqual(summary["duration_ms"], 50)
+        self.assertGreater(summary["samples"], 0)
+        with open(base + ".folded") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertTrue(any("slow_handler" in line.split(";")[-1] for line in lines))
+        stats = pstats.Stats(base + ".prof", stream=StringIO())
+        self.assertTrue(any(function[2] == "slow_handler" for function in stats.stats))
+
+    def test_header_opt_in(self):
+        """Test that the header profiles one request only when allowed, whatever its duration."""
+        app = ProfilingMiddleware(wsgi_app, directory=PROFILE_DIR, sampler=self.sampler)
+        call(app, "/fast", {PROFILE_HEADER: "sampling"})
+        self.assertEqual(self._captures(), [])
+        app.allow_header = True
+        call(app, "/fast")
+        self.assertEqual(self._captures(), [])
+        call(app, "/fast", {PROFILE_HEADER: "sampling"})
+        self.assertEqual(sorted(os.path.splitext(name)[1] for name in self._captures()), [".folded", ".json"])
+
+    def test_disk_cap_deletes_oldest_captures(self):
+        """Test that the oldest captures are deleted, whole, once the directory exceeds its cap."""
+        os.makedirs(PROFILE_DIR)
+        for i, name in enumerate(("old", "older")):
+            for extension in (".json", ".folded"):
+                path = os.path.join(PROFILE_DIR, name + extension)
+                with open(path, "w") as f:
+                    f.write("x" * 400)
+                os.utime(path, (1000 - i, 1000 - i))
+        app = ProfilingMiddleware(wsgi_app, mode="sampling", threshold=0, directory=PROFILE_DIR,
+                                  max_bytes=1700, sampler=self.sampler)
+        call(app, "/fast")
+        names = {os.path.splitext(name)[0] for name in self._captures()}
+        self.assertNotIn("older", names)
+        self.assertIn("old", names)
+        self.assertEqual(len(names), 2)
+
+    def test_folded_stacks(self):
+        """Test the collapsed stack format."""
+        self.assertEqual(folded_stacks({("main", "load"): 3, ("main",): 1}), "main 1\nmain;load 3\n")
+
+    def test_invalid_mode(self):
+        """Test that an unknown mode is rejected."""
+        with self.assertRaises(ValueError):
+            ProfilingMiddleware(wsgi_app, mode="perf")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import random
+from datetime import date, datetime, timedelta, timezone
+from nutrition_tracker.rollups import NutritionRollups, bucket_count, parse_day
+
+def _meal(timestamp, calories=100.0, protein=10.0):
+    return {"timestamp": timestamp,
+            "total_nutrition": {"total_calories": calories, "total_protein_g": protein,
+                                "total_carbs_g": 1.0, "total_fat_g": 0.5}}
+
+def _day(text):
+    return date.fromisoformat(text).toordinal()
+
+class TestNutritionRollups(unittest.TestCase):
+
+    def test_daily_weekly_monthly_buckets(self):
+        """Test bucket boundaries and clipping to the requested range."""
+        rollups = NutritionRollups([_meal("2024-01-31T10:00:00+00:00"), _meal("2024-02-01T10:00:00+00:00", 200),
+                                    _meal("2024-02-05T23:59:00+00:00", 300)])
+        overall, days = rollups.totals(_day("2024-01-31"), _day("2024-02-06"), "day")
+        self.assertEqual(overall[:2], [3, 600])
+        self.assertEqual([values[1] for _, values in days], [100, 200, 0, 0, 0, 300])
+
+        _, weeks = rollups.totals(_day("2024-01-31"), _day("2024-02-06"), "week")
+        self.assertEqual([(date.fromordinal(start).isoformat(), values[1]) for start, values in weeks],
+                         [("2024-01-31", 300), ("2024-02-05", 300)])  # 2024-02-05 is a Monday
+
+        _, months = rollups.totals(_day("2024-01-01"), _day("2024-03-01"), "month")
+        self.assertEqual([(date.fromordinal(start).isoformat(), values[0]) for start, values in months],
+                         [("2024-01-01", 1), ("2024-02-01", 2)])
+        self.assertEqual(bucket_count(_day("2024-01-31"), _day("2024-02-06"), "week"), 2)
+        self.assertEqual(bucket_count(_day("2023-12-15"), _day("2024-03-01"), "month"), 3)
+
+    def test_incremental_updates_match_rebuild(self):
+        """Test that adds and removes in any order give the same totals as building from scratch."""
+        rng = random.Random(7)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        meals = [_meal((start + timedelta(hours=rng.randrange(24 * 60))).isoformat(), rng.uniform(0, 900))
+                 for _ in range(300)]
+        rollups = NutritionRollups()
+        for meal in meals:
+            rollups.add(meal)
+            if rng.random() < 0.2:
+                rollups.totals(_day("2024-01-01"), _day("2024-03-01"))  # Interleave queries with updates
+        for meal in meals[::3]:
+            rollups.remove(meal)
+        expected = NutritionRollups(meal for i, meal in enumerate(meals) if i % 3)
+        for bucket in ("day", "week", "month"):
+            got_overall, got = rollups.totals(_day("2023-12-25"), _day("2024-03-10"), bucket)
+            want_overall, want = expected.totals(_day("2023-12-25"), _day("2024-03-10"), bucket)
+            self.assertEqual([s for s, _ in got], [s for s, _ in want])
+            for (_, got_values), (_, want_values) in zip(got + [(0, got_overall)], want + [(0, want_overall)]):
+                for g, w in zip(got_values, want_values):
+                    self.assertAlmostEqual(g, w, places=6)
+
+    def test_utc_days_and_bad_entries(self):
+        """Test that aware timestamps count on their UTC day and unusable entries are ignored."""
+        rollups = NutritionRollups([_meal("2024-01-02T01:00:00+05:00"), {"timestamp": None},
+                                    {"timestamp": "yesterday"}, {"timestamp": "2024-01-02", "total_nutrition": "?"}])
+        self.assertEqual(rollups.day_range(), (_day("2024-01-01"), _day("2024-01-03")))
+        overall, _ = rollups.totals(_day("2024-01-01"), _day("2024-01-03"))
+        self.assertEqual(overall, [2, 100, 10, 1, 0.5])
+        self.assertEqual(parse_day("2024-01-02"), _day("2024-01-02"))
+        with self.assertRaises(ValueError):
+            parse_day("02/01/2024")
+        with self.assertRaises(ValueError):
+            rollups.totals(0, 1, "year")
+
+
+if __name__ == '__main__':
+    unittest.main()
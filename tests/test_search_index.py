@@ -0,0 +1,77 @@
+import unittest
+from nutrition_tracker.search_index import IngredientSearchIndex, normalize_name
+
+class TestIngredientSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Set up for test methods."""
+        self.index = IngredientSearchIndex([
+            "Rice", "Brown Rice", "Rice Cake", "Chicken Breast", "chicken thigh",
+            "Crème Brûlée", "Jalapeño", "Apple", "Pineapple",
+        ])
+
+    def test_normalize_name(self):
+        """Test accent stripping, case folding and whitespace collapsing."""
+        self.assertEqual(normalize_name("  Crème  BRÛLÉE "), "creme brulee")
+
+    def test_ranking_tiers(self):
+        """Test exact > prefix > word prefix ordering."""
+        self.assertEqual(self.index.search("rice"), ["Rice", "Rice Cake", "Brown Rice"])
+
+    def test_case_and_accent_insensitive(self):
+        """Test that case and accents are ignored on both sides."""
+        self.assertEqual(self.index.search("JALAPENO"), ["Jalapeño"])
+        self.assertEqual(self.index.search("crème"), ["Crème Brûlée"])
+
+    def test_substring_and_fuzzy(self):
+        """Test substring matches and typo tolerance."""
+        self.assertEqual(self.index.search("apple"), ["Apple", "Pineapple"])
+        self.assertCountEqual(self.index.search("chiken"), ["Chicken Breast", "chicken thigh"])
+        self.assertEqual(self.index.search("xyz"), [])
+
+    def test_substring_inside_a_word(self):
+        """Test substrings from the middle of a word and queries too short for a trigram."""
+        self.assertEqual(self.index.search("ick"), ["chicken thigh", "Chicken Breast"])
+        self.assertEqual(IngredientSearchIndex(["Broccoli", "Rice"]).search("occ"), ["Broccoli"])
+        self.assertEqual(self.index.search("ee"), ["Crème Brûlée"])
+        self.assertEqual(self.index.search("hi"), ["chicken thigh", "Chicken Breast"])
+        self.assertEqual(self.index.search("q"), [])
+
+    def test_add_many_matches_add(self):
+        """Test that a batch added at once is indexed like names added one by one."""
+        names = ["Wild Rice", "Rice", "Apricot", "Rice Noodles", "Apple"]
+        one_by_one = IngredientSearchIndex()
+        for name in names:
+            one_by_one.add(name)
+        batched = IngredientSearchIndex(["Apple"])
+        batched.add_many(names)
+        self.assertEqual(len(batched), len(one_by_one))
+        for query in ("rice", "ap", "noodle", "aprikot", ""):
+            self.assertEqual(batched.search(query), one_by_one.search(query))
+
+    def test_limit(self):
+        """Test that results are capped at limit."""
+        self.assertEqual(len(self.index.search("", limit=3)), 3)
+        self.assertEqual(self.index.search("", limit=2), ["Apple", "Brown Rice"])
+        self.assertEqual(self.index.search("rice", limit=0), [])
+
+    def test_incremental_add_and_remove(self):
+        """Test that add and remove update every structure."""
+        self.index.add("Wild Rice")
+        self.assertIn("Wild Rice", self.index.search("rice"))
+        self.index.remove("Rice")
+        self.index.remove("Wild Rice")
+        self.assertEqual(self.index.search("rice"), ["Rice Cake", "Brown Rice"])
+        self.assertEqual(self.index.search("wild"), [])
+        self.index.remove("Not indexed")  # No-op
+        self.assertEqual(len(self.index), 8)
+
+
+    def test_fuzzy_tier_ignores_names_below_threshold(self):
+        """Test that names sharing only common trigrams are not candidates."""
+        index = IngredientSearchIndex([f"Rice {i}" for i in range(200)] + ["Chicken Breast"])
+        self.assertEqual(index.search("chiken"), ["Chicken Breast"])
+        self.assertEqual(index.search("ice 1", limit=3), ["Rice 1", "Rice 10", "Rice 11"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+import os
+import io
+import sys
+import json
+import uuid
+import tempfile
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.history_manager import MealHistoryManager
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.meal_columns import MealColumns
+from nutrition_tracker.nutrient_matrix import numpy_available
+from nutrition_tracker.snapshot import SnapshotIngredients, SnapshotMeals, snapshot_path
+
+def _app_meal(name="Lunch", timestamp="2024-05-01T12:30:00.123456+00:00"):
+    """An entry shaped like the ones app.py logs."""
+    return {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "timestamp": timestamp,
+        "ingredients_used": [{"name": "Chicken Breast", "weight_g": 150}, {"name": "Brown Rice", "weight_g": 75.5}],
+        "total_nutrition": {"total_calories": 331.3, "total_protein_g": 48.45, "total_carbs_g": 17.25,
+                            "total_fat_g": 6.08, "total_weight_g": 225.5},
+        "nutrition_per_100g": {"calories_per_100g": 146.92, "protein_per_100g": 21.49,
+                               "carbs_per_100g": 7.65, "fat_per_100g": 2.7},
+    }
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.catalog_path = os.path.join(self.directory.name, "ingredients.json")
+        self.history_path = os.path.join(self.directory.name, "meal_history.json")
+        self.held_output = io.StringIO()
+        sys.stdout = self.held_output
+
+    def tearDown(self):
+        sys.stdout = sys.__stdout__
+        self.directory.cleanup()
+
+    def _write_catalog(self, ingredients):
+        with open(self.catalog_path, "w") as f:
+            json.dump({ingredient.name: ingredient.to_dict() for ingredient in ingredients}, f)
+
+    def test_catalog_loads_from_snapshot(self):
+        """Test that the second load maps the snapshot and reads back the same ingredients."""
+        ingredients = [Ingredient("Apple", 52, 0.3, 14, 0.2), Ingredient("Crème fraîche", 292, 2.4, 2.9, 30)]
+        self._write_catalog(ingredients)
+        first = IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        self.assertIsInstance(first._ingredients, dict)
+        self.assertTrue(os.path.exists(snapshot_path(self.catalog_path)))
+
+        db = IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        self.assertIsInstance(db._ingredients, SnapshotIngredients)
+        self.assertEqual(db.list_ingredients(), ["Apple", "Crème fraîche"])
+        self.assertEqual([db.get_ingredient(i.name).to_dict() for i in ingredients], [i.to_dict() for i in ingredients])
+        self.assertIsNone(db.get_ingredient("Pear"))
+        self.assertEqual([i.name for i in db.search_ingredients("creme")], ["Crème fraîche"])
+        if numpy_available():
+            rows = db.nutrient_matrix.rows_for(["Crème fraîche"])
+            self.assertEqual(db.nutrient_matrix.values[rows].tolist(), [[292, 2.4, 2.9, 30]])
+
+    def test_catalog_changes_after_snapshot_load(self):
+        """Test that changes made after a snapshot load are saved, indexed and written to the next snapshot."""
+        self._write_catalog([Ingredient("Apple", 52, 0.3, 14, 0.2), Ingredient("Banana", 89, 1.1, 23, 0.3)])
+        IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        db = IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        db.add_ingredient(Ingredient("Cherry", 63, 1.1, 16, 0.2))
+        db.remove_ingredient("Apple")
+        self.assertEqual([i.name for i in db.search_ingredients("")], ["Banana", "Cherry"])
+        db.save_ingredients()
+
+        reloaded = IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        self.assertIsInstance(reloaded._ingredients, SnapshotIngredients)
+        self.assertEqual(reloaded.list_ingredients(), ["Banana", "Cherry"])
+        self.assertEqual(reloaded.get_ingredient("Cherry").calories, 63)
+        self.assertEqual(IngredientDatabase(filepath=self.catalog_path).list_ingredients(), ["Banana", "Cherry"])
+
+    def test_stale_or_corrupt_snapshot_is_ignored(self):
+        """Test that a snapshot is only used while it matches the JSON file."""
+        self._write_catalog([Ingredient("Apple", 52, 0.3, 14, 0.2)])
+        IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        self._write_catalog([Ingredient("Banana", 89, 1.1, 23, 0.3)])  # Edited without the database
+        db = IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        self.assertIsInstance(db._ingredients, dict)
+        self.assertEqual(db.list_ingredients(), ["Banana"])
+
+        with open(snapshot_path(self.catalog_path), "wb") as f:
+            f.write(b"garbage")
+        db = IngredientDatabase(filepath=self.catalog_path, snapshot=True)
+        self.assertEqual(db.list_ingredients(), ["Banana"])
+
+    def test_history_loads_from_snapshot(self):
+        """Test that entries, summaries, pages and totals read from a snapshot equal those read from JSON."""
+        meals = [_app_meal("Dinner", "2024-05-02T19:00:00+00:00"), _app_meal(),
+                 dict(_app_meal("Snack", "2024-05-03T10:00:00+00:00"), extra="field"),
+                 dict(_app_meal("Water", "2024-05-03T11:00:00+00:00"), nutrition_per_100g={
+                     "calories_per_100g": None, "protein_per_100g": None, "carbs_per_100g": None, "fat_per_100g": None})]
+        with open(self.history_path, "w") as f:
+            json.dump(meals, f)
+        plain = MealHistoryManager(filepath=self.history_path)
+        MealHistoryManager(filepath=self.history_path, snapshot=True)
+        hm = MealHistoryManager(filepath=self.history_path, snapshot=True)
+        self.assertIsInstance(hm.history, SnapshotMeals)
+        self.assertEqual(list(hm.history), meals)
+        self.assertEqual(hm.get_meal_by_id(meals[2]["id"]), meals[2])
+        self.assertEqual(hm.get_all_meals_summary(), plain.get_all_meals_summary())
+        self.assertEqual(hm.get_meals_page(limit=2), plain.get_meals_page(limit=2))
+        self.assertEqual(hm.get_nutrition_totals(bucket="week"), plain.get_nutrition_totals(bucket="week"))
+
+    def test_history_changes_after_snapshot_load(self):
+        """Test adding and deleting meals on a history loaded from a snapshot."""
+        meals = [_app_meal("First", "2024-05-01T08:00:00+00:00"), _app_meal("Second", "2024-05-01T09:00:00+00:00")]
+        with open(self.history_path, "w") as f:
+            json.dump(meals, f)
+        MealHistoryManager(filepath=self.history_path, snapshot=True)
+        hm = MealHistoryManager(filepath=self.history_path, snapshot=True)
+        self.assertTrue(hm.delete_meal(meals[0]["id"]))
+        added = hm.add_meal("Third", [{"name": "Kale", "weight_g": 10}], {"total_calories": 5}, {})
+        self.assertEqual([m["name"] for m in hm.get_all_meals_summary()], ["Third", "Second"])
+
+        reloaded = MealHistoryManager(filepath=self.history_path, snapshot=True)
+        self.assertIsInstance(reloaded.history, SnapshotMeals)
+        self.assertEqual(list(reloaded.history), [meals[1], added])
+        self.assertEqual(reloaded.get_nutrition_totals()["totals"]["meals"], 2)
+
+    def test_history_snapshot_with_columnar(self):
+        """Test that a columnar history loaded from a snapshot stays mapped instead of building every entry."""
+        meals = [_app_meal("First", "2024-05-01T08:00:00+00:00"), _app_meal("Second", "2024-05-01T09:00:00+00:00")]
+        with open(self.history_path, "w") as f:
+            json.dump(meals, f)
+        first = MealHistoryManager(filepath=self.history_path, columnar=True, snapshot=True)
+        self.assertIsInstance(first.history, MealColumns)  # Read from JSON: no snapshot yet
+        hm = MealHistoryManager(filepath=self.history_path, columnar=True, snapshot=True)
+        self.assertIsInstance(hm.history, SnapshotMeals)
+        self.assertTrue(hm.history.unchanged)
+        self.assertEqual(hm.get_meal_by_id(meals[1]["id"]), meals[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import os
+import json
+import sqlite3
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.sqlite_database import SQLiteIngredientDatabase
+
+class TestSQLiteIngredientDatabase(unittest.TestCase):
+
+    def setUp(self):
+        """Set up for test methods."""
+        self.test_db_filepath = "test_db_file.db"
+        self.test_json_filepath = "test_db_legacy.json"
+        self._remove_files()
+        self.db = SQLiteIngredientDatabase(filepath=self.test_db_filepath)
+        self.ing1 = Ingredient("Apple", 52, 0.3, 14, 0.2)
+        self.ing2 = Ingredient("Banana", 89, 1.1, 23, 0.3)
+
+    def tearDown(self):
+        """Clean up after test methods."""
+        self.db.close()
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.test_db_filepath, self.test_db_filepath + "-wal",
+                     self.test_db_filepath + "-shm", self.test_json_filepath):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _row_count(self):
+        conn = sqlite3.connect(self.test_db_filepath)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM ingredients").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_initial_database_empty(self):
+        """Test that a new SQLite database is initially empty."""
+        self.assertEqual(self.db.list_ingredients(), [])
+
+    def test_add_ingredient_writes_row(self):
+        """Test that adding an ingredient persists it without calling save_ingredients."""
+        self.db.add_ingredient(self.ing1)
+        self.assertEqual(self._row_count(), 1)
+        reopened = SQLiteIngredientDatabase(filepath=self.test_db_filepath)
+        try:
+            retrieved = reopened.get_ingredient("Apple")
+            self.assertIsNotNone(retrieved)
+            if retrieved:
+                self.assertEqual(retrieved.to_dict(), self.ing1.to_dict())
+        finally:
+            reopened.close()
+
+    def test_add_ingredient_duplicate_name(self):
+        """Test adding an ingredient with a duplicate name."""
+        self.db.add_ingredient(self.ing1)
+        with self.assertRaises(ValueError):
+            self.db.add_ingredient(Ingredient("Apple", 100, 1, 1, 1))
+        self.assertEqual(self._row_count(), 1)
+
+    def test_add_ingredient_invalid_type(self):
+        """Test adding an invalid type instead of an Ingredient object."""
+        with self.assertRaises(TypeError):
+            self.db.add_ingredient("not an ingredient") # type: ignore
+
+    def test_remove_ingredient_deletes_row(self):
+        """Test removing an ingredient deletes only its row."""
+        self.db.add_ingredient(self.ing1)
+        self.db.add_ingredient(self.ing2)
+        self.assertTrue(self.db.remove_ingredient("Apple"))
+        self.assertFalse(self.db.remove_ingredient("Apple"))
+        self.assertEqual(self._row_count(), 1)
+        self.assertCountEqual(self.db.list_ingredients(), ["Banana"])
+
+    def test_migrate_from_json_once(self):
+        """Test the one-shot import of a JSON catalog."""
+        self.db.close()
+        os.remove(self.test_db_filepath)
+        with open(self.test_json_filepath, 'w') as f:
+            json.dump({"Apple": self.ing1.to_dict(), "Banana": self.ing2.to_dict()}, f)
+
+        self.db = SQLiteIngredientDatabase(filepath=self.test_db_filepath, migrate_from=self.test_json_filepath)
+        self.assertCountEqual(self.db.list_ingredients(), ["Apple", "Banana"])
+        self.db.remove_ingredient("Apple")
+        self.db.close()
+
+        # A second open must not re-import the JSON file.
+        self.db = SQLiteIngredientDatabase(filepath=self.test_db_filepath, migrate_from=self.test_json_filepath)
+        self.assertEqual(self.db.list_ingredients(), ["Banana"])
+
+    def test_migrate_from_missing_json(self):
+        """Test that a missing JSON file leaves the database empty."""
+        self.db.close()
+        self.db = SQLiteIngredientDatabase(filepath=self.test_db_filepath, migrate_from=self.test_json_filepath)
+        self.assertEqual(self.db.list_ingredients(), [])
+
+    def test_repr_method(self):
+        """Test the __repr__ method of SQLiteIngredientDatabase."""
+        self.db.add_ingredient(self.ing1)
+        self.assertEqual(repr(self.db), f"<SQLiteIngredientDatabase: 1 ingredients, file='{self.test_db_filepath}'>")
+
+
+    def test_refresh_picks_up_other_connections(self):
+        """Test that refresh applies rows committed by another connection, and only then."""
+        self.db.add_ingredient(self.ing1)
+        other = SQLiteIngredientDatabase(filepath=self.test_db_filepath)
+        try:
+            self.assertFalse(other.refresh())
+            self.db.add_ingredient(self.ing2)
+            self.db.remove_ingredient("Apple")
+            self.assertFalse(self.db.refresh())  # Own commits do not count
+            self.assertTrue(other.refresh())
+            self.assertEqual(other.list_ingredients(), ["Banana"])
+            self.assertFalse(other.refresh())
+        finally:
+            other.close()
+
+if __name__ == '__main__':
+    unittest.main()
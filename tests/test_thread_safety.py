@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from io import StringIO
+
+from nutrition_tracker.database import IngredientDatabase
+from nutrition_tracker.history_journal import JournaledMealHistoryManager
+from nutrition_tracker.history_manager import MealHistoryManager
+from nutrition_tracker.ingredient import Ingredient
+from nutrition_tracker.meal_calculator import MealCalculationCache, calculate_meals
+from nutrition_tracker.sqlite_database import SQLiteIngredientDatabase
+
+THREADS = 8
+OPS_PER_THREAD = 40
+
+class TestThreadSafety(unittest.TestCase):
+    """Hammers the managers from many threads and checks that no update is lost."""
+
+    def setUp(self):
+        """Silence manager output and pick throwaway file names."""
+        self.paths = ["test_threads_db.json", "test_threads_db.sqlite", "test_threads_history.json",
+                      "test_threads_history.ndjson"]
+        self._remove_files()
+        self._saved_stdout = sys.stdout
+        sys.stdout = StringIO()
+        self._saved_switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)  # Switch threads often to provoke interleavings
+
+    def tearDown(self):
+        """Restore stdout and remove the test files."""
+        sys.setswitchinterval(self._saved_switch_interval)
+        sys.stdout = self._saved_stdout
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in self.paths:
+            for suffix in ("", "-wal", "-shm", ".compact", ".lock"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def _run_threads(self, worker):
+        errors = []
+
+        def guarded(thread_id):
+            try:
+                worker(thread_id)
+            except Exception as e:  # Reported in the main thread
+                errors.append(e)
+
+        threads = [threading.Thread(target=guarded, args=(i,)) for i in range(THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(60)
+        self.assertEqual(errors, [])
+
+    def _hammer_database(self, db):
+        db.add_ingredient(Ingredient("Base", 100, 10, 10, 1))
+        cache = MealCalculationCache(maxsize=16)
+        meal = {"ingredients": [{"name": "Base", "weight": 50}]}
+
+        def worker(thread_id):
+            for i in range(OPS_PER_THREAD):
+                name = f"T{thread_id} item {i}"
+                db.add_ingredient(Ingredient(name, 50, 1, 1, 1))
+                if i % 2:
+                    self.assertTrue(db.remove_ingredient(name))
+                db.save_ingredients()
+                self.assertTrue(calculate_meals(db, [meal], cache=cache)[0]["success"])
+                db.search_ingredients("item", limit=5)
+
+        self._run_threads(worker)
+        expected = {"Base"} | {f"T{t} item {i}" for t in range(THREADS) for i in range(0, OPS_PER_THREAD, 2)}
+        self.assertEqual(set(db.list_ingredients()), expected)
+        if db.nutrient_matrix is not None:
+            self.assertEqual(len(db.nutrient_matrix), len(expected))
+        self.assertEqual(len(db.search_ingredients("", limit=10_000)), len(expected))
+        return expected
+
+    def test_json_database(self):
+        """Test concurrent adds, removes, saves and reads on the JSON database."""
+        expected = self._hammer_database(IngredientDatabase(filepath=self.paths[0]))
+        with open(self.paths[0]) as f:
+            self.assertEqual(set(json.load(f)), expected)
+
+    def test_sqlite_database(self):
+        """Test concurrent adds, removes and reads on the SQLite database."""
+        db = SQLiteIngredientDatabase(filepath=self.paths[1])
+        expected = self._hammer_database(db)
+        db.close()
+        reopened = SQLiteIngredientDatabase(filepath=self.paths[1])
+        self.assertEqual(set(reopened.list_ingredients()), expected)
+        reopened.close()
+
+    def _hammer_history(self, manager):
+        kept = []
+
+        def worker(thread_id):
+            for i in range(OPS_PER_THREAD):
+                meal = manager.add_meal(f"T{thread_id} meal {i}", [], {"total_calories": i}, {})
+                if i % 2:
+                    self.assertTrue(manager.delete_meal(meal["id"]))
+                else:
+                    kept.append(meal["id"])
+                self.assertIsNotNone(manager.get_meals_page(limit=10))
+                manager.get_all_meals_summary()
+
+        self._run_threads(worker)
+        self.assertEqual(sorted(m["id"] for m in manager.get_all_meals_summary()), sorted(kept))
+        for meal_id in kept:
+            self.assertEqual(manager.get_meal_by_id(meal_id)["id"], meal_id)
+        return kept
+
+    def test_json_history(self):
+        """Test concurrent adds, deletes and reads on the JSON meal history."""
+        kept = self._hammer_history(MealHistoryManager(filepath=self.paths[2]))
+        reloaded = MealHistoryManager(filepath=self.paths[2])
+        self.assertEqual(sorted(m["id"] for m in reloaded.history), sorted(kept))
+
+    def test_journaled_history(self):
+        """Test concurrent adds and deletes on the journal, with background compactions."""
+        manager = JournaledMealHistoryManager(filepath=self.paths[3], legacy_filepath=None,
+                                              compaction_threshold=0.2, min_compaction_records=20)
+        kept = self._hammer_history(manager)
+        manager.close()
+        reloaded = JournaledMealHistoryManager(filepath=self.paths[3], legacy_filepath=None)
+        self.assertEqual(sorted(m["id"] for m in reloaded.history), sorted(kept))
+        reloaded.close()
+
+
+    def test_journaled_history_cross_thread_deletes(self):
+        """Test that deleting meals other threads just added never resurrects them on replay."""
+        manager = JournaledMealHistoryManager(filepath=self.paths[3], legacy_filepath=None)
+
+        def worker(thread_id):
+            for i in range(OPS_PER_THREAD):
+                if thread_id % 2:
+                    # The newest meal in memory, whose add record may not be written yet.
+                    newest = manager.get_meals_page(limit=1)["history"]
+                    if newest:
+                        manager.delete_meal(newest[0]["id"])
+                else:
+                    manager.add_meal(f"T{thread_id} meal {i}", [], {"total_calories": i}, {})
+
+        self._run_threads(worker)
+        expected = sorted(m["id"] for m in manager.get_all_meals_summary())
+        manager.close()
+        reloaded = JournaledMealHistoryManager(filepath=self.paths[3], legacy_filepath=None)
+        self.assertEqual(sorted(m["id"] for m in reloaded.history), expected)
+        reloaded.close()
+
+if __name__ == '__main__':
+    unittest.main()
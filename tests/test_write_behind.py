@@ -0,0 +1,84 @@
+import unittest
+import threading
+import time
+from nutrition_tracker.write_behind import WriteBehind
+
+class TestWriteBehind(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a write-behind that counts its writes."""
+        self.written = []
+        self.wrote = threading.Event()
+
+    def _write(self):
+        self.written.append(time.monotonic())
+        self.wrote.set()
+
+    def test_changes_are_coalesced_within_interval(self):
+        """Test that many changes within the interval become one write, within the interval."""
+        wb = WriteBehind(self._write, interval=0.2, max_changes=1000)
+        try:
+            start = time.monotonic()
+            for _ in range(50):
+                wb.mark_dirty()
+            self.assertEqual(self.written, [])
+            self.assertTrue(self.wrote.wait(5))
+            self.assertEqual(len(self.written), 1)
+            self.assertGreaterEqual(self.written[0] - start, 0.2)
+            self.assertEqual(wb.pending, 0)
+        finally:
+            wb.close()
+        self.assertEqual(len(self.written), 1)  # Nothing left to write on close
+
+    def test_max_changes_triggers_early_write(self):
+        """Test that reaching max_changes writes without waiting for the interval."""
+        wb = WriteBehind(self._write, interval=60, max_changes=3)
+        try:
+            for _ in range(3):
+                wb.mark_dirty()
+            self.assertTrue(self.wrote.wait(5))
+        finally:
+            wb.close()
+        self.assertEqual(len(self.written), 1)
+
+    def test_flush_and_close(self):
+        """Test that flush() writes synchronously and close() writes what is left."""
+        wb = WriteBehind(self._write, interval=60)
+        wb.flush()
+        self.assertEqual(self.written, [])  # Nothing pending
+        wb.mark_dirty()
+        wb.flush()
+        self.assertEqual(len(self.written), 1)
+        wb.mark_dirty()
+        wb.close()
+        self.assertEqual(len(self.written), 2)
+        wb.mark_dirty()  # After close, changes are written right away
+        self.assertEqual(len(self.written), 3)
+        self.assertEqual(wb.writes, 2)
+
+    def test_failed_write_stays_pending(self):
+        """Test that a failing write keeps its changes for the next attempt."""
+        def failing_write():
+            raise IOError("disk full")
+
+        wb = WriteBehind(failing_write, interval=60)
+        try:
+            wb.mark_dirty()
+            with self.assertRaises(IOError):
+                wb.flush()
+            self.assertEqual(wb.pending, 1)
+            wb._write = self._write
+        finally:
+            wb.close()
+        self.assertEqual(len(self.written), 1)
+
+    def test_invalid_arguments(self):
+        """Test that non-positive settings are rejected."""
+        with self.assertRaises(ValueError):
+            WriteBehind(self._write, interval=0)
+        with self.assertRaises(ValueError):
+            WriteBehind(self._write, max_changes=0)
+
+
+if __name__ == '__main__':
+    unittest.main()